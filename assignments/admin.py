@@ -3,50 +3,107 @@ Admin configuration for the assignments app.
 """
 
 from django.contrib import admin
-from .models import Assignment, Submission
+from .models import Assignment, AssignmentStats, FileBlob, ReminderLog, Submission, UploadSession
 
 
 class SubmissionInline(admin.TabularInline):
     """Inline admin for submissions within assignments."""
     model = Submission
     extra = 0
-    readonly_fields = ['submitted_at', 'reviewed_at']
+    readonly_fields = ['submitted_at', 'reviewed_at', 'blob', 'filename']
     autocomplete_fields = ['student']
 
 
+class AssignmentStatsInline(admin.StackedInline):
+    """Read-only inline showing an assignment's submission rollup."""
+    model = AssignmentStats
+    can_delete = False
+    readonly_fields = [
+        'submitted_count', 'pending_count', 'reviewed_count', 'late_count',
+        'review_time_total', 'updated_at'
+    ]
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     """Admin configuration for assignments."""
-    list_display = ('title', 'course', 'due_date', 'points', 'submission_count', 'is_active', 'created_at')
+    list_display = (
+        'title', 'course', 'due_date', 'points', 'submission_count', 'pending_count',
+        'is_active', 'created_at'
+    )
     list_filter = ('is_active', 'created_at', 'due_date', 'course')
     search_fields = ('title', 'description', 'course__title')
     autocomplete_fields = ['course']
     readonly_fields = ['created_at', 'updated_at']
-    inlines = [SubmissionInline]
+    list_select_related = ['course', 'stats']
+    inlines = [AssignmentStatsInline, SubmissionInline]
     
     def submission_count(self, obj):
-        """Get submission count for the admin list display."""
-        return obj.submissions.count()
+        """Get submission count for the admin list display from the rollup."""
+        return obj.submission_count
     submission_count.short_description = 'Submissions'
+    
+    def pending_count(self, obj):
+        """Get the number of submissions awaiting review from the rollup."""
+        return obj.stats.pending_count if hasattr(obj, 'stats') else None
+    pending_count.short_description = 'Pending'
 
 
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
     """Admin configuration for submissions."""
-    list_display = ('student', 'assignment', 'submitted_at', 'status', 'is_late', 'reviewed_at')
+    list_display = ('student', 'assignment', 'submitted_at', 'status', 'score', 'is_late', 'reviewed_at')
     list_filter = ('status', 'submitted_at', 'reviewed_at', 'assignment__course')
     search_fields = ('student__username', 'assignment__title', 'content', 'feedback')
-    readonly_fields = ['submitted_at', 'reviewed_at', 'is_late']
+    readonly_fields = ['submitted_at', 'reviewed_at', 'is_late', 'blob', 'filename']
     autocomplete_fields = ['student', 'assignment']
+    list_select_related = ['student', 'assignment__course']
     fieldsets = (
         (None, {
-            'fields': ('assignment', 'student', 'content', 'file')
+            'fields': ('assignment', 'student', 'content', 'file', 'filename', 'blob')
         }),
         ('Review', {
-            'fields': ('status', 'feedback', 'reviewed_at')
+            'fields': ('status', 'score', 'feedback', 'reviewed_at')
         }),
         ('Metadata', {
             'fields': ('submitted_at', 'is_late'),
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        """Compute lateness in SQL for the change list."""
+        return super().get_queryset(request).with_lateness()
+
+
+@admin.register(FileBlob)
+class FileBlobAdmin(admin.ModelAdmin):
+    """Admin configuration for stored file blobs."""
+    list_display = ('sha256', 'size', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ['sha256', 'size', 'file', 'created_at']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    """Admin configuration for chunked upload sessions."""
+    list_display = ('id', 'owner', 'filename', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('owner__username', 'filename', 'sha256')
+    readonly_fields = ['blob', 'created_at', 'updated_at', 'completed_at']
+    list_select_related = ['owner']
+    autocomplete_fields = ['owner']
+
+
+@admin.register(ReminderLog)
+class ReminderLogAdmin(admin.ModelAdmin):
+    """Admin configuration for the due-date reminder ledger."""
+    list_display = ('assignment', 'student', 'window', 'sent_at')
+    list_filter = ('window', 'sent_at')
+    search_fields = ('student__username', 'assignment__title')
+    readonly_fields = ['sent_at', 'claimed_at']
+    list_select_related = ['assignment__course', 'student']
+    autocomplete_fields = ['assignment', 'student']
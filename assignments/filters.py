@@ -0,0 +1,25 @@
+"""
+Filters for the assignments app.
+"""
+
+from django_filters import rest_framework as filters
+
+from .models import Submission
+
+
+class SubmissionFilter(filters.FilterSet):
+    """
+    Filter for submissions.
+    ``is_late`` compares against the assignment's due date in SQL, so it can be
+    combined with ``course`` to list a course's late submissions cheaply.
+    """
+    
+    course = filters.NumberFilter(field_name='assignment__course')
+    is_late = filters.BooleanFilter(method='filter_is_late')
+    
+    class Meta:
+        model = Submission
+        fields = ['assignment', 'course', 'status', 'is_late']
+    
+    def filter_is_late(self, queryset, name, value):
+        return queryset.late(value)
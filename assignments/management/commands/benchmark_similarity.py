@@ -0,0 +1,134 @@
+"""
+Management command to benchmark near-duplicate submission detection.
+"""
+
+import random
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from assignments.models import Assignment, Submission
+from assignments.similarity import (
+    SIMILARITY_THRESHOLD,
+    assignment_similar_pairs,
+    rescan_assignment,
+    similar_submissions,
+)
+from courses.models import Course
+
+SYLLABLES = 'ka lo mi ne ru sa ti vo ze pa qui bel dor fen gar hul'.split()
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the seeded submissions once the benchmark is done."""
+
+
+class Command(BaseCommand):
+    """Time LSH candidate search against comparing every pair of submissions."""
+
+    help = 'Benchmark MinHash/LSH near-duplicate detection on seeded submissions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=10_000, help='Number of submissions to seed.')
+        parser.add_argument('--copies', type=float, default=0.05, help='Fraction seeded as edited copies.')
+        parser.add_argument('--edit-rate', type=float, default=0.1, help='Fraction of words changed in a copy.')
+        parser.add_argument('--words', type=int, default=150, help='Words per submission.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the submissions.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                assignment, planted = self.seed(options)
+                self.run(assignment, planted)
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write('Seeded submissions rolled back.')
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        vocabulary = sorted({
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+            for _ in range(5000)
+        })
+        total = options['submissions']
+        teacher = User.objects.create(username=f'benchmark-teacher-{options["seed"]}')
+        course = Course.objects.create(title='Similarity benchmark', description='', teacher=teacher)
+        assignment = Assignment.objects.create(
+            course=course, title='Essay', description='', due_date=timezone.now()
+        )
+        students = User.objects.bulk_create(
+            User(username=f'benchmark-student-{options["seed"]}-{index}') for index in range(total)
+        )
+
+        started = time.perf_counter()
+        texts, planted = [], set()
+        for index in range(total):
+            if texts and rng.random() < options['copies']:
+                # Copy an earlier answer and change some of its words
+                source = rng.randrange(len(texts))
+                words = texts[source].split()
+                for _ in range(int(len(words) * options['edit_rate'])):
+                    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+                planted.add((source, index))
+            else:
+                words = [rng.choice(vocabulary) for _ in range(options['words'])]
+            texts.append(' '.join(words))
+
+        # bulk_create skips the post_save handlers, so indexing is timed separately
+        submissions = Submission.objects.bulk_create(
+            (Submission(assignment=assignment, student=student, content=text,
+                        queue_due_date=assignment.due_date)
+             for student, text in zip(students, texts)),
+            batch_size=2000,
+        )
+        ids = [submission.id for submission in submissions]
+        planted = {tuple(sorted((ids[first], ids[second]))) for first, second in planted}
+        self.stdout.write(
+            f'Seeded {total} submissions ({len(planted)} planted copies) '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+        return assignment, planted
+
+    def run(self, assignment, planted):
+        started = time.perf_counter()
+        indexed = rescan_assignment(assignment)
+        self.stdout.write(f'Fingerprinted and indexed {indexed} submissions in {time.perf_counter() - started:.2f}s')
+
+        started = time.perf_counter()
+        pairs = assignment_similar_pairs(assignment)
+        lsh_time = time.perf_counter() - started
+        found = {(first, second) for first, second, _ in pairs}
+        recall = len(found & planted) / len(planted) if planted else 1.0
+        self.stdout.write(
+            f'LSH: {len(pairs)} pairs at >= {SIMILARITY_THRESHOLD} in {lsh_time * 1000:.0f}ms, '
+            f'recall of planted copies {recall:.1%}'
+        )
+
+        # All-pairs comparison of the same signatures, on a sample, extrapolated
+        signatures = np.stack([
+            np.frombuffer(bytes(data), dtype=np.uint32)
+            for data in assignment.fingerprints.order_by('submission_id').values_list('signature', flat=True)
+        ])
+        sample = min(len(signatures), 1000)
+        started = time.perf_counter()
+        for row in range(sample):
+            (signatures[row + 1:] == signatures[row]).mean(axis=1)
+        elapsed = time.perf_counter() - started
+        total_pairs = len(signatures) * (len(signatures) - 1) / 2
+        sampled_pairs = sum(len(signatures) - row - 1 for row in range(sample))
+        self.stdout.write(
+            f'All pairs: {int(total_pairs)} comparisons, about '
+            f'{elapsed / sampled_pairs * total_pairs * 1000:.0f}ms (extrapolated from {sample} rows)'
+        )
+
+        submission = assignment.submissions.order_by('id').last()
+        started = time.perf_counter()
+        matches = similar_submissions(submission)
+        self.stdout.write(
+            f'Similar to one submission: {len(matches)} match(es) in '
+            f'{(time.perf_counter() - started) * 1000:.1f}ms'
+        )
@@ -0,0 +1,26 @@
+"""
+Management command to purge abandoned chunked uploads.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from assignments.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    """Delete upload sessions and staged chunks that have not been touched for a while."""
+
+    help = 'Delete upload sessions untouched for longer than UPLOAD_SESSION_TTL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=settings.UPLOAD_SESSION_TTL,
+            help='Seconds since the last chunk after which a session is stale.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} upload session(s).'))
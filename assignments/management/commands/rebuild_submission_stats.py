@@ -0,0 +1,37 @@
+"""
+Management command to rebuild assignment submission rollups.
+"""
+
+from django.core.management.base import BaseCommand
+
+from assignments.models import Assignment
+from assignments.services import STATS_BATCH_SIZE, rebuild_submission_stats
+from edutrack.cache import bump_generation
+
+
+class Command(BaseCommand):
+    """Recompute ``AssignmentStats`` from the submissions table, e.g. to backfill or repair drift."""
+
+    help = 'Rebuild the per-assignment submission rollups from the submissions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            help='Only rebuild the assignments of the course with this slug.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=STATS_BATCH_SIZE,
+            help='Assignments upserted per query.',
+        )
+
+    def handle(self, *args, **options):
+        assignments = Assignment.objects.all()
+        if options['course']:
+            assignments = assignments.filter(course__slug=options['course'])
+
+        rebuilt = rebuild_submission_stats(assignments, batch_size=options['batch_size'])
+        if rebuilt:
+            bump_generation('assignments')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} assignment(s).'))
@@ -0,0 +1,44 @@
+"""
+Management command to email reminders for assignments that are due soon.
+"""
+
+from django.core.management.base import BaseCommand
+
+from assignments.reminders import REMINDER_BATCH_SIZE, send_due_reminders
+
+
+class Command(BaseCommand):
+    """Remind enrolled students who have not submitted; meant to run periodically, e.g. from cron."""
+
+    help = 'Email students who have not submitted assignments due within the reminder windows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            action='append',
+            dest='windows',
+            help='Reminder window in hours; repeat for several. Defaults to ASSIGNMENT_REMINDER_WINDOWS.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REMINDER_BATCH_SIZE,
+            help='Assignments whose missing submissions are computed per query.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the reminders that are due without sending them.',
+        )
+
+    def handle(self, *args, **options):
+        sent = send_due_reminders(
+            windows=options['windows'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would send' if options['dry_run'] else 'Sent'
+        for window, count in sent.items():
+            self.stdout.write(f'{verb} {count} reminder(s) for the {window}h window.')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(sent.values())} reminder(s) in total.'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['created_at'], name='assignments_created_300492_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# Full-text index over (title, description). The PostgreSQL expression must
+# match edutrack.search.postgres_search_vector for queries to use the index;
+# on SQLite the columns are mirrored into an FTS5 table kept in sync by triggers.
+CREATE_SEARCH_INDEX = {
+    'postgresql': [
+        """
+        CREATE INDEX assignments_assignment_search_idx ON assignments_assignment USING gin ((
+            setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A')
+            || setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B')
+        ))
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE assignments_assignment_fts USING fts5(
+            title, description, content='assignments_assignment', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER assignments_assignment_fts_ai AFTER INSERT ON assignments_assignment BEGIN
+            INSERT INTO assignments_assignment_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER assignments_assignment_fts_ad AFTER DELETE ON assignments_assignment BEGIN
+            INSERT INTO assignments_assignment_fts(assignments_assignment_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER assignments_assignment_fts_au AFTER UPDATE ON assignments_assignment BEGIN
+            INSERT INTO assignments_assignment_fts(assignments_assignment_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO assignments_assignment_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        "INSERT INTO assignments_assignment_fts(assignments_assignment_fts) VALUES ('rebuild')",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'postgresql': [
+        'DROP INDEX IF EXISTS assignments_assignment_search_idx',
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS assignments_assignment_fts_ai',
+        'DROP TRIGGER IF EXISTS assignments_assignment_fts_ad',
+        'DROP TRIGGER IF EXISTS assignments_assignment_fts_au',
+        'DROP TABLE IF EXISTS assignments_assignment_fts',
+    ],
+}
+
+
+def create_assignment_search_index(apps, schema_editor):
+    for statement in CREATE_SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_assignment_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0002_assignment_assignments_created_300492_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_assignment_search_index, drop_assignment_search_index),
+    ]
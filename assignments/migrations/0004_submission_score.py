@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_assignment_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:45
+
+import datetime
+from django.db import migrations, models
+from django.db.models import Count, DurationField, F, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_assignment_stats(apps, schema_editor):
+    """Build the rollup of every existing assignment from its submissions."""
+    Assignment = apps.get_model('assignments', 'Assignment')
+    AssignmentStats = apps.get_model('assignments', 'AssignmentStats')
+    reviewed = Q(submissions__status='reviewed')
+    rows = Assignment.objects.order_by('pk').annotate(
+        submitted=Count('submissions'),
+        pending=Count('submissions', filter=Q(submissions__status='pending')),
+        reviewed=Count('submissions', filter=reviewed),
+        late=Count('submissions', filter=Q(submissions__submitted_at__gt=F('due_date'))),
+        review_time=Sum(
+            F('submissions__reviewed_at') - F('submissions__submitted_at'),
+            filter=reviewed & Q(submissions__reviewed_at__isnull=False),
+            output_field=DurationField(),
+        ),
+    ).values_list('pk', 'submitted', 'pending', 'reviewed', 'late', 'review_time')
+    AssignmentStats.objects.bulk_create(
+        [
+            AssignmentStats(
+                assignment_id=assignment_id,
+                submitted_count=submitted,
+                pending_count=pending,
+                reviewed_count=reviewed_count,
+                late_count=late,
+                review_time_total=review_time or datetime.timedelta(0),
+            )
+            for assignment_id, submitted, pending, reviewed_count, late, review_time in rows.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0004_submission_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentStats',
+            fields=[
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='assignments.assignment')),
+                ('submitted_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('reviewed_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('review_time_total', models.DurationField(default=datetime.timedelta)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'assignment stats',
+            },
+        ),
+        migrations.RunPython(backfill_assignment_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0010_review_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderlog',
+            name='claim',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='reminderlog',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.10 on 2026-10-18 05:53
+
+import datetime
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_queue_due_dates(apps, schema_editor):
+    """Copy each dated assignment's due date onto its submissions."""
+    Assignment = apps.get_model('assignments', 'Assignment')
+    Submission = apps.get_model('assignments', 'Submission')
+    Submission.objects.filter(assignment__due_date__isnull=False).update(
+        queue_due_date=Subquery(
+            Assignment.objects.filter(pk=OuterRef('assignment_id')).values('due_date')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0011_reminderlog_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='assignments_status_d1d4b7_idx',
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='queue_due_date',
+            field=models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999, tzinfo=datetime.timezone.utc), editable=False),
+        ),
+        migrations.RunPython(backfill_queue_due_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status', 'queue_due_date', 'assignment', 'submitted_at', 'id'], name='assignments_status_ec21bf_idx'),
+        ),
+    ]
@@ -2,7 +2,13 @@
 Models for the assignments app.
 """
 
+import math
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 
@@ -32,11 +38,20 @@ class Assignment(models.Model):
             models.Index(fields=['course']),
             models.Index(fields=['due_date']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['created_at']),
+            models.Index(fields=['course', 'due_date']),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.course.title})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded ``due_date`` so saves can detect a change in lateness."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_due_date = instance.__dict__.get('due_date')
+        return instance
+    
     @property
     def teacher(self):
         """Get the teacher (course creator) for this assignment."""
@@ -44,8 +59,46 @@ class Assignment(models.Model):
     
     @property
     def submission_count(self):
-        """Get the number of submissions for this assignment."""
-        return self.submissions.count()
+        """Get the number of submissions for this assignment, from its rollup when available."""
+        if '_submission_count' in self.__dict__:
+            return self._submission_count
+        try:
+            return self.stats.submitted_count
+        except AssignmentStats.DoesNotExist:
+            return self.submissions.count()
+    
+    @submission_count.setter
+    def submission_count(self, value):
+        """Store a count annotated by the queryset so it isn't recomputed."""
+        self._submission_count = value
+
+
+# Queue due date of submissions to assignments without a due date, which sort last
+NO_DUE_DATE = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def late_filter(is_late=True):
+    """Condition matching late (or, with ``is_late=False``, on-time) submissions."""
+    late = Q(assignment__due_date__isnull=False, submitted_at__gt=F('assignment__due_date'))
+    return late if is_late else ~late
+
+
+class SubmissionQuerySet(models.QuerySet):
+    """
+    QuerySet for submissions with database-side lateness.
+    """
+    
+    def with_lateness(self):
+        """Annotate ``is_late`` (submitted after the assignment's due date) in SQL."""
+        return self.annotate(is_late=models.Case(
+            models.When(late_filter(True), then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField(),
+        ))
+    
+    def late(self, is_late=True):
+        """Filter on lateness with conditions the (assignment, submitted_at) index can serve."""
+        return self.filter(late_filter(is_late))
 
 
 class Submission(models.Model):
@@ -72,6 +125,16 @@ class Submission(models.Model):
     )
     content = models.TextField()
     file = models.FileField(upload_to='submissions/', blank=True, null=True)
+    # Content-addressed blob that ``file`` points at, shared by identical uploads
+    blob = models.ForeignKey(
+        'FileBlob',
+        on_delete=models.PROTECT,
+        related_name='submissions',
+        null=True,
+        blank=True
+    )
+    # Name of the file as uploaded; blob paths only carry the content hash
+    filename = models.CharField(max_length=255, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(
         max_length=10, 
@@ -79,7 +142,28 @@ class Submission(models.Model):
         default=PENDING
     )
     feedback = models.TextField(blank=True)
+    score = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)]
+    )
     reviewed_at = models.DateTimeField(null=True, blank=True)
+    # Reviewer working on the submission; claims lapse after REVIEW_CLAIM_TTL seconds
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='claimed_submissions',
+        null=True,
+        blank=True
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Copy of the assignment's due date (``NO_DUE_DATE`` if it has none) so the
+    # review queue can be read in order from one index; kept in sync by signals
+    queue_due_date = models.DateTimeField(default=NO_DUE_DATE, editable=False)
+    
+    objects = SubmissionQuerySet.as_manager()
     
     class Meta:
         ordering = ['-submitted_at']
@@ -88,11 +172,20 @@ class Submission(models.Model):
             models.Index(fields=['assignment', 'student']),
             models.Index(fields=['status']),
             models.Index(fields=['submitted_at']),
+            models.Index(fields=['assignment', 'submitted_at']),
+            # Serves the review queue: pending submissions in queue order
+            models.Index(fields=['status', 'queue_due_date', 'assignment', 'submitted_at', 'id']),
         ]
     
     def __str__(self):
         return f"Submission by {self.student.username} for {self.assignment.title}"
     
+    def save(self, *args, **kwargs):
+        """Copy the assignment's due date onto a new submission for the review queue."""
+        if self._state.adding:
+            self.queue_due_date = self.assignment.due_date or NO_DUE_DATE
+        return super().save(*args, **kwargs)
+    
     @property
     def course(self):
         """Get the course for this submission."""
@@ -106,6 +199,221 @@ class Submission(models.Model):
     @property
     def is_late(self):
         """Check if the submission was submitted after the due date."""
+        if '_is_late' in self.__dict__:
+            return self._is_late
         if not self.assignment.due_date:
             return False
-        return self.submitted_at > self.assignment.due_date
\ No newline at end of file
+        return self.submitted_at > self.assignment.due_date
+    
+    @is_late.setter
+    def is_late(self, value):
+        """Store the lateness annotated by ``SubmissionQuerySet.with_lateness``."""
+        self._is_late = value
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded review state so saves can update the rollups by
+        difference, and the loaded content so edits can be re-fingerprinted.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_reviewed_at = instance.__dict__.get('reviewed_at')
+        instance._loaded_content = instance.__dict__.get('content')
+        return instance
+
+
+class AssignmentStats(models.Model):
+    """
+    Submission rollup for an assignment.
+    Kept up to date by the Submission signal handlers and rebuilt by the
+    ``rebuild_submission_stats`` management command.
+    """
+    assignment = models.OneToOneField(
+        Assignment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    submitted_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    reviewed_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    # Sum of (reviewed_at - submitted_at) over reviewed submissions
+    review_time_total = models.DurationField(default=timedelta)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'assignment stats'
+    
+    def __str__(self):
+        return f"Stats for assignment {self.assignment_id}"
+    
+    @property
+    def average_review_time(self):
+        """Get the mean time from submission to review, or None before any review."""
+        if not self.reviewed_count:
+            return None
+        return self.review_time_total / self.reviewed_count
+
+
+def blob_path(sha256):
+    """Storage path of a content-addressed blob, sharded by the first two hash bytes."""
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class FileBlob(models.Model):
+    """
+    Model for uploaded file contents, stored once per SHA-256 digest.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    file = models.FileField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.sha256
+
+
+class UploadSession(models.Model):
+    """
+    Model for a resumable, chunked file upload.
+    Chunks are staged on disk until the upload is completed into a ``FileBlob``.
+    """
+    PENDING = 'pending'
+    COMPLETE = 'complete'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (COMPLETE, 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Optional digest announced by the client, checked when the upload completes
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    blob = models.ForeignKey(
+        FileBlob,
+        on_delete=models.SET_NULL,
+        related_name='upload_sessions',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'status']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"Upload {self.id} ({self.filename})"
+    
+    @property
+    def chunk_count(self):
+        """Get the number of chunks the file is split into."""
+        return max(1, math.ceil(self.size / self.chunk_size))
+    
+    def expected_chunk_size(self, index):
+        """Get the exact size chunk ``index`` must have."""
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.chunk_count - 1)
+
+
+class ReminderLog(models.Model):
+    """
+    Model recording a due-date reminder sent to a student.
+    One row per assignment, student and reminder window, so repeated runs of
+    the reminder command never send the same reminder twice.
+    """
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='assignment_reminders'
+    )
+    # Width in hours of the reminder window, e.g. 24 for "due within a day"
+    window = models.PositiveIntegerField()
+    # Token of the reminder run that claimed the row; only that run sends it
+    claim = models.UUIDField(null=True, blank=True, editable=False)
+    # When the row was claimed; unsent claims older than ASSIGNMENT_REMINDER_CLAIM_TTL can be taken over
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Null while the reminder is claimed but not yet handed to the mail server
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['assignment', 'student', 'window']
+    
+    def __str__(self):
+        return f"{self.window}h reminder for {self.assignment_id} to {self.student_id}"
+
+
+class SubmissionFingerprint(models.Model):
+    """
+    MinHash signature of a submission's content, used to find near-duplicates.
+    The signature is a fixed-size array of unsigned 32-bit integers stored as bytes.
+    """
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint'
+    )
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='fingerprints'
+    )
+    signature = models.BinaryField()
+    shingle_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Fingerprint of submission {self.submission_id}"
+
+
+class SimilarityBucket(models.Model):
+    """
+    LSH bucket membership of a submission: one row per signature band.
+    Submissions of an assignment sharing a bucket key are similarity candidates.
+    """
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets'
+    )
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets'
+    )
+    # Hash of the band index and the band's signature values
+    key = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignment', 'key']),
+        ]
+    
+    def __str__(self):
+        return f"Bucket {self.key} of submission {self.submission_id}"
@@ -4,6 +4,8 @@ Custom permissions for the assignments app.
 
 from rest_framework import permissions
 
+from courses.membership import is_enrolled, teaches
+
 
 class IsAssignmentTeacher(permissions.BasePermission):
     """
@@ -14,7 +16,7 @@ class IsAssignmentTeacher(permissions.BasePermission):
         return request.user.is_authenticated and request.user.profile.is_teacher
     
     def has_object_permission(self, request, view, obj):
-        return obj.course.teacher == request.user
+        return teaches(request, obj.course_id)
 
 
 class IsEnrolledStudentOrTeacher(permissions.BasePermission):
@@ -28,14 +30,11 @@ class IsEnrolledStudentOrTeacher(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Teacher who created the course
-        if obj.course.teacher == request.user:
+        if teaches(request, obj.course_id):
             return True
         
         # Student enrolled in the course
-        return (
-            request.user.profile.is_student and 
-            obj.course.students.filter(id=request.user.id).exists()
-        )
+        return request.user.profile.is_student and is_enrolled(request, obj.course_id)
 
 
 class CanSubmitAssignment(permissions.BasePermission):
@@ -48,7 +47,7 @@ class CanSubmitAssignment(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Student must be enrolled in the course
-        return obj.course.students.filter(id=request.user.id).exists()
+        return is_enrolled(request, obj.course_id)
 
 
 class IsSubmissionOwnerOrTeacher(permissions.BasePermission):
@@ -61,11 +60,11 @@ class IsSubmissionOwnerOrTeacher(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Teacher of the course
-        if obj.assignment.course.teacher == request.user:
+        if teaches(request, obj.assignment.course_id):
             return True
         
         # Student who submitted
-        return obj.student == request.user
+        return obj.student_id == request.user.id
 
 
 class CanReviewSubmission(permissions.BasePermission):
@@ -77,4 +76,4 @@ class CanReviewSubmission(permissions.BasePermission):
         return request.user.is_authenticated and request.user.profile.is_teacher
     
     def has_object_permission(self, request, view, obj):
-        return obj.assignment.course.teacher == request.user
\ No newline at end of file
+        return teaches(request, obj.assignment.course_id)
\ No newline at end of file
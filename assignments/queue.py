@@ -0,0 +1,136 @@
+"""
+Review queue for the assignments app.
+
+The queue lists a teacher's pending submissions across all of their courses,
+by assignment due date (assignments without one last), then assignment, then
+submission time. Submissions carry a copy of their assignment's due date
+(``queue_due_date``), so the queue is read in order from the
+``(status, queue_due_date, assignment, submitted_at, id)`` index. Pages are
+keyset-paginated on that order, so each page is one bounded index range scan
+however deep the cursor is.
+
+Reviewers can claim submissions so that co-reviewers skip them; claims lapse
+after ``REVIEW_CLAIM_TTL`` seconds.
+"""
+
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from edutrack.pagination import CursorJSONEncoder
+from .models import Submission
+
+
+def claim_cutoff():
+    """Get the time before which claims have lapsed."""
+    return timezone.now() - timedelta(seconds=settings.REVIEW_CLAIM_TTL)
+
+
+def available_to(reviewer):
+    """Match submissions that are unclaimed, claimed by ``reviewer`` or whose claim lapsed."""
+    return (
+        Q(claimed_by__isnull=True)
+        | Q(claimed_by=reviewer)
+        | Q(claimed_at__lte=claim_cutoff())
+    )
+
+
+def queue_position(submission):
+    """Get the keyset position of a submission in the queue."""
+    return (
+        submission.queue_due_date,
+        submission.assignment_id,
+        submission.submitted_at,
+        submission.id,
+    )
+
+
+def encode_position(position):
+    """Encode a queue position as an opaque cursor."""
+    payload = json.dumps(list(position), cls=CursorJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_position(cursor):
+    """Decode a cursor made by ``encode_position``; raises ValueError if it is invalid."""
+    try:
+        due_date, assignment_id, submitted_at, submission_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        position = (
+            parse_datetime(due_date), int(assignment_id), parse_datetime(submitted_at), int(submission_id)
+        )
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if None in position:
+        raise ValueError('Invalid cursor')
+    return position
+
+
+def after_position(position):
+    """Match queue items that come after ``position``."""
+    due_date, assignment_id, submitted_at, submission_id = position
+    return (
+        Q(queue_due_date__gt=due_date)
+        | Q(queue_due_date=due_date, assignment_id__gt=assignment_id)
+        | Q(queue_due_date=due_date, assignment_id=assignment_id, submitted_at__gt=submitted_at)
+        | Q(queue_due_date=due_date, assignment_id=assignment_id, submitted_at=submitted_at,
+            id__gt=submission_id)
+    )
+
+
+def review_queue_page(teacher, after=None, limit=20):
+    """
+    Get up to ``limit`` pending submissions available to ``teacher`` following
+    the position ``after``, and the position to continue from (None at the end).
+    """
+    submissions = Submission.objects.filter(
+        status=Submission.PENDING, assignment__course__teacher=teacher
+    ).filter(available_to(teacher))
+    if after is not None:
+        submissions = submissions.filter(after_position(after))
+    results = list(
+        submissions.select_related('assignment__course', 'student', 'claimed_by')
+        .with_lateness()
+        .order_by('queue_due_date', 'assignment_id', 'submitted_at', 'id')[:limit + 1]
+    )
+
+    if len(results) <= limit:
+        return results, None
+    results = results[:limit]
+    return results, queue_position(results[-1])
+
+
+def claim_submissions(reviewer, submissions):
+    """
+    Claim ``submissions`` for ``reviewer`` with one conditional update, and
+    return those actually claimed (others may have been claimed meanwhile).
+    """
+    now = timezone.now()
+    ids = [submission.id for submission in submissions]
+    Submission.objects.filter(id__in=ids).filter(available_to(reviewer)).update(
+        claimed_by=reviewer, claimed_at=now
+    )
+    claimed = set(Submission.objects.filter(
+        id__in=ids, claimed_by=reviewer, claimed_at=now
+    ).values_list('id', flat=True))
+
+    results = []
+    for submission in submissions:
+        if submission.id in claimed:
+            submission.claimed_by = reviewer
+            submission.claimed_at = now
+            results.append(submission)
+    return results
+
+
+def release_submission(reviewer, submission):
+    """Release ``reviewer``'s claim on ``submission``; returns whether it held one."""
+    return bool(Submission.objects.filter(id=submission.id, claimed_by=reviewer).update(
+        claimed_by=None, claimed_at=None
+    ))
@@ -0,0 +1,188 @@
+"""
+Due-date reminders for the assignments app.
+
+Each reminder window (in hours, from ``ASSIGNMENT_REMINDER_WINDOWS``) covers the
+assignments due between the next narrower window and itself: with windows of
+1 and 24 hours, an assignment due in 30 minutes gets the 1 hour reminder and
+one due in 10 hours the 24 hour reminder. The students to remind are found with
+one set-difference query per batch of assignments (enrolled students, minus
+those who submitted, minus those already reminded), and all messages go out
+over a single mail connection. ``ReminderLog`` rows are claimed and committed
+before sending, and a run only sends the rows it claimed itself, so repeated
+or overlapping runs never send a reminder twice. A reminder that fails to send
+has its claim released so a later run retries it, and the claims of a run
+that stopped before sending are taken over once they are older than
+``ASSIGNMENT_REMINDER_CLAIM_TTL`` seconds.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from courses.models import Enrollment
+from .models import Assignment, ReminderLog, Submission
+
+logger = logging.getLogger(__name__)
+
+# Assignments whose missing submissions are computed per query
+REMINDER_BATCH_SIZE = 100
+# Reminders claimed in the ledger at once; their messages are then sent one by
+# one over the shared connection, so a failure only affects its own reminder
+REMINDER_SEND_BATCH = 100
+
+REMINDER_SUBJECT = 'Reminder: "{title}" is due {due}'
+REMINDER_BODY = (
+    "Hi {name},\n\n"
+    'The assignment "{title}" in {course} is due {due} and we have not received '
+    "your submission yet.\n"
+)
+
+
+def reminder_bands(windows):
+    """Get ``(window, start, end)`` due-date offsets for each window, narrowest first."""
+    bands = []
+    start = timedelta(0)
+    for window in sorted(set(windows)):
+        end = timedelta(hours=window)
+        bands.append((window, start, end))
+        start = end
+    return bands
+
+
+def due_assignment_ids(start, end):
+    """Get the ids of active assignments in active courses due between ``start`` and ``end``."""
+    return list(Assignment.objects.filter(
+        is_active=True,
+        course__is_active=True,
+        due_date__gt=start,
+        due_date__lte=end,
+    ).order_by('due_date').values_list('id', flat=True))
+
+
+def missing_submissions(assignment_ids, window):
+    """
+    Get a row per enrolled student who has neither submitted to nor been
+    reminded about one of ``assignment_ids`` in ``window``, in one query.
+    Reminders claimed by a run that stopped before sending count as not sent.
+    """
+    matches = {'assignment_id': OuterRef('assignment_id'), 'student_id': OuterRef('student_id')}
+    return Enrollment.objects.filter(
+        is_active=True,
+        student__is_active=True,
+        course__assignments__in=assignment_ids,
+    ).exclude(student__email='').annotate(
+        assignment_id=F('course__assignments__id'),
+    ).exclude(
+        Exists(Submission.objects.filter(**matches))
+    ).exclude(
+        Exists(ReminderLog.objects.filter(live_claims(), window=window, **matches))
+    ).values(
+        'assignment_id', 'student_id', 'student__email', 'student__username',
+        'student__first_name', 'course__title', 'course__assignments__title',
+        'course__assignments__due_date',
+    ).order_by('assignment_id', 'student_id')
+
+
+def build_reminder(row, connection):
+    """Build the reminder email for a ``missing_submissions`` row."""
+    due = timezone.localtime(row['course__assignments__due_date']).strftime('%Y-%m-%d %H:%M %Z')
+    context = {
+        'name': row['student__first_name'] or row['student__username'],
+        'title': row['course__assignments__title'],
+        'course': row['course__title'],
+        'due': due,
+    }
+    return EmailMessage(
+        subject=REMINDER_SUBJECT.format(**context),
+        body=REMINDER_BODY.format(**context),
+        to=[row['student__email']],
+        connection=connection,
+    )
+
+
+def live_claims():
+    """Match ledger rows that were sent, or claimed too recently to be taken over."""
+    cutoff = timezone.now() - timedelta(seconds=settings.ASSIGNMENT_REMINDER_CLAIM_TTL)
+    return Q(sent_at__isnull=False) | Q(claimed_at__gt=cutoff)
+
+
+def _send_batch(rows, window, connection):
+    """
+    Claim the ledger rows of a batch of reminders, then send the ones this run
+    claimed. Returns the number sent.
+    """
+    # Commit the claims before sending; a concurrent run's live claims are left alone
+    claim = uuid.uuid4()
+    now = timezone.now()
+    ReminderLog.objects.bulk_create(
+        [
+            ReminderLog(assignment_id=row['assignment_id'], student_id=row['student_id'],
+                        window=window, claim=claim, claimed_at=now)
+            for row in rows
+        ],
+        ignore_conflicts=True,
+    )
+    # Take over the claims of runs that stopped before sending
+    pairs = Q()
+    for row in rows:
+        pairs |= Q(assignment_id=row['assignment_id'], student_id=row['student_id'])
+    ReminderLog.objects.filter(pairs, window=window).exclude(live_claims()).exclude(claim=claim).update(
+        claim=claim, claimed_at=now
+    )
+    owned = {
+        (assignment_id, student_id): pk
+        for pk, assignment_id, student_id in ReminderLog.objects.filter(claim=claim).values_list(
+            'pk', 'assignment_id', 'student_id'
+        )
+    }
+
+    sent, failed = [], []
+    for row in rows:
+        pk = owned.get((row['assignment_id'], row['student_id']))
+        if pk is None:
+            continue
+        try:
+            connection.send_messages([build_reminder(row, connection)])
+        except Exception:
+            logger.exception(
+                "Reminder for assignment %s to student %s failed", row['assignment_id'], row['student_id']
+            )
+            failed.append(pk)
+        else:
+            sent.append(pk)
+
+    ReminderLog.objects.filter(pk__in=sent).update(sent_at=timezone.now())
+    # Release the claims of undelivered reminders so a later run retries them
+    ReminderLog.objects.filter(pk__in=failed).delete()
+    return len(sent)
+
+
+def send_due_reminders(windows=None, now=None, batch_size=REMINDER_BATCH_SIZE,
+                       send_batch=REMINDER_SEND_BATCH, dry_run=False):
+    """
+    Email every enrolled student who has not submitted an assignment due
+    within one of ``windows`` hours. Returns the number of reminders sent
+    (or due, with ``dry_run``) per window.
+    """
+    if windows is None:
+        windows = settings.ASSIGNMENT_REMINDER_WINDOWS
+    now = now or timezone.now()
+    sent = {}
+
+    connection = get_connection()
+    with connection:
+        for window, start, end in reminder_bands(windows):
+            sent[window] = 0
+            assignment_ids = due_assignment_ids(now + start, now + end)
+            for offset in range(0, len(assignment_ids), batch_size):
+                # Read the whole batch before claiming any of it in the ledger
+                rows = list(missing_submissions(assignment_ids[offset:offset + batch_size], window))
+                for start_row in range(0, len(rows), send_batch):
+                    batch = rows[start_row:start_row + send_batch]
+                    sent[window] += len(batch) if dry_run else _send_batch(batch, window, connection)
+    return sent
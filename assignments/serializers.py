@@ -2,14 +2,21 @@
 Serializers for the assignments app.
 """
 
+import re
+
+from django.conf import settings
 from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Assignment, Submission
+from edutrack.deferred import TruncatableFieldsMixin
+from .models import Assignment, Submission, UploadSession
+from .services import BULK_REVIEW_LIMIT
+from .uploads import missing_chunks, received_chunks, store_uploaded_file
+from courses.membership import is_enrolled
 from courses.models import Course
 
 
-class AssignmentListSerializer(serializers.ModelSerializer):
+class AssignmentListSerializer(TruncatableFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing assignments."""
     
     course_title = serializers.StringRelatedField(source='course.title', read_only=True)
@@ -26,10 +33,16 @@ class AssignmentListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'submission_count', 'course_title']
     
     def get_has_submitted(self, obj):
-        """Check if the current user has submitted this assignment."""
+        """
+        Check if the current user has submitted this assignment.
+        Uses the view's precomputed ``submitted_assignment_ids`` when available.
+        """
         user = self.context['request'].user
         if not user.is_authenticated or user.profile.is_teacher:
             return False
+        submitted_assignment_ids = self.context.get('submitted_assignment_ids')
+        if submitted_assignment_ids is not None:
+            return obj.id in submitted_assignment_ids
         return obj.submissions.filter(student=user).exists()
 
 
@@ -50,7 +63,7 @@ class AssignmentCreateUpdateSerializer(serializers.ModelSerializer):
     
     def validate_course(self, value):
         """Ensure the user is the teacher of the course."""
-        if value.teacher != self.context['request'].user:
+        if value.teacher_id != self.context['request'].user.id:
             raise serializers.ValidationError("You can only create assignments for courses you teach.")
         return value
 
@@ -77,6 +90,21 @@ class SubmissionListSerializer(serializers.ModelSerializer):
         return f"{obj.student.first_name} {obj.student.last_name}".strip() or obj.student.username
 
 
+class ReviewQueueSerializer(SubmissionListSerializer):
+    """Serializer for review queue entries."""
+    
+    course_title = serializers.StringRelatedField(source='assignment.course.title', read_only=True)
+    due_date = serializers.DateTimeField(source='assignment.due_date', read_only=True)
+    
+    class Meta(SubmissionListSerializer.Meta):
+        fields = SubmissionListSerializer.Meta.fields + [
+            'course_title', 'due_date', 'claimed_by', 'claimed_at'
+        ]
+        read_only_fields = SubmissionListSerializer.Meta.read_only_fields + [
+            'course_title', 'due_date', 'claimed_by', 'claimed_at'
+        ]
+
+
 class SubmissionDetailSerializer(serializers.ModelSerializer):
     """Serializer for submission details."""
     
@@ -87,12 +115,12 @@ class SubmissionDetailSerializer(serializers.ModelSerializer):
         model = Submission
         fields = [
             'id', 'assignment', 'assignment_title', 'student', 'student_name',
-            'content', 'file', 'submitted_at', 'status', 'feedback',
-            'reviewed_at', 'is_late'
+            'content', 'file', 'filename', 'submitted_at', 'status', 'feedback',
+            'score', 'reviewed_at', 'is_late'
         ]
         read_only_fields = [
-            'id', 'student', 'student_name', 'submitted_at', 
-            'status', 'assignment_title', 'reviewed_at', 'is_late'
+            'id', 'student', 'student_name', 'filename', 'submitted_at',
+            'status', 'assignment_title', 'score', 'reviewed_at', 'is_late'
         ]
     
     def get_student_name(self, obj):
@@ -101,12 +129,23 @@ class SubmissionDetailSerializer(serializers.ModelSerializer):
 
 
 class SubmissionCreateSerializer(serializers.ModelSerializer):
-    """Serializer for creating submissions."""
+    """
+    Serializer for creating submissions.
+    The file is either uploaded with the request or referenced as a completed
+    chunked ``upload``; both end up stored as a content-addressed blob.
+    """
+    
+    upload = serializers.PrimaryKeyRelatedField(
+        queryset=UploadSession.objects.select_related('blob'),
+        write_only=True,
+        required=False,
+        allow_null=True
+    )
     
     class Meta:
         model = Submission
-        fields = ['id', 'assignment', 'content', 'file']
-        read_only_fields = ['id']
+        fields = ['id', 'assignment', 'content', 'file', 'filename', 'upload']
+        read_only_fields = ['id', 'filename']
     
     def validate_assignment(self, value):
         """
@@ -122,7 +161,7 @@ class SubmissionCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("This assignment is no longer active.")
         
         # Check if student is enrolled in the course
-        if not value.course.students.filter(id=user.id).exists():
+        if not is_enrolled(self.context['request'], value.course_id):
             raise serializers.ValidationError("You must be enrolled in the course to submit assignments.")
         
         # Check if student has already submitted
@@ -131,9 +170,38 @@ class SubmissionCreateSerializer(serializers.ModelSerializer):
         
         return value
     
+    def validate_upload(self, value):
+        """Validate that the upload belongs to the user and is complete."""
+        if value is None:
+            return value
+        if value.owner_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Upload not found.")
+        if value.status != UploadSession.COMPLETE:
+            raise serializers.ValidationError("This upload is not complete yet.")
+        return value
+    
+    def validate(self, data):
+        """Validate that at most one of ``file`` and ``upload`` is given."""
+        if data.get('file') and data.get('upload'):
+            raise serializers.ValidationError("Provide either a file or an upload, not both.")
+        return data
+    
     def create(self, validated_data):
-        """Assign the current user as the student when submitting."""
+        """
+        Assign the current user as the student when submitting, and point the
+        file at the shared blob for its content.
+        """
         validated_data['student'] = self.context['request'].user
+        upload = validated_data.pop('upload', None)
+        uploaded_file = validated_data.pop('file', None)
+        if upload is not None:
+            validated_data['blob'] = upload.blob
+            validated_data['filename'] = upload.filename
+        elif uploaded_file:
+            validated_data['blob'] = store_uploaded_file(uploaded_file)
+            validated_data['filename'] = uploaded_file.name
+        if 'blob' in validated_data:
+            validated_data['file'] = validated_data['blob'].file.name
         return super().create(validated_data)
 
 
@@ -142,11 +210,106 @@ class SubmissionReviewSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Submission
-        fields = ['id', 'feedback', 'status']
+        fields = ['id', 'feedback', 'status', 'score']
         read_only_fields = ['id']
     
     def validate(self, attrs):
-        """Set status to reviewed and add timestamp."""
+        """Check the score against the assignment's points, set status to reviewed and add timestamp."""
+        score = attrs.get('score')
+        if score is not None and score > self.instance.assignment.points:
+            raise serializers.ValidationError({
+                'score': f"Score cannot exceed the assignment's {self.instance.assignment.points} points."
+            })
         attrs['status'] = Submission.REVIEWED
         attrs['reviewed_at'] = timezone.now()
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class BulkReviewItemSerializer(serializers.Serializer):
+    """Serializer for one entry of a bulk review."""
+    
+    id = serializers.IntegerField()
+    feedback = serializers.CharField(required=False, allow_blank=True)
+    status = serializers.ChoiceField(choices=Submission.STATUS_CHOICES, default=Submission.REVIEWED)
+    score = serializers.DecimalField(
+        max_digits=7, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+
+
+class BulkReviewSerializer(serializers.Serializer):
+    """
+    Serializer for reviewing many submissions at once.
+    Entries are validated one by one so a bad entry is reported without failing the batch.
+    """
+    
+    reviews = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=BULK_REVIEW_LIMIT,
+    )
+    
+    def validate_reviews(self, value):
+        """Return each entry's validated data, or its id and errors."""
+        reviews = []
+        for entry in value:
+            item = BulkReviewItemSerializer(data=entry)
+            if item.is_valid():
+                reviews.append(item.validated_data)
+            else:
+                reviews.append({'id': entry.get('id'), 'errors': item.errors})
+        return reviews
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for chunked upload sessions."""
+    
+    chunk_count = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    missing_chunks = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'size', 'sha256', 'chunk_size', 'chunk_count',
+            'status', 'received_chunks', 'missing_chunks', 'created_at', 'completed_at'
+        ]
+        read_only_fields = ['id', 'chunk_size', 'status', 'created_at', 'completed_at']
+    
+    def get_received_chunks(self, obj):
+        """Get the indexes of the chunks staged so far."""
+        if obj.status == UploadSession.COMPLETE:
+            return list(range(obj.chunk_count))
+        return received_chunks(obj)
+    
+    def get_missing_chunks(self, obj):
+        """Get the indexes of the chunks still to be uploaded."""
+        if obj.status == UploadSession.COMPLETE:
+            return []
+        return missing_chunks(obj)
+    
+    def validate_filename(self, value):
+        """Keep only the base name of the uploaded file."""
+        value = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not value:
+            raise serializers.ValidationError("A file name is required.")
+        return value
+    
+    def validate_size(self, value):
+        """Validate that the file is not empty and within the upload limit."""
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+    
+    def validate_sha256(self, value):
+        """Validate the announced digest as 64 hex characters."""
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError("Must be a hex-encoded SHA-256 digest.")
+        return value
+    
+    def create(self, validated_data):
+        """Create the session with the server's chunk size."""
+        validated_data['chunk_size'] = settings.UPLOAD_CHUNK_SIZE
+        return super().create(validated_data)
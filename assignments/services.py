@@ -0,0 +1,504 @@
+"""
+Service functions for the assignments app.
+"""
+
+import logging
+import os
+import re
+import warnings
+import zipfile
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DurationField, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Now
+from django.utils import timezone
+
+from courses.models import Enrollment
+from edutrack.cache import bump_generation
+from .models import Assignment, AssignmentStats, Submission
+
+logger = logging.getLogger(__name__)
+
+# Number of equal-width score buckets in each assignment's distribution
+DISTRIBUTION_BINS = 10
+# Assignments recomputed per upsert when rebuilding submission rollups
+STATS_BATCH_SIZE = 500
+# Maximum number of submissions reviewed in one bulk request
+BULK_REVIEW_LIMIT = 500
+REVIEW_FIELDS = ['feedback', 'status', 'score', 'reviewed_at']
+COUNT_FIELDS = ['submitted_count', 'pending_count', 'reviewed_count', 'late_count']
+STAT_FIELDS = COUNT_FIELDS + ['review_time_total']
+# Submissions read per query when building a submissions archive
+ARCHIVE_BATCH_SIZE = 200
+# Bytes read from storage per archive chunk
+ARCHIVE_READ_SIZE = 256 * 1024
+# Formats that are already compressed, stored in archives without deflating
+STORED_EXTENSIONS = {
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar', '.pdf', '.png', '.jpg', '.jpeg',
+    '.gif', '.webp', '.mp3', '.mp4', '.mov', '.docx', '.xlsx', '.pptx', '.odt',
+}
+ARCHIVE_CONTENT_NAME = 'submission.txt'
+
+
+def _nullable(values, decimals=2):
+    """Round ``values`` and turn NaNs into ``None`` for JSON and CSV output."""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, np.round(values, decimals)).tolist()
+
+
+def _positions(sorted_ids, order, ids):
+    """
+    Map ``ids`` to row positions given ``sorted_ids = keys[order]``.
+    Returns ``(positions, found)``; ids that are not keys are flagged in ``found``.
+    """
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+    index = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return order[index], sorted_ids[index] == ids
+
+
+class Gradebook:
+    """
+    Student x assignment score matrix for a course.
+    
+    ``scores`` holds NaN where a student has not submitted or the submission is
+    not graded yet; ``submitted`` marks the cells with a submission. All
+    statistics are computed over whole arrays, never per cell in Python.
+    """
+    
+    def __init__(self, course, students, assignments, submissions):
+        self.course = course
+        self.students = students
+        self.assignments = assignments
+        self.points = np.array([points for _, _, points, _ in assignments], dtype=float)
+        self.scores = np.full((len(students), len(assignments)), np.nan)
+        self.submitted = np.zeros(self.scores.shape, dtype=bool)
+        
+        if len(submissions):
+            student_ids = np.array([student[0] for student in students], dtype=np.int64)
+            assignment_ids = np.array([assignment[0] for assignment in assignments], dtype=np.int64)
+            student_order = np.argsort(student_ids)
+            assignment_order = np.argsort(assignment_ids)
+            rows, row_found = _positions(
+                student_ids[student_order], student_order, submissions[:, 0].astype(np.int64)
+            )
+            columns, column_found = _positions(
+                assignment_ids[assignment_order], assignment_order, submissions[:, 1].astype(np.int64)
+            )
+            # Drop submissions of students who are no longer actively enrolled
+            keep = row_found & column_found
+            rows, columns = rows[keep], columns[keep]
+            self.scores[rows, columns] = submissions[keep, 2]
+            self.submitted[rows, columns] = True
+    
+    def student_totals(self):
+        """Return per-student ``(total, graded_points, percentage, missing)`` arrays."""
+        graded = ~np.isnan(self.scores)
+        totals = np.nansum(self.scores, axis=1)
+        graded_points = graded.astype(float) @ self.points
+        percentage = np.full(len(self.students), np.nan)
+        np.divide(totals * 100, graded_points, out=percentage, where=graded_points > 0)
+        missing = (~self.submitted).sum(axis=1)
+        return totals, graded_points, percentage, missing
+    
+    def assignment_statistics(self):
+        """Return per-assignment ``(submitted, graded, mean, median, distribution)`` arrays."""
+        graded = ~np.isnan(self.scores)
+        with warnings.catch_warnings():
+            # Assignments without graded submissions have no mean or median
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(self.scores, axis=0)
+            median = np.nanmedian(self.scores, axis=0)
+        
+        # Bucket every graded score by its fraction of the assignment's points,
+        # then count all buckets of all assignments with a single bincount.
+        fractions = self.scores / np.where(self.points > 0, self.points, np.nan)
+        buckets = np.clip(np.floor(fractions * DISTRIBUTION_BINS), 0, DISTRIBUTION_BINS - 1)
+        valid = ~np.isnan(buckets)
+        columns = np.broadcast_to(np.arange(len(self.assignments)), self.scores.shape)
+        flat = columns[valid] * DISTRIBUTION_BINS + buckets[valid].astype(np.intp)
+        distribution = np.bincount(
+            flat, minlength=len(self.assignments) * DISTRIBUTION_BINS
+        ).reshape(len(self.assignments), DISTRIBUTION_BINS)
+        return self.submitted.sum(axis=0), graded.sum(axis=0), mean, median, distribution
+    
+    def as_dict(self):
+        """Return the gradebook and its statistics as JSON-ready data."""
+        totals, graded_points, percentage, missing = self.student_totals()
+        submitted, graded, mean, median, distribution = self.assignment_statistics()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            course_average = np.nanmean(percentage)
+        step = 100 // DISTRIBUTION_BINS
+        
+        assignments = []
+        columns = zip(
+            self.assignments, submitted.tolist(), graded.tolist(),
+            _nullable(mean), _nullable(median), distribution.tolist(),
+        )
+        for (assignment_id, title, points, due_date), *statistics in columns:
+            assignments.append(dict(
+                zip(['submitted', 'graded', 'mean', 'median', 'distribution'], statistics),
+                id=assignment_id, title=title, points=points, due_date=due_date,
+            ))
+        
+        students = []
+        rows = zip(
+            self.students, _nullable(self.scores), _nullable(totals),
+            _nullable(graded_points), _nullable(percentage), missing.tolist(),
+        )
+        for (student_id, username, first_name, last_name), *results in rows:
+            students.append(dict(
+                zip(['scores', 'total', 'graded_points', 'percentage', 'missing'], results),
+                id=student_id, username=username,
+                name=f"{first_name} {last_name}".strip() or username,
+            ))
+        
+        return {
+            'course': self.course.slug,
+            'total_points': _nullable(self.points.sum()),
+            'course_average': _nullable(course_average),
+            'distribution_bins': [f'{start}-{start + step}%' for start in range(0, 100, step)],
+            'assignments': assignments,
+            'students': students,
+        }
+    
+    def csv_header(self):
+        titles = [title for _, title, _, _ in self.assignments]
+        return ['student_id', 'username', 'name', *titles, 'total', 'percentage']
+    
+    def csv_rows(self):
+        """Yield one CSV row per student; ungraded cells are left empty."""
+        totals, _, percentage, _ = self.student_totals()
+        cells = np.where(np.isnan(self.scores), '', np.round(self.scores, 2).astype(str))
+        rows = zip(self.students, cells.tolist(), _nullable(totals), _nullable(percentage))
+        for (student_id, username, first_name, last_name), scores, total, percent in rows:
+            name = f"{first_name} {last_name}".strip() or username
+            yield [student_id, username, name, *scores, total, '' if percent is None else percent]
+
+
+def build_gradebook(course):
+    """
+    Load the gradebook for ``course`` with three queries: the active roster,
+    the active assignments and every submission's score.
+    """
+    students = list(
+        Enrollment.objects.filter(course=course, is_active=True)
+        .order_by('student__last_name', 'student__first_name', 'student__username')
+        .values_list('student_id', 'student__username', 'student__first_name', 'student__last_name')
+    )
+    assignments = list(
+        Assignment.objects.filter(course=course, is_active=True)
+        .order_by(F('due_date').asc(nulls_last=True), 'created_at')
+        .values_list('id', 'title', 'points', 'due_date')
+    )
+    # Scores are read as floats to skip per-row Decimal conversion; NULL scores
+    # become NaN, so ungraded submissions stay visible in ``submitted``.
+    submissions = np.array(
+        list(
+            Submission.objects.filter(assignment__course=course, assignment__is_active=True)
+            .order_by()
+            .values_list('student_id', 'assignment_id', Cast('score', FloatField()))
+        ),
+        dtype=float,
+    ).reshape(-1, 3)
+    return Gradebook(course, students, assignments, submissions)
+
+
+def submission_stat_deltas(status, submitted_at, reviewed_at, due_date, sign=1):
+    """Return one submission's contribution to its assignment's rollup, times ``sign``."""
+    reviewed = status == Submission.REVIEWED
+    review_time = reviewed_at - submitted_at if reviewed and reviewed_at else timedelta(0)
+    return {
+        'submitted_count': sign,
+        'pending_count': sign if status == Submission.PENDING else 0,
+        'reviewed_count': sign if reviewed else 0,
+        'late_count': sign if due_date and submitted_at > due_date else 0,
+        'review_time_total': review_time * sign,
+    }
+
+
+def combine_stat_deltas(*deltas):
+    """Sum several rollup deltas field by field."""
+    combined = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            combined[field] = combined[field] + value if field in combined else value
+    return combined
+
+
+def apply_stat_deltas(assignment_id, deltas):
+    """
+    Add ``deltas`` to an assignment's rollup in a single ``UPDATE`` of F expressions,
+    so concurrent submissions and reviews never overwrite each other. A rollup that
+    is missing or would go negative has drifted and is rebuilt from the submissions.
+    """
+    changes = {field: F(field) + value for field, value in deltas.items() if value}
+    if not changes:
+        return
+    queryset = AssignmentStats.objects.filter(assignment_id=assignment_id)
+    for field, value in deltas.items():
+        if field in COUNT_FIELDS and value < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -value})
+    if not queryset.update(updated_at=Now(), **changes):
+        rebuild_submission_stats(Assignment.objects.filter(pk=assignment_id))
+
+
+def rebuild_submission_stats(assignments=None, batch_size=STATS_BATCH_SIZE):
+    """
+    Recompute the rollups of ``assignments`` (default: all) from the submissions
+    table with one aggregate query, upserting them in batches. Returns the number
+    of assignments rebuilt.
+    """
+    if assignments is None:
+        assignments = Assignment.objects.all()
+    reviewed = Q(submissions__status=Submission.REVIEWED)
+    rows = (
+        assignments.order_by('pk')
+        .annotate(
+            submitted=Count('submissions'),
+            pending=Count('submissions', filter=Q(submissions__status=Submission.PENDING)),
+            reviewed=Count('submissions', filter=reviewed),
+            late=Count('submissions', filter=Q(submissions__submitted_at__gt=F('due_date'))),
+            review_time=Sum(
+                F('submissions__reviewed_at') - F('submissions__submitted_at'),
+                filter=reviewed & Q(submissions__reviewed_at__isnull=False),
+                output_field=DurationField(),
+            ),
+        )
+        .values_list('pk', 'submitted', 'pending', 'reviewed', 'late', 'review_time')
+    )
+    
+    rebuilt = 0
+    batch = []
+    now = timezone.now()
+    for assignment_id, *counts, review_time in rows.iterator(chunk_size=batch_size):
+        batch.append(AssignmentStats(
+            assignment_id=assignment_id,
+            review_time_total=review_time or timedelta(0),
+            updated_at=now,
+            **dict(zip(COUNT_FIELDS, counts)),
+        ))
+        if len(batch) == batch_size:
+            rebuilt += _upsert_stats(batch)
+            batch = []
+    return rebuilt + _upsert_stats(batch)
+
+
+def _upsert_stats(batch):
+    AssignmentStats.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['assignment'],
+        update_fields=STAT_FIELDS + ['updated_at'],
+    )
+    return len(batch)
+
+
+def get_assignment_stats(assignment):
+    """Return the rollup for ``assignment``, rebuilding it if it is missing."""
+    try:
+        return assignment.stats
+    except AssignmentStats.DoesNotExist:
+        rebuild_submission_stats(Assignment.objects.filter(pk=assignment.pk))
+        return AssignmentStats.objects.get(assignment=assignment)
+
+
+def summarize_stats(values):
+    """Turn rollup values (a mapping of ``STAT_FIELDS``) into API output."""
+    summary = {field: values[field] or 0 for field in COUNT_FIELDS}
+    review_time = values['review_time_total'] or timedelta(0)
+    summary['average_review_seconds'] = (
+        round(review_time.total_seconds() / summary['reviewed_count'], 1)
+        if summary['reviewed_count'] else None
+    )
+    return summary
+
+
+def assignment_submission_stats(assignment):
+    """Return the API summary of an assignment's rollup."""
+    stats = get_assignment_stats(assignment)
+    return {
+        'assignment': assignment.id,
+        **summarize_stats({field: getattr(stats, field) for field in STAT_FIELDS}),
+        'updated_at': stats.updated_at,
+    }
+
+
+def course_submission_stats(course):
+    """Aggregate the rollups of a course's assignments; never scans submissions."""
+    totals = AssignmentStats.objects.filter(assignment__course=course).aggregate(
+        assignment_count=Count('pk'),
+        **{field: Sum(field) for field in STAT_FIELDS},
+    )
+    return {
+        'course': course.slug,
+        'assignment_count': totals['assignment_count'],
+        'enrollment_count': course.enrollment_count,
+        **summarize_stats(totals),
+    }
+
+
+def invalidate_submission_caches(submissions):
+    """
+    Drop the cached entries of ``(submission_id, assignment_id)`` pairs in one
+    ``delete_many`` and invalidate the assignment pages once.
+    """
+    keys = set()
+    for submission_id, assignment_id in submissions:
+        keys.update([
+            f'submission_{submission_id}',
+            f'assignment_{assignment_id}_submissions',
+            f'assignment_{assignment_id}',
+        ])
+    if keys:
+        cache.delete_many(list(keys))
+        bump_generation('assignments')
+
+
+def review_submissions(teacher, reviews):
+    """
+    Apply many reviews by ``teacher`` at once.
+
+    ``reviews`` holds ``BulkReviewSerializer`` output. Ownership of the whole batch
+    is checked with one locking query, changes are written with ``bulk_update``, rollups
+    get one UPDATE per assignment and caches are invalidated once. Returns one
+    result per entry: ``reviewed``, ``pending``, ``invalid``, ``duplicate`` or
+    ``not_found`` (which also covers submissions of other teachers' courses).
+    """
+    ids = [review['id'] for review in reviews if 'errors' not in review]
+    with transaction.atomic():
+        # Lock the batch so a concurrent review cannot change a row between
+        # reading its old state and writing the rollup difference
+        submissions = {
+            submission.pk: submission
+            for submission in Submission.objects.select_for_update(of=('self',)).filter(
+                pk__in=ids, assignment__course__teacher=teacher
+            ).select_related('assignment')
+        }
+        results, changed = _apply_reviews(reviews, submissions)
+        if not changed:
+            return results
+        
+        Submission.objects.bulk_update(changed.values(), REVIEW_FIELDS, batch_size=BULK_REVIEW_LIMIT)
+        # bulk_update skips post_save, so apply the rollup differences here
+        for assignment_id, delta in _review_stat_deltas(changed.values()).items():
+            apply_stat_deltas(assignment_id, delta)
+    
+    invalidate_submission_caches(
+        (submission.pk, submission.assignment_id) for submission in changed.values()
+    )
+    return results
+
+
+def _apply_reviews(reviews, submissions):
+    """
+    Apply ``reviews`` to the loaded ``submissions`` in memory and return the
+    per-entry results and the changed submissions keyed by id.
+    """
+    now = timezone.now()
+    results = []
+    changed = {}
+    for review in reviews:
+        submission_id = review['id']
+        if 'errors' in review:
+            results.append({'id': submission_id, 'result': 'invalid', 'errors': review['errors']})
+            continue
+        if submission_id in changed:
+            results.append({'id': submission_id, 'result': 'duplicate'})
+            continue
+        submission = submissions.get(submission_id)
+        if submission is None:
+            results.append({'id': submission_id, 'result': 'not_found'})
+            continue
+        
+        score = review.get('score', submission.score)
+        if score is not None and score > submission.assignment.points:
+            results.append({
+                'id': submission_id,
+                'result': 'invalid',
+                'errors': {'score': [
+                    f"Score cannot exceed the assignment's {submission.assignment.points} points."
+                ]},
+            })
+            continue
+        
+        submission.feedback = review.get('feedback', submission.feedback)
+        submission.score = score
+        submission.status = review['status']
+        submission.reviewed_at = now if review['status'] == Submission.REVIEWED else None
+        changed[submission_id] = submission
+        results.append({'id': submission_id, 'result': submission.status})
+    return results, changed
+
+
+def _review_stat_deltas(submissions):
+    """Return the rollup differences of the reviewed ``submissions`` per assignment id."""
+    deltas = {}
+    for submission in submissions:
+        due_date = submission.assignment.due_date
+        deltas[submission.assignment_id] = combine_stat_deltas(
+            deltas.get(submission.assignment_id, {}),
+            submission_stat_deltas(
+                submission._loaded_status, submission.submitted_at,
+                submission._loaded_reviewed_at, due_date, sign=-1,
+            ),
+            submission_stat_deltas(
+                submission.status, submission.submitted_at, submission.reviewed_at, due_date,
+            ),
+        )
+        submission._loaded_status = submission.status
+        submission._loaded_reviewed_at = submission.reviewed_at
+    return deltas
+
+
+def _archive_name(value):
+    """Make ``value`` safe to use as a single path component in an archive."""
+    return re.sub(r'[^\w.-]+', '_', value).strip('._') or 'file'
+
+
+def _read_chunks(file):
+    """Yield the contents of an opened storage file in chunks, closing it at the end."""
+    try:
+        yield from file.chunks(ARCHIVE_READ_SIZE)
+    finally:
+        file.close()
+
+
+def submission_archive_entries(assignment):
+    """
+    Yield ``stream_zip`` entries for every submission to ``assignment``: a folder
+    per student holding the submitted text and, if any, the submitted file.
+    Submissions are read in batches and files in chunks.
+    """
+    submissions = assignment.submissions.select_related('student').only(
+        'content', 'file', 'filename', 'submitted_at',
+        'student__username', 'student__first_name', 'student__last_name',
+    ).order_by('student__username')
+    
+    for submission in submissions.iterator(chunk_size=ARCHIVE_BATCH_SIZE):
+        student = submission.student
+        full_name = f"{student.first_name} {student.last_name}".strip()
+        folder = _archive_name(f"{full_name}-{student.username}" if full_name else student.username)
+        modified = timezone.localtime(submission.submitted_at)
+        yield (
+            f'{folder}/{ARCHIVE_CONTENT_NAME}', modified, zipfile.ZIP_DEFLATED,
+            [submission.content.encode()],
+        )
+        
+        if not submission.file:
+            continue
+        try:
+            submission.file.open('rb')
+        except FileNotFoundError:
+            logger.warning("Submission %s file %s is missing from storage", submission.pk, submission.file.name)
+            continue
+        name = _archive_name(submission.filename or os.path.basename(submission.file.name))
+        if name == ARCHIVE_CONTENT_NAME:
+            name = f'file-{name}'
+        extension = os.path.splitext(name)[1].lower()
+        compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        yield f'{folder}/{name}', modified, compress_type, _read_chunks(submission.file)
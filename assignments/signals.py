@@ -2,25 +2,100 @@
 Signal handlers for the assignments app.
 """
 
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
 
-from .models import Assignment, Submission
+from courses.models import Course
+from edutrack.cache import bump_generation
+from .models import NO_DUE_DATE, Assignment, AssignmentStats, Submission
+from .services import (
+    apply_stat_deltas,
+    combine_stat_deltas,
+    invalidate_submission_caches,
+    rebuild_submission_stats,
+    submission_stat_deltas,
+)
+from .similarity import index_submission
 
 
 @receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
 def invalidate_assignment_cache(sender, instance, **kwargs):
-    """Invalidate cache for assignment-related views when an assignment is saved."""
+    """Invalidate cache for assignment-related views when an assignment is saved or deleted."""
     cache.delete(f'assignment_{instance.id}')
-    cache.delete(f'course_{instance.course.id}_assignments')
+    cache.delete(f'course_{instance.course_id}_assignments')
+    bump_generation('assignments')
+
+
+@receiver(post_save, sender=Assignment)
+def sync_assignment_stats(sender, instance, created, **kwargs):
+    """
+    Create the rollup of a new assignment. When the due date moves, recount
+    lateness and move the assignment's submissions in the review queue.
+    """
+    if created:
+        AssignmentStats.objects.get_or_create(assignment=instance)
+    elif instance.due_date != getattr(instance, '_loaded_due_date', instance.due_date):
+        rebuild_submission_stats(Assignment.objects.filter(pk=instance.pk))
+        Submission.objects.filter(assignment=instance).update(
+            queue_due_date=instance.due_date or NO_DUE_DATE
+        )
+    instance._loaded_due_date = instance.due_date
 
 
 @receiver(post_save, sender=Submission)
 def handle_submission(sender, instance, created, **kwargs):
     """Handle submission by invalidating cache and updating counts."""
-    cache.delete(f'submission_{instance.id}')
-    cache.delete(f'assignment_{instance.assignment.id}_submissions')
-    
-    # Update submission count for the assignment
-    cache.delete(f'assignment_{instance.assignment.id}')
\ No newline at end of file
+    invalidate_submission_caches([(instance.id, instance.assignment_id)])
+
+
+@receiver(post_save, sender=Submission)
+def update_submission_stats(sender, instance, created, **kwargs):
+    """Apply the difference between the submission's loaded and saved state to the rollup."""
+    due_date = instance.assignment.due_date
+    deltas = submission_stat_deltas(
+        instance.status, instance.submitted_at, instance.reviewed_at, due_date
+    )
+    if not created:
+        deltas = combine_stat_deltas(deltas, submission_stat_deltas(
+            getattr(instance, '_loaded_status', instance.status),
+            instance.submitted_at,
+            getattr(instance, '_loaded_reviewed_at', instance.reviewed_at),
+            due_date,
+            sign=-1,
+        ))
+    instance._loaded_status = instance.status
+    instance._loaded_reviewed_at = instance.reviewed_at
+    apply_stat_deltas(instance.assignment_id, deltas)
+
+
+@receiver(post_save, sender=Submission)
+def fingerprint_submission(sender, instance, created, **kwargs):
+    """Index the content of new or edited submissions for near-duplicate detection."""
+    content_loaded = 'content' in instance.__dict__
+    if created or (content_loaded and instance.content != getattr(instance, '_loaded_content', None)):
+        index_submission(instance)
+    if content_loaded:
+        instance._loaded_content = instance.content
+
+
+@receiver(post_delete, sender=Submission)
+def remove_submission_stats(sender, instance, origin=None, **kwargs):
+    """Take a deleted submission out of its assignment's rollup."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model in (Assignment, Course):
+        # The assignment, and its rollup, are being deleted too
+        return
+    due_date = Assignment.objects.filter(pk=instance.assignment_id).values_list(
+        'due_date', flat=True
+    ).first()
+    apply_stat_deltas(instance.assignment_id, submission_stat_deltas(
+        getattr(instance, '_loaded_status', instance.status),
+        instance.submitted_at,
+        getattr(instance, '_loaded_reviewed_at', instance.reviewed_at),
+        due_date,
+        sign=-1,
+    ))
+    bump_generation('assignments')
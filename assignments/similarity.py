@@ -0,0 +1,267 @@
+"""
+Near-duplicate detection for submission content.
+
+Content is split into overlapping word shingles and summarized by a MinHash
+signature of ``NUM_PERMUTATIONS`` 32-bit values: the fraction of equal values
+in two signatures estimates the Jaccard similarity of their shingle sets.
+Signatures are cut into ``BANDS`` bands of ``ROWS`` values (locality-sensitive
+hashing); submissions sharing any band's hash land in the same bucket and are
+the only pairs compared, so finding similar submissions scales with the
+number of submissions rather than the number of pairs.
+"""
+
+import re
+import zlib
+
+import numpy as np
+from django.db import connection, transaction
+
+from .models import SimilarityBucket, Submission, SubmissionFingerprint
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: pairs above ~0.42 estimated similarity usually share a bucket
+BANDS = 32
+ROWS = NUM_PERMUTATIONS // BANDS
+# Minimum estimated Jaccard similarity reported as a near-duplicate
+SIMILARITY_THRESHOLD = 0.5
+# Submissions fingerprinted and written per batch when rescanning
+RESCAN_BATCH_SIZE = 1000
+# Shingles hashed at once; bounds the permutation matrix to a few megabytes
+SHINGLE_BLOCK = 4096
+
+# Universal hashing (a * x + b) mod p over the Mersenne prime 2^31 - 1; the
+# products fit in 64 bits. The fixed seed keeps signatures stable across processes.
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)
+PERMUTATION_A = _rng.integers(1, (1 << 31) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _rng.integers(0, (1 << 31) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+_WORD = re.compile(r'\w+')
+
+
+def shingle_hashes(text):
+    """Get the distinct hashes of the ``SHINGLE_SIZE``-word shingles of ``text``."""
+    tokens = np.array(
+        [zlib.crc32(token.encode()) for token in _WORD.findall(text.lower())],
+        dtype=np.uint64,
+    )
+    if tokens.size == 0:
+        return tokens
+    if tokens.size < SHINGLE_SIZE:
+        tokens = np.pad(tokens, (0, SHINGLE_SIZE - tokens.size))
+    shingles = np.zeros(tokens.size - SHINGLE_SIZE + 1, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        # Unsigned arithmetic wraps, which is all a hash combination needs
+        shingles = shingles * np.uint64(1000003) + tokens[offset:offset + shingles.size]
+    return np.unique(shingles % MERSENNE_PRIME)
+
+
+def minhash(shingles):
+    """Get the MinHash signature of a set of shingle hashes, or None if it is empty."""
+    if shingles.size == 0:
+        return None
+    signature = np.full(NUM_PERMUTATIONS, MERSENNE_PRIME, dtype=np.uint64)
+    for start in range(0, shingles.size, SHINGLE_BLOCK):
+        block = shingles[start:start + SHINGLE_BLOCK]
+        hashed = (np.outer(block, PERMUTATION_A) + PERMUTATION_B) % MERSENNE_PRIME
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_keys(signatures):
+    """
+    Get the LSH bucket key of every band of each signature as an ``(n, BANDS)``
+    int64 array. Keys include the band index, so bands never collide.
+    """
+    bands = np.atleast_2d(signatures).reshape(-1, BANDS, ROWS).astype(np.uint64)
+    keys = np.broadcast_to(
+        _FNV_OFFSET ^ np.arange(BANDS, dtype=np.uint64), bands.shape[:2]
+    ).copy()
+    for row in range(ROWS):
+        keys = (keys ^ bands[:, :, row]) * _FNV_PRIME
+    return keys.view(np.int64)
+
+
+def to_signature(data):
+    """Decode a stored signature."""
+    return np.frombuffer(bytes(data), dtype=np.uint32)
+
+
+def similarity(signature, others):
+    """Estimate the Jaccard similarity of ``signature`` to each row of ``others``."""
+    return (np.atleast_2d(others) == signature).mean(axis=1)
+
+
+def _insert_buckets(assignment_id, submission_ids, keys):
+    """
+    Insert the bucket rows of ``submission_ids`` (one row of ``keys`` each).
+    Rows are written with multi-row INSERTs rather than ``bulk_create``: at
+    ``BANDS`` rows per submission, building model instances dominates a rescan.
+    """
+    rows = [
+        (assignment_id, submission_id, key)
+        for submission_id, submission_keys in zip(submission_ids, keys.tolist())
+        for key in submission_keys
+    ]
+    if not rows:
+        return
+    meta = SimilarityBucket._meta
+    columns = [meta.get_field(name).column for name in ('assignment', 'submission', 'key')]
+    batch_size = max(connection.ops.bulk_batch_size(columns, rows), 1)
+    insert = 'INSERT INTO {} ({}) VALUES '.format(
+        connection.ops.quote_name(meta.db_table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                insert + ', '.join(['(%s, %s, %s)'] * len(batch)),
+                [value for row in batch for value in row],
+            )
+
+
+def _write_index(assignment_id, submission_ids, signatures, shingle_counts):
+    """Insert the fingerprints and buckets of a batch of submissions."""
+    if not submission_ids:
+        return 0
+    signatures = np.stack(signatures)
+    SubmissionFingerprint.objects.bulk_create([
+        SubmissionFingerprint(
+            submission_id=submission_id,
+            assignment_id=assignment_id,
+            signature=signature.tobytes(),
+            shingle_count=shingle_count,
+        )
+        for submission_id, signature, shingle_count in zip(submission_ids, signatures, shingle_counts)
+    ])
+    _insert_buckets(assignment_id, submission_ids, band_keys(signatures))
+    return len(submission_ids)
+
+
+def index_submission(submission):
+    """(Re)compute the fingerprint and buckets of one submission."""
+    shingles = shingle_hashes(submission.content)
+    signature = minhash(shingles)
+    with transaction.atomic():
+        SubmissionFingerprint.objects.filter(submission_id=submission.pk).delete()
+        SimilarityBucket.objects.filter(submission_id=submission.pk).delete()
+        if signature is None:
+            # Nothing to compare: empty submissions are never reported as copies
+            return
+        _write_index(submission.assignment_id, [submission.pk], [signature], [shingles.size])
+
+
+def rescan_assignment(assignment, batch_size=RESCAN_BATCH_SIZE):
+    """
+    Rebuild the fingerprints and buckets of every submission to ``assignment``.
+    Each submission is read and hashed once. Returns the number indexed.
+    """
+    submissions = Submission.objects.filter(assignment=assignment).values_list('id', 'content')
+    indexed = 0
+    with transaction.atomic():
+        SubmissionFingerprint.objects.filter(assignment=assignment).delete()
+        SimilarityBucket.objects.filter(assignment=assignment).delete()
+        batch = ([], [], [])
+        for submission_id, content in submissions.iterator(chunk_size=batch_size):
+            shingles = shingle_hashes(content)
+            signature = minhash(shingles)
+            if signature is None:
+                continue
+            for values, value in zip(batch, (submission_id, signature, shingles.size)):
+                values.append(value)
+            if len(batch[0]) == batch_size:
+                indexed += _write_index(assignment.pk, *batch)
+                batch = ([], [], [])
+        indexed += _write_index(assignment.pk, *batch)
+    return indexed
+
+
+def candidate_pairs(keys):
+    """
+    Get the index pairs ``(i, j)``, ``i < j``, of rows of ``keys`` sharing at
+    least one bucket, as an ``(m, 2)`` array.
+    """
+    count = keys.shape[0]
+    flat = keys.ravel()
+    rows = np.repeat(np.arange(count), keys.shape[1])
+    order = np.argsort(flat, kind='stable')
+    flat, rows = flat[order], rows[order]
+    # Boundaries of runs of equal keys; only runs of two or more hold candidates
+    starts = np.flatnonzero(np.r_[True, flat[1:] != flat[:-1]])
+    ends = np.r_[starts[1:], flat.size]
+
+    pairs = []
+    for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+        members = rows[start:end]
+        first, second = np.triu_indices(members.size, k=1)
+        pairs.append(members[first] * count + members[second])
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    encoded = np.unique(np.concatenate(pairs))
+    return np.column_stack((encoded // count, encoded % count))
+
+
+def similar_pairs(ids, signatures, threshold=SIMILARITY_THRESHOLD):
+    """
+    Get ``(id, other_id, similarity)`` for every pair of ``signatures`` with an
+    estimated similarity of at least ``threshold``, most similar first.
+    """
+    if len(ids) < 2:
+        return []
+    ids = np.asarray(ids)
+    signatures = np.asarray(signatures)
+    pairs = candidate_pairs(band_keys(signatures))
+    scores = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    keep = scores >= threshold
+    pairs, scores = pairs[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')
+    return [
+        (int(ids[first]), int(ids[second]), round(float(score), 3))
+        for (first, second), score in zip(pairs[order], scores[order])
+    ]
+
+
+def assignment_similar_pairs(assignment, threshold=SIMILARITY_THRESHOLD):
+    """Find the near-duplicate pairs among the indexed submissions of ``assignment``."""
+    rows = list(SubmissionFingerprint.objects.filter(assignment=assignment).order_by(
+        'submission_id'
+    ).values_list('submission_id', 'signature'))
+    if not rows:
+        return []
+    ids, signatures = zip(*rows)
+    return similar_pairs(ids, np.stack([to_signature(data) for data in signatures]), threshold)
+
+
+def similar_submissions(submission, threshold=SIMILARITY_THRESHOLD):
+    """
+    Get ``(fingerprint, similarity)`` for the submissions to the same assignment
+    that are near-duplicates of ``submission``, most similar first. Only
+    submissions sharing an LSH bucket with it are loaded.
+    """
+    own = SubmissionFingerprint.objects.filter(submission_id=submission.pk).first()
+    if own is None:
+        return []
+    keys = SimilarityBucket.objects.filter(submission_id=submission.pk).values('key')
+    shared = SimilarityBucket.objects.filter(
+        assignment_id=submission.assignment_id, key__in=keys
+    ).values('submission_id')
+    candidates = list(SubmissionFingerprint.objects.filter(
+        submission_id__in=shared
+    ).exclude(submission_id=submission.pk).select_related('submission__student').defer(
+        'submission__content', 'submission__feedback'
+    ))
+    if not candidates:
+        return []
+
+    scores = similarity(
+        to_signature(own.signature), np.stack([to_signature(c.signature) for c in candidates])
+    )
+    matches = [
+        (candidate, round(float(score), 3))
+        for candidate, score in zip(candidates, scores) if score >= threshold
+    ]
+    return sorted(matches, key=lambda match: -match[1])
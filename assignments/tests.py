@@ -1,3 +1,625 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import uuid
+import zipfile
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from courses.models import Course, Enrollment
+from edutrack.testing import loads_column
+from .models import Assignment, AssignmentStats, FileBlob, ReminderLog, Submission, UploadSession
+from .reminders import send_due_reminders
+from .services import rebuild_submission_stats
+from .similarity import candidate_pairs
+from .uploads import purge_stale_uploads, staging_dir
+
+
+class ListDeferredColumnsTests(APITestCase):
+    """Assignment and submission lists must not load text columns their serializers don't render."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.course = Course.objects.create(
+            title='Course', description='Course description. ' * 50, teacher=self.teacher
+        )
+        self.assignment = Assignment.objects.create(
+            title='Essay', description='Assignment description. ' * 50, course=self.course
+        )
+        self.client.force_authenticate(self.teacher)
+    
+    def add_submissions(self, count):
+        for index in range(count):
+            student = User.objects.create_user(f'student{Submission.objects.count()}', password='pw')
+            Enrollment.objects.create(course=self.course, student=student)
+            Submission.objects.create(
+                assignment=self.assignment, student=student, content='Essay text. ' * 500,
+                feedback='Feedback. ' * 100
+            )
+    
+    def list_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, context.captured_queries
+    
+    def test_submission_list_defers_content_and_feedback(self):
+        self.add_submissions(3)
+        response, queries = self.list_queries('/api/submissions/')
+        
+        self.assertEqual(len(response.data['results']), 3)
+        for column in ('content', 'feedback'):
+            self.assertFalse(loads_column(queries, 'assignments_submission', column))
+        self.assertFalse(loads_column(queries, 'assignments_assignment', 'description'))
+        self.assertFalse(loads_column(queries, 'courses_course', 'description'))
+    
+    def test_submission_list_does_not_load_deferred_columns_per_row(self):
+        self.add_submissions(1)
+        _, single = self.list_queries('/api/submissions/')
+        self.add_submissions(4)
+        _, several = self.list_queries('/api/submissions/')
+        
+        self.assertEqual(len(single), len(several))
+    
+    def test_assignment_list_defers_course_description(self):
+        response, queries = self.list_queries('/api/assignments/')
+        
+        self.assertEqual(response.data['results'][0]['description'], 'Assignment description. ' * 50)
+        self.assertFalse(loads_column(queries, 'courses_course', 'description'))
+    
+    def test_assignment_list_truncates_description_in_the_database(self):
+        response, queries = self.list_queries('/api/assignments/', truncate=10)
+        
+        self.assertEqual(response.data['results'][0]['description'], 'Assignment')
+        self.assertFalse(loads_column(queries, 'assignments_assignment', 'description'))
+    
+    def test_submission_detail_still_includes_content(self):
+        self.add_submissions(1)
+        submission = Submission.objects.get()
+        response = self.client.get(f'/api/submissions/{submission.pk}/')
+        
+        self.assertEqual(response.data['content'], 'Essay text. ' * 500)
+
+
+class ReviewQueueTests(APITestCase):
+    """The review queue pages through pending work in due order, skipping other reviewers' claims."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.other_teacher = User.objects.create_user('other', password='pw')
+        course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        now = timezone.now()
+        self.later = Assignment.objects.create(
+            title='Later', description='x', course=course, due_date=now + timedelta(days=5)
+        )
+        self.undated = Assignment.objects.create(title='Undated', description='x', course=course)
+        self.sooner = Assignment.objects.create(
+            title='Sooner', description='x', course=course, due_date=now + timedelta(days=1)
+        )
+        for index in range(5):
+            student = User.objects.create_user(f'student{index}', password='pw')
+            for assignment in (self.later, self.undated, self.sooner):
+                Submission.objects.create(assignment=assignment, student=student, content='x')
+        Submission.objects.filter(assignment=self.later, student__username='student0').update(
+            status=Submission.REVIEWED
+        )
+        self.client.force_authenticate(self.teacher)
+    
+    def walk(self):
+        """Follow the queue's next links and return the assignment titles in order."""
+        titles, url = [], '/api/submissions/review-queue/'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 10)
+            titles.extend(item['assignment_title'] for item in response.data['results'])
+            url = response.data['next']
+        return titles
+    
+    def test_pages_follow_due_order_with_undated_assignments_last(self):
+        self.assertEqual(self.walk(), ['Sooner'] * 5 + ['Later'] * 4 + ['Undated'] * 5)
+    
+    def test_due_date_change_moves_submissions_in_the_queue(self):
+        self.undated.due_date = timezone.now()
+        self.undated.save()
+        self.sooner.due_date = None
+        self.sooner.save()
+        
+        self.assertEqual(self.walk(), ['Undated'] * 5 + ['Later'] * 4 + ['Sooner'] * 5)
+    
+    def test_claims_hide_submissions_from_other_reviewers(self):
+        response = self.client.get('/api/submissions/review-queue/', {'claim': 'true'})
+        claimed = [item['id'] for item in response.data['results']]
+        self.assertEqual(len(claimed), 10)
+        self.assertEqual(
+            Submission.objects.filter(id__in=claimed, claimed_by=self.teacher).count(), 10
+        )
+        
+        Submission.objects.filter(id__in=claimed[:2]).update(claimed_by=self.other_teacher)
+        self.assertEqual(len(self.walk()), 12)
+        self.assertEqual(self.client.post(f'/api/submissions/{claimed[0]}/claim/').status_code, 409)
+        self.assertEqual(self.client.post(f'/api/submissions/{claimed[2]}/release/').status_code, 204)
+        self.assertIsNone(Submission.objects.get(id=claimed[2]).claimed_by)
+
+
+class BulkReviewTests(APITestCase):
+    """Bulk review reports each entry's outcome and keeps the rollups in step with the rows."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        other_teacher = User.objects.create_user('other', password='pw')
+        course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        other_course = Course.objects.create(title='Other', description='About', teacher=other_teacher)
+        self.assignment = Assignment.objects.create(
+            title='Essay', description='x', course=course, points=10,
+            due_date=timezone.now() - timedelta(days=1),
+        )
+        other_assignment = Assignment.objects.create(title='Other', description='x', course=other_course)
+        self.submissions = [
+            Submission.objects.create(
+                assignment=self.assignment,
+                student=User.objects.create_user(f'student{index}', password='pw'),
+                content='x',
+            )
+            for index in range(3)
+        ]
+        self.foreign = Submission.objects.create(
+            assignment=other_assignment, student=User.objects.create_user('outsider', password='pw')
+        )
+        self.client.force_authenticate(self.teacher)
+    
+    def review(self, reviews):
+        response = self.client.post('/api/submissions/bulk-review/', {'reviews': reviews}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+    
+    def test_results_per_entry(self):
+        first, second, third = self.submissions
+        data = self.review([
+            {'id': first.pk, 'score': '8'},
+            {'id': first.pk, 'score': '9'},
+            {'id': second.pk, 'score': '11'},
+            {'id': third.pk, 'status': 'bogus'},
+            {'id': self.foreign.pk},
+            {'id': 0},
+        ])
+        
+        self.assertEqual(
+            [result['result'] for result in data['results']],
+            ['reviewed', 'duplicate', 'invalid', 'invalid', 'not_found', 'not_found'],
+        )
+        self.assertIn('score', data['results'][2]['errors'])
+        self.assertIn('status', data['results'][3]['errors'])
+        self.assertEqual(data['summary'], {'reviewed': 1, 'duplicate': 1, 'invalid': 2, 'not_found': 2})
+        
+        first.refresh_from_db()
+        self.assertEqual(first.status, Submission.REVIEWED)
+        self.assertEqual(first.score, 8)
+        self.assertEqual(Submission.objects.filter(status=Submission.REVIEWED).count(), 1)
+    
+    def test_rollup_matches_a_rebuild(self):
+        first, second, third = self.submissions
+        self.review([{'id': first.pk, 'score': '8'}, {'id': second.pk, 'score': '5'}])
+        self.review([{'id': second.pk, 'status': Submission.PENDING}, {'id': third.pk, 'score': '7'}])
+        
+        fields = ['submitted_count', 'pending_count', 'reviewed_count', 'late_count', 'review_time_total']
+        stats = AssignmentStats.objects.filter(assignment=self.assignment).values(*fields).get()
+        self.assertEqual(stats['reviewed_count'], 2)
+        self.assertEqual(stats['pending_count'], 1)
+        
+        rebuild_submission_stats(Assignment.objects.filter(pk=self.assignment.pk))
+        self.assertEqual(AssignmentStats.objects.filter(assignment=self.assignment).values(*fields).get(), stats)
+
+
+class LateSubmissionTests(APITestCase):
+    """Lateness is computed and filtered in SQL against each assignment's due date."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        other_course = Course.objects.create(title='Other', description='About', teacher=self.teacher)
+        now = timezone.now()
+        self.student = User.objects.create_user('student', password='pw')
+        for title, target, due_date in [
+            ('Overdue', course, now - timedelta(days=1)),
+            ('Upcoming', course, now + timedelta(days=1)),
+            ('Undated', course, None),
+            ('Elsewhere', other_course, now - timedelta(days=2)),
+        ]:
+            assignment = Assignment.objects.create(title=title, description='x', course=target, due_date=due_date)
+            Submission.objects.create(assignment=assignment, student=self.student, content='x')
+        self.course = course
+        self.client.force_authenticate(self.teacher)
+    
+    def titles(self, query):
+        response = self.client.get(f'/api/submissions/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['assignment_title']: row['is_late'] for row in response.data['results']}
+    
+    def test_annotation_matches_the_model(self):
+        self.assertEqual(
+            self.titles(''), {'Overdue': True, 'Upcoming': False, 'Undated': False, 'Elsewhere': True}
+        )
+        for submission in Submission.objects.with_lateness():
+            self.assertEqual(submission.is_late, Submission.objects.get(pk=submission.pk).is_late)
+    
+    def test_filter_by_lateness_and_course(self):
+        self.assertEqual(set(self.titles('is_late=true')), {'Overdue', 'Elsewhere'})
+        self.assertEqual(set(self.titles('is_late=false')), {'Upcoming', 'Undated'})
+        self.assertEqual(set(self.titles(f'is_late=true&course={self.course.pk}')), {'Overdue'})
+    
+    def test_order_by_lateness(self):
+        response = self.client.get('/api/submissions/?ordering=-is_late')
+        self.assertEqual([row['is_late'] for row in response.data['results']], [True, True, False, False])
+
+
+class SubmissionArchiveTests(APITestCase):
+    """The submissions archive streams a folder per student with the text and any file."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(title='Essay', description='x', course=course)
+        ada = User.objects.create_user('ada', password='pw', first_name='Ada', last_name='Lovelace')
+        bob = User.objects.create_user('bob', password='pw')
+        gone = User.objects.create_user('gone', password='pw')
+        Submission.objects.create(
+            assignment=self.assignment, student=ada, content='Notes',
+            file=SimpleUploadedFile('notes.pdf', b'%PDF' * 1000), filename='../My notes.pdf',
+        )
+        Submission.objects.create(assignment=self.assignment, student=bob, content='Just text')
+        Submission.objects.create(
+            assignment=self.assignment, student=gone, content='Lost', file='submissions/missing.txt',
+        )
+        self.client.force_authenticate(self.teacher)
+    
+    def test_archive(self):
+        with self.assertLogs('assignments.services', 'WARNING'):
+            response = self.client.get(f'/api/assignments/{self.assignment.pk}/submissions/archive/')
+            content = b''.join(response.streaming_content)
+        
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.namelist(), [
+            'Ada_Lovelace-ada/submission.txt',
+            'Ada_Lovelace-ada/My_notes.pdf',
+            'bob/submission.txt',
+            'gone/submission.txt',
+        ])
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read('bob/submission.txt'), b'Just text')
+        self.assertEqual(archive.read('Ada_Lovelace-ada/My_notes.pdf'), b'%PDF' * 1000)
+        self.assertEqual(archive.getinfo('Ada_Lovelace-ada/My_notes.pdf').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('bob/submission.txt').compress_type, zipfile.ZIP_DEFLATED)
+
+
+class SimilarSubmissionTests(APITestCase):
+    """Near-duplicate submissions to an assignment are paired through shared LSH buckets."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(title='Essay', description='x', course=course)
+        other_assignment = Assignment.objects.create(title='Report', description='x', course=course)
+        words = [f'word{index}' for index in range(60)]
+        copied = words[:30] + ['changed'] + words[31:]
+        self.original = self.submit('original', ' '.join(words))
+        self.copy = self.submit('copier', ' '.join(copied).upper())
+        self.submit('honest', ' '.join(f'other{index}' for index in range(60)))
+        self.submit('elsewhere', ' '.join(words), assignment=other_assignment)
+        self.client.force_authenticate(self.teacher)
+    
+    def submit(self, username, content, assignment=None):
+        return Submission.objects.create(
+            assignment=assignment or self.assignment,
+            student=User.objects.create_user(username, password='pw'),
+            content=content,
+        )
+    
+    def test_candidate_pairs_share_a_bucket(self):
+        keys = np.array([[1, 2], [3, 2], [5, 6], [5, 7], [8, 9]])
+        self.assertEqual(candidate_pairs(keys).tolist(), [[0, 1], [2, 3]])
+    
+    def test_assignment_pairs(self):
+        response = self.client.get(f'/api/assignments/{self.assignment.pk}/similar-submissions/')
+        
+        self.assertEqual(response.status_code, 200, response.data)
+        (pair,) = response.data['pairs']
+        self.assertEqual({pair['student'], pair['other_student']}, {'original', 'copier'})
+        self.assertGreater(pair['similarity'], 0.8)
+        
+        response = self.client.get(f'/api/assignments/{self.assignment.pk}/similar-submissions/?threshold=2')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_similar_to_one_submission(self):
+        response = self.client.get(f'/api/submissions/{self.original.pk}/similar/')
+        
+        self.assertEqual([result['id'] for result in response.data['results']], [self.copy.pk])
+    
+    def test_edited_content_is_reindexed(self):
+        self.copy.content = ' '.join(f'fresh{index}' for index in range(60))
+        self.copy.save()
+        
+        response = self.client.get(f'/api/submissions/{self.original.pk}/similar/')
+        self.assertEqual(response.data['results'], [])
+
+
+class SubmissionStatsTests(APITestCase):
+    """Rollups kept up by the signal handlers match a rebuild from the submissions table."""
+    
+    FIELDS = ['submitted_count', 'pending_count', 'reviewed_count', 'late_count', 'review_time_total']
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(
+            title='Essay', description='x', course=self.course, due_date=timezone.now() - timedelta(days=1)
+        )
+        self.submissions = [
+            Submission.objects.create(
+                assignment=self.assignment,
+                student=User.objects.create_user(f'student{index}', password='pw'),
+                content='x',
+            )
+            for index in range(3)
+        ]
+    
+    def stats(self):
+        return AssignmentStats.objects.filter(assignment=self.assignment).values(*self.FIELDS).get()
+    
+    def assert_matches_rebuild(self):
+        maintained = self.stats()
+        rebuild_submission_stats(Assignment.objects.filter(pk=self.assignment.pk))
+        self.assertEqual(maintained, self.stats())
+        return maintained
+    
+    def test_review_delete_and_due_date_change(self):
+        first, second, third = self.submissions
+        first.status = Submission.REVIEWED
+        first.reviewed_at = first.submitted_at + timedelta(hours=2)
+        first.save()
+        Submission.objects.get(pk=second.pk).delete()
+        stats = self.assert_matches_rebuild()
+        self.assertEqual(
+            [stats['submitted_count'], stats['pending_count'], stats['reviewed_count'], stats['late_count']],
+            [2, 1, 1, 2],
+        )
+        self.assertEqual(stats['review_time_total'], timedelta(hours=2))
+        
+        self.assignment.due_date = timezone.now() + timedelta(days=1)
+        self.assignment.save()
+        self.assertEqual(self.assert_matches_rebuild()['late_count'], 0)
+        
+        third.status = Submission.REVIEWED
+        third.reviewed_at = third.submitted_at + timedelta(hours=1)
+        third.save()
+        third.status = Submission.PENDING
+        third.reviewed_at = None
+        third.save()
+        self.assertEqual(self.assert_matches_rebuild()['reviewed_count'], 1)
+    
+    def test_course_stats_sum_the_rollups(self):
+        other = Assignment.objects.create(title='Report', description='x', course=self.course)
+        Submission.objects.create(assignment=other, student=User.objects.get(username='student0'), content='x')
+        self.client.force_authenticate(self.teacher)
+        
+        data = self.client.get(f'/api/courses/{self.course.slug}/stats/').data
+        self.assertEqual(data['assignment_count'], 2)
+        self.assertEqual(data['submitted_count'], 4)
+        self.assertEqual(data['late_count'], 3)
+        self.assertIsNone(data['average_review_seconds'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AssignmentListCacheTests(APITestCase):
+    """The assignment list is served from the cache until an assignment changes."""
+    
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        course = Course.objects.create(title='Course', description='About', teacher=teacher)
+        Enrollment.objects.create(course=course, student=self.student)
+        self.assignment = Assignment.objects.create(title='Essay', description='x', course=course)
+        self.client.force_authenticate(self.student)
+    
+    def test_assignment_edit_invalidates_the_list(self):
+        self.client.get('/api/assignments/')
+        self.assertEqual(self.client.get('/api/assignments/')['X-Cache'], 'HIT')
+        
+        self.assignment.title = 'Report'
+        self.assignment.save()
+        
+        response = self.client.get('/api/assignments/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Report')
+
+
+class AssignmentDetailConditionalGetTests(APITestCase):
+    """Assignment detail answers If-None-Match with 304 until the student's view of it changes."""
+    
+    def setUp(self):
+        teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        course = Course.objects.create(title='Course', description='About', teacher=teacher)
+        Enrollment.objects.create(course=course, student=self.student)
+        self.assignment = Assignment.objects.create(title='Essay', description='x', course=course)
+        self.url = f'/api/assignments/{self.assignment.pk}/'
+        self.client.force_authenticate(self.student)
+    
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_submission_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Submission.objects.create(assignment=self.assignment, student=self.student, content='Done')
+        
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.data['has_submitted'])
+
+
+@override_settings(UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(APITestCase):
+    """Chunks can arrive in any order; completed uploads are checked and stored once per digest."""
+    
+    CONTENT = b'abcdefghij'
+    
+    def setUp(self):
+        self.student = User.objects.create_user('student', password='pw')
+        self.client.force_authenticate(self.student)
+    
+    def start(self, **fields):
+        fields = {'filename': 'essay.txt', 'size': len(self.CONTENT), **fields}
+        response = self.client.post('/api/uploads/', fields, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+    
+    def put_chunk(self, upload_id, index, data):
+        return self.client.put(
+            f'/api/uploads/{upload_id}/chunks/{index}/', data, content_type='application/octet-stream'
+        )
+    
+    def upload(self, order=(0, 1, 2), **fields):
+        upload_id = self.start(**fields)
+        for index in order:
+            response = self.put_chunk(upload_id, index, self.CONTENT[index * 4:index * 4 + 4])
+            self.assertEqual(response.status_code, 200, response.data)
+        return upload_id
+    
+    def complete(self, upload_id):
+        return self.client.post(f'/api/uploads/{upload_id}/complete/')
+    
+    def test_chunks_out_of_order(self):
+        upload_id = self.upload(order=(2, 0))
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['missing_chunks'], [1])
+        self.assertEqual(self.complete(upload_id).status_code, 400)
+        
+        self.put_chunk(upload_id, 1, b'efgh')
+        response = self.complete(upload_id)
+        
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['status'], UploadSession.COMPLETE)
+        self.assertEqual(response.data['sha256'], hashlib.sha256(self.CONTENT).hexdigest())
+        with UploadSession.objects.get(pk=upload_id).blob.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.CONTENT)
+    
+    def test_chunk_of_the_wrong_size_is_rejected(self):
+        upload_id = self.start()
+        
+        self.assertEqual(self.put_chunk(upload_id, 0, b'abc').status_code, 400)
+        self.assertEqual(self.put_chunk(upload_id, 0, b'abcde').status_code, 400)
+        self.assertEqual(self.put_chunk(upload_id, 2, b'ijk').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['missing_chunks'], [0, 1, 2])
+    
+    def test_sha256_mismatch_is_rejected(self):
+        upload_id = self.upload(sha256='0' * 64)
+        
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, UploadSession.PENDING)
+        self.assertFalse(FileBlob.objects.exists())
+    
+    def test_completing_twice_returns_the_same_blob(self):
+        upload_id = self.upload()
+        
+        first = self.complete(upload_id)
+        second = self.complete(upload_id)
+        self.assertEqual(second.status_code, 200, second.data)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(FileBlob.objects.count(), 1)
+    
+    def test_identical_uploads_share_one_blob(self):
+        first, second = self.upload(), self.upload(order=(1, 2, 0))
+        self.complete(first)
+        self.complete(second)
+        
+        sessions = UploadSession.objects.filter(pk__in=[first, second])
+        self.assertEqual(len({session.blob_id for session in sessions}), 1)
+        self.assertEqual(FileBlob.objects.count(), 1)
+    
+    def test_purge_keeps_the_files_of_complete_sessions(self):
+        complete = self.upload()
+        self.complete(complete)
+        pending = self.upload(order=(0,))
+        blob = UploadSession.objects.get(pk=complete).blob
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        
+        self.assertEqual(purge_stale_uploads(max_age=60 * 60), 2)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertTrue(FileBlob.objects.filter(pk=blob.pk).exists())
+        self.assertTrue(blob.file.storage.exists(blob.file.name))
+        self.assertFalse(os.path.exists(staging_dir(UploadSession(pk=pending))))
+
+
+@override_settings(ASSIGNMENT_REMINDER_CLAIM_TTL=600)
+class DueRemindersTests(APITestCase):
+    """Reminders go out once per student, assignment and window, even across reruns."""
+    
+    def setUp(self):
+        teacher = User.objects.create_user('teacher', password='pw')
+        course = Course.objects.create(title='Course', description='About', teacher=teacher)
+        self.students = [
+            User.objects.create_user(f'student{index}', email=f'student{index}@example.com', password='pw')
+            for index in range(3)
+        ]
+        for student in self.students:
+            Enrollment.objects.create(course=course, student=student)
+        self.assignment = Assignment.objects.create(
+            title='Essay', description='x', course=course, due_date=timezone.now() + timedelta(minutes=30)
+        )
+        Submission.objects.create(assignment=self.assignment, student=self.students[0], content='x')
+    
+    def test_rerun_sends_nothing(self):
+        self.assertEqual(send_due_reminders(windows=[1]), {1: 2})
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['student1@example.com', 'student2@example.com'],
+        )
+        
+        self.assertEqual(send_due_reminders(windows=[1]), {1: 0})
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(ReminderLog.objects.filter(sent_at__isnull=False).count(), 2)
+    
+    def test_claims_of_a_crashed_run_are_taken_over_after_the_ttl(self):
+        for student, age in ((self.students[1], 60), (self.students[2], 3600)):
+            ReminderLog.objects.create(
+                assignment=self.assignment, student=student, window=1, claim=uuid.uuid4(),
+                claimed_at=timezone.now() - timedelta(seconds=age),
+            )
+        
+        self.assertEqual(send_due_reminders(windows=[1]), {1: 1})
+        self.assertEqual([message.to[0] for message in mail.outbox], ['student2@example.com'])
+        self.assertIsNotNone(ReminderLog.objects.get(student=self.students[2]).sent_at)
+        self.assertIsNone(ReminderLog.objects.get(student=self.students[1]).sent_at)
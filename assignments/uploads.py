@@ -0,0 +1,197 @@
+"""
+Chunked, resumable file uploads for the assignments app.
+
+An ``UploadSession`` stages each chunk as ``<index>.part`` under
+``UPLOAD_STAGING_ROOT/<session id>/``. Chunks can arrive in any order and be
+retried; completing the session streams them in order through SHA-256 into a
+single file, which is stored once per digest as a ``FileBlob`` under
+``blobs/ab/cd/<sha256>``. Identical files therefore share one stored blob.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import FileBlob, UploadSession, blob_path
+
+# Bytes read from the request or from disk per iteration
+READ_SIZE = 64 * 1024
+
+
+def staging_dir(session):
+    """Get the directory holding the staged chunks of ``session``."""
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, str(session.pk))
+
+
+def received_chunks(session):
+    """Get the sorted indexes of the chunks staged for ``session``."""
+    try:
+        names = os.listdir(staging_dir(session))
+    except FileNotFoundError:
+        return []
+    indexes = []
+    for name in names:
+        index, _, suffix = name.partition('.')
+        if suffix == 'part' and index.isdigit():
+            indexes.append(int(index))
+    return sorted(indexes)
+
+
+def missing_chunks(session):
+    """Get the indexes of the chunks still to be uploaded for ``session``."""
+    return sorted(set(range(session.chunk_count)) - set(received_chunks(session)))
+
+
+def write_chunk(session, index, stream):
+    """
+    Stage chunk ``index`` of ``session`` from ``stream``.
+    The chunk is written to a temporary file and moved into place, so a retried
+    or interrupted upload never leaves a partial chunk behind.
+    """
+    if session.status != UploadSession.PENDING:
+        raise ValueError("This upload is already complete.")
+    if not 0 <= index < session.chunk_count:
+        raise ValueError(f"Chunk index must be between 0 and {session.chunk_count - 1}.")
+
+    expected = session.expected_chunk_size(index)
+    directory = staging_dir(session)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as destination:
+            # Read one byte past the expected size to detect oversized chunks
+            while written <= expected:
+                data = stream.read(min(READ_SIZE, expected + 1 - written))
+                if not data:
+                    break
+                destination.write(data)
+                written += len(data)
+        if written != expected:
+            raise ValueError(f"Chunk {index} must be exactly {expected} bytes.")
+        os.replace(temp_path, os.path.join(directory, f'{index}.part'))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=Now())
+
+
+def hash_file(file):
+    """Get the SHA-256 hex digest and size of ``file``, leaving it rewound."""
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for data in iter(lambda: file.read(READ_SIZE), b''):
+        digest.update(data)
+        size += len(data)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def store_blob(file, sha256, size):
+    """
+    Get the blob for content ``sha256``, storing ``file`` only when no blob
+    with that digest exists yet.
+    """
+    blob = FileBlob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    path = blob_path(sha256)
+    if not default_storage.exists(path):
+        saved = default_storage.save(path, File(file))
+        if saved != path:
+            # A concurrent upload of the same content stored it first
+            default_storage.delete(saved)
+    blob, _ = FileBlob.objects.get_or_create(
+        sha256=sha256, defaults={'size': size, 'file': path}
+    )
+    return blob
+
+
+def store_uploaded_file(uploaded_file):
+    """Store a file uploaded in one request as a content-addressed blob."""
+    sha256, size = hash_file(uploaded_file)
+    return store_blob(uploaded_file, sha256, size)
+
+
+def assemble_upload(session):
+    """
+    Join the staged chunks of ``session`` into a blob and mark it complete.
+    Chunks are hashed while they are copied, so the file is read only once.
+
+    The session row is locked while assembling, so a concurrent completion of
+    the same session waits and then gets the blob this one stored.
+    """
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        for name in ('status', 'blob_id', 'sha256', 'completed_at', 'updated_at'):
+            setattr(session, name, getattr(locked, name))
+        if session.status == UploadSession.COMPLETE:
+            return session.blob
+
+        missing = missing_chunks(session)
+        if missing:
+            raise ValueError(f"Missing chunks: {', '.join(map(str, missing[:20]))}.")
+
+        directory = staging_dir(session)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.TemporaryFile(dir=directory) as assembled:
+            for index in range(session.chunk_count):
+                with open(os.path.join(directory, f'{index}.part'), 'rb') as chunk:
+                    for data in iter(lambda: chunk.read(READ_SIZE), b''):
+                        digest.update(data)
+                        assembled.write(data)
+                        size += len(data)
+
+            sha256 = digest.hexdigest()
+            if size != session.size:
+                raise ValueError(f"Assembled {size} bytes, expected {session.size}.")
+            if session.sha256 and sha256 != session.sha256:
+                raise ValueError("The assembled file does not match the announced SHA-256.")
+
+            assembled.seek(0)
+            blob = store_blob(assembled, sha256, size)
+
+        session.blob = blob
+        session.sha256 = sha256
+        session.status = UploadSession.COMPLETE
+        session.completed_at = timezone.now()
+        session.save(update_fields=['blob', 'sha256', 'status', 'completed_at', 'updated_at'])
+    discard_chunks(session)
+    return blob
+
+
+def discard_chunks(session):
+    """Remove the staged chunks of ``session``."""
+    shutil.rmtree(staging_dir(session), ignore_errors=True)
+
+
+def purge_stale_uploads(max_age=None):
+    """
+    Delete upload sessions untouched for ``max_age`` seconds, along with the
+    staged chunks of pending ones. Complete sessions only lose their row: their
+    chunks were discarded on completion and their blob, which submissions
+    reference directly, is kept with its file. Returns the number of sessions
+    deleted.
+    """
+    if max_age is None:
+        max_age = settings.UPLOAD_SESSION_TTL
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+    for session in stale.filter(status=UploadSession.PENDING).only('pk'):
+        discard_chunks(session)
+    deleted, _ = stale.delete()
+    return deleted
@@ -5,11 +5,12 @@ URL configuration for the assignments app.
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import AssignmentViewSet, SubmissionViewSet
+from .views import AssignmentViewSet, SubmissionViewSet, UploadViewSet
 
 router = DefaultRouter()
 router.register(r'assignments', AssignmentViewSet)
 router.register(r'submissions', SubmissionViewSet, basename='submission')
+router.register(r'uploads', UploadViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,17 +2,24 @@
 Views for the assignments app.
 """
 
-from django.db.models import Count, Q
+import io
+
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Assignment, Submission
+from .filters import SubmissionFilter
+from .models import Assignment, Submission, UploadSession
 from .permissions import (
     IsAssignmentTeacher,
     IsEnrolledStudentOrTeacher,
@@ -28,21 +35,65 @@ from .serializers import (
     SubmissionDetailSerializer,
     SubmissionCreateSerializer,
     SubmissionReviewSerializer,
+    BulkReviewSerializer,
+    ReviewQueueSerializer,
+    UploadSessionSerializer,
+)
+from .services import (
+    assignment_submission_stats,
+    review_submissions,
+    submission_archive_entries,
 )
+from .queue import (
+    claim_submissions,
+    decode_position,
+    encode_position,
+    release_submission,
+    review_queue_page,
+)
+from .similarity import SIMILARITY_THRESHOLD, assignment_similar_pairs, similar_submissions
+from .uploads import assemble_upload, discard_chunks, write_chunk
 from courses.models import Course
+from edutrack.cache import cache_response
+from edutrack.deferred import DeferredColumnsMixin
+from edutrack.idempotency import idempotent
+from edutrack.conditional import conditional_get, list_validators, object_lookup
+from edutrack.search import FullTextSearchFilter
+from edutrack.utils import stream_zip
 from users.permissions import IsTeacher, IsStudent
 
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+def similarity_threshold(request):
+    """Get the ``?threshold=`` similarity cut-off, between 0 and 1."""
+    value = request.query_params.get('threshold')
+    if not value:
+        return SIMILARITY_THRESHOLD
+    try:
+        threshold = float(value)
+        if not 0 < threshold <= 1:
+            raise ValueError
+    except ValueError:
+        raise ValidationError({'threshold': 'Must be a number greater than 0 and at most 1.'})
+    return threshold
+
+
+class AssignmentViewSet(DeferredColumnsMixin, viewsets.ModelViewSet):
     """
     API endpoint for assignments.
     """
-    queryset = Assignment.objects.annotate(submission_count=Count('submissions'))
+    # Submission counts come from the precomputed rollup, not a live COUNT
+    queryset = Assignment.objects.select_related('course').annotate(
+        submission_count=Coalesce(F('stats__submitted_count'), 0)
+    )
     serializer_class = AssignmentListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['course', 'is_active']
     search_fields = ['title', 'description']
     ordering_fields = ['title', 'created_at', 'due_date', 'submission_count']
+    keyset_ordering_fields = ['created_at']
+    truncatable_fields = ['description']
+    # Set per action (e.g. ``submit``) for ScopedSlidingWindowThrottle
+    throttle_scope = None
     ordering = ['-created_at']
     
     def get_permissions(self):
@@ -51,7 +102,9 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         - create/update/delete: must be the course teacher
         - list/retrieve: must be enrolled or the teacher
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in [
+            'create', 'update', 'partial_update', 'destroy', 'stats', 'archive', 'similar_submissions'
+        ]:
             permission_classes = [IsAuthenticated, IsAssignmentTeacher]
         elif self.action == 'submit':
             permission_classes = [IsAuthenticated, CanSubmitAssignment]
@@ -65,6 +118,8 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             return AssignmentDetailSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return AssignmentCreateUpdateSerializer
+        elif self.action == 'submit':
+            return SubmissionCreateSerializer
         return AssignmentListSerializer
     
     def get_queryset(self):
@@ -78,7 +133,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         course_id = self.request.query_params.get('course')
         
         # Base queryset with annotation
-        queryset = Assignment.objects.annotate(submission_count=Count('submissions'))
+        queryset = self.queryset
         
         # Filter by course if specified
         if course_id:
@@ -96,7 +151,116 @@ class AssignmentViewSet(viewsets.ModelViewSet):
                 is_active=True
             )
     
-    @action(detail=True, methods=['post'], serializer_class=SubmissionCreateSerializer)
+    def get_submitted_assignment_ids(self, assignments):
+        """Return the IDs of the given assignments the current student has submitted, in one query."""
+        user = self.request.user
+        if not user.is_authenticated or user.profile.is_teacher:
+            return set()
+        return set(
+            Submission.objects.filter(
+                student=user,
+                assignment_id__in=[assignment.id for assignment in assignments],
+            ).values_list('assignment_id', flat=True)
+        )
+    
+    def get_submission_context(self, assignments):
+        """Serializer context carrying the batch-computed submission state for ``assignments``."""
+        context = self.get_serializer_context()
+        context['submitted_assignment_ids'] = self.get_submitted_assignment_ids(assignments)
+        return context
+    
+    def get_list_validators(self):
+        """Validators for the assignment list, from the filtered queryset."""
+        return list_validators(self.request, self.filter_queryset(self.get_queryset()), 'assignments')
+    
+    def get_detail_validators(self):
+        """
+        Validators for a single assignment: its own, its course's and its rollup's
+        timestamps, the submission count and the user's submission.
+        """
+        has_submitted = Submission.objects.filter(assignment=OuterRef('pk'), student=self.request.user)
+        row = (
+            self.filter_queryset(self.get_queryset())
+            .filter(**object_lookup(self))
+            .annotate(user_submitted=Exists(has_submitted))
+            .values(
+                'id', 'updated_at', 'course__updated_at', 'submission_count',
+                'stats__updated_at', 'user_submitted',
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        return list(row.values())
+    
+    @conditional_get('get_list_validators')
+    @cache_response('assignments')
+    def list(self, request, *args, **kwargs):
+        """List assignments with the student's submission state resolved per page."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        assignments = page if page is not None else list(queryset)
+        
+        serializer = self.get_serializer(
+            assignments, many=True, context=self.get_submission_context(assignments)
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    @conditional_get('get_detail_validators')
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an assignment with its submission state resolved up front."""
+        assignment = self.get_object()
+        serializer = self.get_serializer(assignment, context=self.get_submission_context([assignment]))
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Get the submission rollup of an assignment."""
+        assignment = self.get_object()
+        return Response(assignment_submission_stats(assignment))
+    
+    @action(detail=True, methods=['get'], url_path='submissions/archive')
+    def archive(self, request, pk=None):
+        """
+        Stream a ZIP of every submission: a folder per student with the
+        submitted text and file. The archive is built while it is sent.
+        """
+        assignment = self.get_object()
+        response = StreamingHttpResponse(
+            stream_zip(submission_archive_entries(assignment)), content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="assignment-{assignment.pk}-submissions.zip"'
+        # Keep proxies from buffering the whole archive before relaying it
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @action(detail=True, methods=['get'], url_path='similar-submissions')
+    def similar_submissions(self, request, pk=None):
+        """List the pairs of near-duplicate submissions to an assignment, most similar first."""
+        assignment = self.get_object()
+        threshold = similarity_threshold(request)
+        pairs = assignment_similar_pairs(assignment, threshold)
+        ids = {submission_id for pair in pairs for submission_id in pair[:2]}
+        students = dict(Submission.objects.filter(id__in=ids).values_list('id', 'student__username'))
+        return Response({
+            'assignment': assignment.id,
+            'threshold': threshold,
+            'pairs': [
+                {
+                    'submission': first,
+                    'student': students.get(first),
+                    'other_submission': second,
+                    'other_student': students.get(second),
+                    'similarity': score,
+                }
+                for first, second, score in pairs
+            ],
+        })
+    
+    @action(detail=True, methods=['post'], serializer_class=SubmissionCreateSerializer, throttle_scope='submit')
+    @idempotent('submit')
     def submit(self, request, pk=None):
         """Submit an assignment."""
         assignment = self.get_object()
@@ -111,7 +275,8 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data={
             'assignment': assignment.id,
             'content': request.data.get('content', ''),
-            'file': request.data.get('file')
+            'file': request.data.get('file'),
+            'upload': request.data.get('upload'),
         })
         
         if serializer.is_valid():
@@ -120,14 +285,15 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SubmissionViewSet(viewsets.ModelViewSet):
+class SubmissionViewSet(DeferredColumnsMixin, viewsets.ModelViewSet):
     """
     API endpoint for submissions.
     """
     serializer_class = SubmissionListSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['assignment', 'status']
-    ordering_fields = ['submitted_at', 'reviewed_at']
+    filterset_class = SubmissionFilter
+    ordering_fields = ['submitted_at', 'reviewed_at', 'is_late']
+    keyset_ordering_fields = ['submitted_at']
     ordering = ['-submitted_at']
     http_method_names = ['get', 'post', 'patch', 'head', 'options']  # No PUT or DELETE
     
@@ -138,21 +304,29 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Submission.objects.none()
         
+        # Join what the serializers and permission checks read, and compute lateness in SQL
+        queryset = Submission.objects.select_related(
+            'assignment__course', 'student'
+        ).with_lateness()
+        
         if user.profile.is_teacher:
             # Teachers see submissions for assignments in their courses
-            return Submission.objects.filter(assignment__course__teacher=user)
+            return queryset.filter(assignment__course__teacher=user)
         else:
             # Students see their own submissions
-            return Submission.objects.filter(student=user)
+            return queryset.filter(student=user)
     
     def get_permissions(self):
         """
         Set permissions based on action:
         - retrieve: must be the submission owner or the teacher
-        - review: must be the teacher
+        - review/similar/claim/release: must be the teacher
+        - bulk_review/review_queue: must be a teacher
         """
-        if self.action == 'review':
+        if self.action in ['review', 'similar', 'claim', 'release']:
             permission_classes = [IsAuthenticated, CanReviewSubmission]
+        elif self.action in ['bulk_review', 'review_queue']:
+            permission_classes = [IsAuthenticated, IsTeacher]
         else:
             permission_classes = [IsAuthenticated, IsSubmissionOwnerOrTeacher]
         return [permission() for permission in permission_classes]
@@ -163,6 +337,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             return SubmissionDetailSerializer
         elif self.action == 'review':
             return SubmissionReviewSerializer
+        elif self.action == 'bulk_review':
+            return BulkReviewSerializer
+        elif self.action == 'review_queue':
+            return ReviewQueueSerializer
         elif self.action == 'create':
             return SubmissionCreateSerializer
         return SubmissionListSerializer
@@ -179,4 +357,136 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 reviewed_at=timezone.now()
             )
             return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-review')
+    def bulk_review(self, request):
+        """Review many submissions in one request and report the outcome of each."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = review_submissions(request.user, serializer.validated_data['reviews'])
+        summary = {}
+        for result in results:
+            summary[result['result']] = summary.get(result['result'], 0) + 1
+        return Response({'summary': summary, 'results': results})
+    
+    @action(detail=False, methods=['get'], url_path='review-queue')
+    def review_queue(self, request):
+        """
+        List the pending submissions of all the teacher's courses, by assignment
+        due date and then submission time. Submissions claimed by another
+        reviewer are skipped; ``?claim=true`` claims the returned page.
+        """
+        cursor_param = self.paginator.cursor_query_param
+        after = None
+        if request.query_params.get(cursor_param):
+            try:
+                after = decode_position(request.query_params[cursor_param])
+            except ValueError:
+                raise NotFound(self.paginator.invalid_cursor_message)
+        
+        submissions, next_position = review_queue_page(
+            request.user, after, limit=self.paginator.get_page_size(request)
+        )
+        if request.query_params.get('claim') in ('1', 'true'):
+            submissions = claim_submissions(request.user, submissions)
+        
+        next_link = None
+        if next_position is not None:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), cursor_param, encode_position(next_position)
+            )
+        return Response({
+            'next': next_link,
+            'results': self.get_serializer(submissions, many=True).data,
+        })
+    
+    @action(detail=True, methods=['post'])
+    def claim(self, request, pk=None):
+        """Claim a submission so co-reviewers skip it in the review queue."""
+        submission = self.get_object()
+        if not claim_submissions(request.user, [submission]):
+            return Response(
+                {'detail': 'This submission is claimed by another reviewer.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'id': submission.id, 'claimed_at': submission.claimed_at})
+    
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Release the current user's claim on a submission."""
+        submission = self.get_object()
+        if not release_submission(request.user, submission):
+            return Response(
+                {'detail': 'You do not hold a claim on this submission.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """List the submissions to the same assignment that are near-duplicates of this one."""
+        submission = self.get_object()
+        threshold = similarity_threshold(request)
+        return Response({
+            'submission': submission.id,
+            'threshold': threshold,
+            'results': [
+                {
+                    'id': fingerprint.submission_id,
+                    'student': fingerprint.submission.student.username,
+                    'similarity': score,
+                }
+                for fingerprint, score in similar_submissions(submission, threshold)
+            ],
+        })
+
+
+class UploadViewSet(mixins.CreateModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    API endpoint for resumable, chunked file uploads.
+    
+    Create a session with the file's name and size (and optionally its SHA-256),
+    PUT each chunk's raw bytes to ``chunks/{index}/``, then POST ``complete/``.
+    Retrieving the session lists the chunks still missing, so an interrupted
+    upload resumes where it stopped. Submit the completed session's id as
+    ``upload`` instead of a file.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsStudent]
+    
+    def get_queryset(self):
+        """Users only see their own uploads."""
+        return UploadSession.objects.filter(owner=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+    
+    def perform_destroy(self, instance):
+        """Abort the upload and discard its staged chunks."""
+        discard_chunks(instance)
+        instance.delete()
+    
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """Store one chunk, streamed from the raw request body."""
+        session = self.get_object()
+        try:
+            write_chunk(session, int(index), request.stream or io.BytesIO())
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Assemble the staged chunks into a stored file."""
+        session = self.get_object()
+        try:
+            assemble_upload(session)
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
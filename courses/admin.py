@@ -22,13 +22,8 @@ class CourseAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description', 'teacher__username')
     prepopulated_fields = {'slug': ('title',)}
     autocomplete_fields = ['teacher']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'enrollment_count']
     inlines = [EnrollmentInline]
-    
-    def enrollment_count(self, obj):
-        """Get enrollment count for the admin list display."""
-        return obj.students.count()
-    enrollment_count.short_description = 'Enrollments'
 
 
 @admin.register(Enrollment)
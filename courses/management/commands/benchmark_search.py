@@ -0,0 +1,99 @@
+"""
+Management command to benchmark course search backends.
+"""
+
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from courses.models import Course
+from edutrack.search import FullTextSearchFilter
+
+SUBJECTS = (
+    'introduction advanced python django databases algorithms statistics biology '
+    'chemistry physics history literature economics design networks security '
+    'calculus geometry music painting writing marketing finance robotics ethics '
+    'psychology philosophy astronomy ecology genetics linguistics'
+).split()
+SYLLABLES = 'ka lo mi ne ru sa ti vo ze pa qui bel dor fen gar hul'.split()
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the seeded catalog once the benchmark is done."""
+
+
+class BenchmarkView:
+    """Minimal stand-in for CourseViewSet as seen by the filter backends."""
+    search_fields = ['title', 'description']
+
+
+class Command(BaseCommand):
+    """Compare FullTextSearchFilter with DRF's SearchFilter on a seeded catalog."""
+
+    help = 'Benchmark indexed full-text search against ILIKE search on a seeded course catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=100_000, help='Number of courses to seed.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per search term.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the catalog.')
+        parser.add_argument(
+            'terms', nargs='*', default=['python', 'advanced statistics', 'robotics ethics'],
+            help='Search terms to benchmark.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['courses'], options['seed'])
+                self.run(options['terms'], options['repeat'])
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            self.stdout.write('Seeded catalog rolled back.')
+
+    def seed(self, total, seed):
+        rng = random.Random(seed)
+        # Filler vocabulary so subject words are selective, as in a real catalog
+        filler = sorted({
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+            for _ in range(3000)
+        })
+        teacher = User.objects.create(username=f'benchmark-teacher-{seed}')
+        batch = []
+        started = time.perf_counter()
+        for index in range(total):
+            title = ' '.join(rng.choice(SUBJECTS) for _ in range(2)).title()
+            words = [rng.choice(filler) for _ in range(60)] + [rng.choice(SUBJECTS)]
+            rng.shuffle(words)
+            description = ' '.join(words)
+            batch.append(Course(
+                title=title, description=description, teacher=teacher, slug=f'benchmark-{index}',
+            ))
+            if len(batch) == 5000:
+                Course.objects.bulk_create(batch)
+                batch = []
+        Course.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {total} courses in {time.perf_counter() - started:.1f}s')
+
+    def run(self, terms, repeat):
+        factory = APIRequestFactory()
+        view = BenchmarkView()
+        backends = [('SearchFilter', SearchFilter()), ('FullTextSearchFilter', FullTextSearchFilter())]
+
+        self.stdout.write(f"{'term':<24}{'backend':<24}{'matches':>10}{'best ms':>10}")
+        for term in terms:
+            request = Request(factory.get('/api/courses/', {'search': term}))
+            for name, backend in backends:
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    queryset = backend.filter_queryset(request, Course.objects.all(), view)
+                    matches = queryset.count()
+                    list(queryset[:10])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f'{term:<24}{name:<24}{matches:>10}{min(timings):>10.1f}')
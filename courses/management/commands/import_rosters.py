@@ -0,0 +1,64 @@
+"""
+Management command to bulk-enroll students from roster files.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.services import ENROLLMENT_BATCH_SIZE, import_rosters, parse_roster_csv
+
+
+class Command(BaseCommand):
+    """
+    Enroll students in courses from a CSV file with ``course`` and
+    ``student``/``username``/``email`` columns, or a JSON file mapping course
+    slugs to lists of usernames/emails.
+    """
+
+    help = 'Bulk-enroll students in courses from a CSV or JSON roster file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv or .json).')
+        parser.add_argument(
+            '--batch-size', type=int, default=ENROLLMENT_BATCH_SIZE,
+            help='Users resolved and enrollments inserted per query.',
+        )
+        parser.add_argument(
+            '--report', help='Write the per-row results to this JSON file.',
+        )
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(options['path'])
+        report = import_rosters(rows, batch_size=options['batch_size'])
+
+        for slug, results in report.items():
+            summary = {}
+            for result in results:
+                summary[result['status']] = summary.get(result['status'], 0) + 1
+            counts = ', '.join(f'{status}={count}' for status, count in sorted(summary.items()))
+            self.stdout.write(f'{slug}: {counts}')
+
+        if options['report']:
+            with open(options['report'], 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(rows)} roster row(s).'))
+
+    def read_rows(self, path):
+        """Return ``(row_number, course_slug, identifier)`` tuples from the roster file."""
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as roster:
+                if path.endswith('.json'):
+                    data = json.load(roster)
+                    return [
+                        (row_number, slug, str(identifier))
+                        for slug, identifiers in data.items()
+                        for row_number, identifier in enumerate(identifiers, start=1)
+                    ]
+                rows = parse_roster_csv(roster)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if any(not slug for _, slug, _ in rows):
+            raise CommandError('Every CSV row needs a course slug in a "course" column.')
+        return rows
@@ -0,0 +1,34 @@
+"""
+Management command to repair drifted course enrollment counters.
+"""
+
+from django.core.management.base import BaseCommand
+
+from courses.services import reconcile_enrollment_counts
+from edutrack.cache import bump_generation
+
+
+class Command(BaseCommand):
+    """Recompute ``Course.enrollment_count`` from active enrollments where it has drifted."""
+
+    help = 'Reconcile stored course enrollment counts with the active enrollments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted courses without updating them.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drifted = reconcile_enrollment_counts(dry_run=dry_run)
+
+        if drifted and not dry_run:
+            bump_generation('courses')
+
+        for course_id, stored, actual in drifted:
+            self.stdout.write(f'Course {course_id}: stored {stored}, actual {actual}')
+
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} drifted course(s).'))
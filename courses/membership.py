@@ -0,0 +1,88 @@
+"""
+Course membership for the courses app.
+
+Permission checks need to know which courses a user is enrolled in and which
+they teach. Both sets of course ids are read with one query, cached across
+requests under the user's id and memoized on the request, so any number of
+checks in a request cost at most one query (none once cached). The Enrollment
+and Course signal handlers and ``bulk_enroll`` invalidate the cached sets.
+
+As with ``course.students``, any enrollment row counts as membership.
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import IntegerField, Value
+
+from .models import Course, Enrollment
+
+MEMBERSHIP_PREFIX = 'membership'
+MEMBERSHIP_TIMEOUT = 60 * 60
+
+ENROLLED, TAUGHT = 0, 1
+
+Membership = namedtuple('Membership', ['enrolled', 'taught'])
+NO_MEMBERSHIP = Membership(frozenset(), frozenset())
+
+
+def _membership_key(user_id):
+    return f'{MEMBERSHIP_PREFIX}:{user_id}'
+
+
+def load_membership(user_id):
+    """Read the ids of the courses a user is enrolled in and teaches, in one query."""
+    kind = IntegerField()
+    rows = Enrollment.objects.filter(student_id=user_id).annotate(
+        kind=Value(ENROLLED, output_field=kind)
+    ).values_list('course_id', 'kind').order_by().union(
+        Course.objects.filter(teacher_id=user_id).annotate(
+            kind=Value(TAUGHT, output_field=kind)
+        ).values_list('id', 'kind').order_by(),
+        all=True,
+    )
+    enrolled, taught = set(), set()
+    for course_id, row_kind in rows:
+        (taught if row_kind == TAUGHT else enrolled).add(course_id)
+    return Membership(frozenset(enrolled), frozenset(taught))
+
+
+def user_membership(user_id):
+    """Get a user's ``Membership``, from the cache when possible."""
+    key = _membership_key(user_id)
+    membership = cache.get(key)
+    if membership is None:
+        membership = load_membership(user_id)
+        cache.set(key, membership, MEMBERSHIP_TIMEOUT)
+    return membership
+
+
+def get_membership(request):
+    """Get the ``Membership`` of the request's user, memoized on the request."""
+    membership = getattr(request, '_course_membership', None)
+    if membership is None:
+        user = request.user
+        membership = user_membership(user.pk) if user.is_authenticated else NO_MEMBERSHIP
+        request._course_membership = membership
+    return membership
+
+
+def is_enrolled(request, course_id):
+    """Check whether the request's user is enrolled in a course."""
+    return course_id in get_membership(request).enrolled
+
+
+def teaches(request, course_id):
+    """Check whether the request's user teaches a course."""
+    return course_id in get_membership(request).taught
+
+
+def invalidate_membership(*user_ids):
+    """Drop the cached membership of users, now and once the transaction commits."""
+    keys = [_membership_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # A concurrent request may cache the old membership before the change is visible
+    transaction.on_commit(lambda: cache.delete_many(keys))
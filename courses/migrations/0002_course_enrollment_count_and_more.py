@@ -0,0 +1,41 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:29
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_enrollment_count(apps, schema_editor):
+    """Populate the new counter from the existing active enrollments."""
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    active = (
+        Enrollment.objects.filter(course=OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('course')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Course.objects.update(
+        enrollment_count=Coalesce(Subquery(active, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['enrollment_count'], name='courses_cou_enrollm_f5bddc_idx'),
+        ),
+        migrations.RunPython(backfill_enrollment_count, migrations.RunPython.noop),
+    ]
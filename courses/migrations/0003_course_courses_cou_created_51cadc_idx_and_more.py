@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_enrollment_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created_at'], name='courses_cou_created_51cadc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['enrolled_at'], name='courses_enr_enrolle_4b9ba6_idx'),
+        ),
+    ]
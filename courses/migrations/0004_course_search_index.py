@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# Full-text index over (title, description). The PostgreSQL expression must
+# match edutrack.search.postgres_search_vector for queries to use the index;
+# on SQLite the columns are mirrored into an FTS5 table kept in sync by triggers.
+CREATE_SEARCH_INDEX = {
+    'postgresql': [
+        """
+        CREATE INDEX courses_course_search_idx ON courses_course USING gin ((
+            setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A')
+            || setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B')
+        ))
+        """,
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE courses_course_fts USING fts5(
+            title, description, content='courses_course', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER courses_course_fts_ai AFTER INSERT ON courses_course BEGIN
+            INSERT INTO courses_course_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER courses_course_fts_ad AFTER DELETE ON courses_course BEGIN
+            INSERT INTO courses_course_fts(courses_course_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER courses_course_fts_au AFTER UPDATE ON courses_course BEGIN
+            INSERT INTO courses_course_fts(courses_course_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO courses_course_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        "INSERT INTO courses_course_fts(courses_course_fts) VALUES ('rebuild')",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'postgresql': [
+        'DROP INDEX IF EXISTS courses_course_search_idx',
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS courses_course_fts_ai',
+        'DROP TRIGGER IF EXISTS courses_course_fts_ad',
+        'DROP TRIGGER IF EXISTS courses_course_fts_au',
+        'DROP TABLE IF EXISTS courses_course_fts',
+    ],
+}
+
+
+def create_course_search_index(apps, schema_editor):
+    for statement in CREATE_SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_course_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_courses_cou_created_51cadc_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_course_search_index, drop_course_search_index),
+    ]
@@ -2,11 +2,67 @@
 Models for the courses app.
 """
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.db.models import Q
 from django.utils.text import slugify
 
+# Number of times Course.save retries when a concurrent create takes its slug
+SLUG_ATTEMPTS = 5
+# Base slugs looked up per query when allocating slugs in bulk
+SLUG_LOOKUP_BATCH = 100
+
+
+class CourseQuerySet(models.QuerySet):
+    """
+    QuerySet for courses with set-based slug allocation.
+    """
+    
+    def allocate_slugs(self, titles):
+        """
+        Return a free slug for each title: the slugified title if it is free,
+        otherwise ``slug-N`` with N one past the highest suffix in use. Existing slugs are read with
+        one prefix query (served by the slug index) per batch of distinct bases,
+        not one query per candidate.
+        """
+        bases = [slugify(title) or 'course' for title in titles]
+        used = self._used_suffixes(set(bases))
+        
+        slugs = []
+        for base in bases:
+            suffixes = used.setdefault(base, set())
+            suffix = max(suffixes) + 1 if 0 in suffixes else 0
+            suffixes.add(suffix)
+            slugs.append(f"{base}-{suffix}" if suffix else base)
+        return slugs
+    
+    def _used_suffixes(self, bases):
+        """Map each base slug to the set of numeric suffixes taken (0 for the bare slug)."""
+        used = {}
+        bases = sorted(bases)
+        for start in range(0, len(bases), SLUG_LOOKUP_BATCH):
+            batch = set(bases[start:start + SLUG_LOOKUP_BATCH])
+            query = Q()
+            for base in batch:
+                query |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+            
+            for slug in self.model._default_manager.filter(query).values_list('slug', flat=True):
+                # A slug such as "intro-2" counts both as bare "intro-2" and as "intro" #2
+                if slug in batch:
+                    used.setdefault(slug, set()).add(0)
+                prefix, _, suffix = slug.rpartition('-')
+                if prefix in batch and suffix.isdigit():
+                    used.setdefault(prefix, set()).add(int(suffix))
+        return used
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """Allocate slugs for all courses missing one before inserting them."""
+        objs = list(objs)
+        pending = [course for course in objs if not course.slug]
+        for course, slug in zip(pending, self.allocate_slugs(course.title for course in pending)):
+            course.slug = slug
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class Course(models.Model):
     """
@@ -30,6 +86,11 @@ class Course(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
+    # Number of active enrollments, maintained by the Enrollment signal handlers
+    # and repaired by the ``reconcile_enrollment_counts`` management command.
+    enrollment_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    objects = CourseQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -37,29 +98,56 @@ class Course(models.Model):
             models.Index(fields=['teacher']),
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['enrollment_count']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
         return self.title
     
-    def save(self, *args, **kwargs):
-        """Generate and save the slug when creating a course."""
-        if not self.slug:
-            self.slug = slugify(self.title)
-            
-            # If the slug already exists, append a number
-            original_slug = self.slug
-            counter = 1
-            while Course.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-                
-        super().save(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded ``teacher_id`` so saves can detect a change of teacher."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_teacher_id = instance.__dict__.get('teacher_id')
+        return instance
     
-    @property
-    def enrollment_count(self):
-        """Get the number of students enrolled in the course."""
-        return self.students.count()
+    def save(self, *args, **kwargs):
+        """
+        Generate and save the slug when creating a course.
+
+        Updates of an existing course leave ``enrollment_count`` alone: the
+        in-memory value may be stale, and writing it back would undo the
+        F() increments made since the course was loaded.
+        """
+        if (
+            not self._state.adding
+            and self.pk is not None
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not args
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'enrollment_count'
+                and field.attname not in deferred
+            ]
+        if self.slug:
+            return super().save(*args, **kwargs)
+        
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = Course.objects.allocate_slugs([self.title])[0]
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Retry only if a concurrent create took the slug we picked
+                taken = Course.objects.filter(slug=self.slug).exists()
+                self.slug = ''
+                if not taken or attempt == SLUG_ATTEMPTS - 1:
+                    raise
     
     @classmethod
     def get_courses_for_user(cls, user):
@@ -96,7 +184,15 @@ class Enrollment(models.Model):
         indexes = [
             models.Index(fields=['course', 'student']),
             models.Index(fields=['student', 'is_active']),
+            models.Index(fields=['enrolled_at']),
         ]
     
     def __str__(self):
-        return f"{self.student.username} enrolled in {self.course.title}"
\ No newline at end of file
+        return f"{self.student.username} enrolled in {self.course.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded ``is_active`` so saves can detect a flip."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
\ No newline at end of file
@@ -4,6 +4,8 @@ Custom permissions for the courses app.
 
 from rest_framework import permissions
 
+from .membership import is_enrolled, teaches
+
 
 class IsCourseTeacher(permissions.BasePermission):
     """
@@ -14,7 +16,21 @@ class IsCourseTeacher(permissions.BasePermission):
         return request.user.is_authenticated and request.user.profile.is_teacher
     
     def has_object_permission(self, request, view, obj):
-        return obj.teacher == request.user
+        return teaches(request, obj.id)
+
+
+class IsCourseTeacherOrAdmin(permissions.BasePermission):
+    """
+    Allow access only to the teacher who created the course or to staff users.
+    """
+    
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_staff or request.user.profile.is_teacher
+        )
+    
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or teaches(request, obj.id)
 
 
 class IsEnrolledOrTeacher(permissions.BasePermission):
@@ -28,11 +44,11 @@ class IsEnrolledOrTeacher(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Teacher who created the course
-        if obj.teacher == request.user:
+        if teaches(request, obj.id):
             return True
         
         # Student enrolled in the course
-        return request.user.profile.is_student and obj.students.filter(id=request.user.id).exists()
+        return request.user.profile.is_student and is_enrolled(request, obj.id)
 
 
 class CanEnrollInCourse(permissions.BasePermission):
@@ -4,11 +4,15 @@ Serializers for the courses app.
 
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
+from edutrack.deferred import TruncatableFieldsMixin
+from .membership import is_enrolled
 from .models import Course, Enrollment
+from .services import parse_roster_csv
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class CourseListSerializer(TruncatableFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing courses."""
     
     teacher_name = serializers.SerializerMethodField()
@@ -29,19 +33,36 @@ class CourseListSerializer(serializers.ModelSerializer):
         return f"{obj.teacher.first_name} {obj.teacher.last_name}".strip() or obj.teacher.username
     
     def get_is_enrolled(self, obj):
-        """Check if the current user is enrolled in the course."""
+        """
+        Check if the current user is enrolled in the course.
+        Uses the view's precomputed ``enrolled_course_ids`` when available.
+        """
         user = self.context['request'].user
         if not user.is_authenticated or user.profile.is_teacher:
             return False
-        return obj.students.filter(id=user.id).exists()
+        enrolled_course_ids = self.context.get('enrolled_course_ids')
+        if enrolled_course_ids is not None:
+            return obj.id in enrolled_course_ids
+        return is_enrolled(self.context['request'], obj.id)
 
 
 class CourseDetailSerializer(CourseListSerializer):
-    """Serializer for course details."""
+    """
+    Serializer for course details.
+    The roster is linked rather than embedded; ``enrollment_count`` gives its size.
+    """
+    
+    students_url = serializers.SerializerMethodField()
     
     class Meta(CourseListSerializer.Meta):
-        fields = CourseListSerializer.Meta.fields + ['students']
-        read_only_fields = CourseListSerializer.Meta.read_only_fields + ['students']
+        fields = CourseListSerializer.Meta.fields + ['students_url']
+        read_only_fields = CourseListSerializer.Meta.read_only_fields + ['students_url']
+    
+    def get_students_url(self, obj):
+        """Get the URL of the paginated course roster."""
+        return reverse(
+            'course-students', kwargs={'slug': obj.slug}, request=self.context.get('request')
+        )
 
 
 class CourseCreateUpdateSerializer(serializers.ModelSerializer):
@@ -80,6 +101,31 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class RosterImportSerializer(serializers.Serializer):
+    """Serializer for bulk roster imports: a list of usernames/emails or a CSV file."""
+    
+    students = serializers.ListField(
+        child=serializers.CharField(allow_blank=True),
+        required=False,
+        allow_empty=False,
+    )
+    file = serializers.FileField(required=False)
+    
+    def validate(self, attrs):
+        """Require exactly one source and turn a CSV upload into a list of identifiers."""
+        if ('students' in attrs) == ('file' in attrs):
+            raise serializers.ValidationError("Provide either 'students' or a CSV 'file'.")
+        
+        if 'file' in attrs:
+            lines = (line.decode('utf-8-sig') for line in attrs.pop('file'))
+            try:
+                rows = parse_roster_csv(lines)
+            except (ValueError, UnicodeDecodeError) as exc:
+                raise serializers.ValidationError({'file': str(exc)})
+            attrs['students'] = [identifier for _, _, identifier in rows]
+        return attrs
+
+
 class UserBriefSerializer(serializers.ModelSerializer):
     """Brief serializer for user data in courses."""
     
@@ -0,0 +1,262 @@
+"""
+Service functions for the courses app.
+"""
+
+import csv
+import json
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
+
+from edutrack.cache import bump_generation
+from edutrack.utils import stream_csv
+from users.models import UserProfile
+from .membership import invalidate_membership
+from .models import Course, Enrollment
+
+# Rows resolved, looked up and inserted per query during bulk enrollment
+ENROLLMENT_BATCH_SIZE = 500
+
+
+def adjust_enrollment_count(course_id, delta):
+    """
+    Atomically add ``delta`` to a course's stored enrollment count.
+
+    The update is a single ``UPDATE ... SET enrollment_count = enrollment_count + delta``
+    so concurrent enrollments never overwrite each other's increments. ``updated_at``
+    moves with the count so HTTP validators see the change.
+    """
+    if not delta:
+        return
+    queryset = Course.objects.filter(pk=course_id)
+    if delta < 0:
+        # Never let the counter underflow if it has already drifted low.
+        queryset = queryset.filter(enrollment_count__gte=-delta)
+    queryset.update(enrollment_count=F('enrollment_count') + delta, updated_at=Now())
+
+
+def active_enrollment_counts():
+    """Subquery returning the live number of active enrollments per course."""
+    return Coalesce(
+        Subquery(
+            Enrollment.objects.filter(course=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('course')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def reconcile_enrollment_counts(dry_run=False):
+    """
+    Repair courses whose stored enrollment count has drifted from the live count.
+
+    Returns a list of ``(course_id, stored, actual)`` tuples for the drifted courses.
+    """
+    drifted = list(
+        Course.objects.annotate(actual_count=active_enrollment_counts())
+        .exclude(enrollment_count=F('actual_count'))
+        .order_by('pk')
+        .values_list('pk', 'enrollment_count', 'actual_count')
+    )
+    if drifted and not dry_run:
+        Course.objects.filter(
+            pk__in=[course_id for course_id, _, _ in drifted]
+        ).update(enrollment_count=active_enrollment_counts(), updated_at=Now())
+    return drifted
+
+
+def parse_roster_csv(lines, columns=('student', 'username', 'email')):
+    """
+    Read ``(row_number, course, identifier)`` tuples from roster CSV lines.
+    The identifier comes from the first of ``columns`` present in the header
+    and the course, if any, from a ``course`` column.
+    """
+    reader = csv.DictReader(lines)
+    fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    reader.fieldnames = fieldnames
+    column = next((name for name in columns if name in fieldnames), None)
+    if column is None:
+        raise ValueError(f"CSV needs one of these columns: {', '.join(columns)}")
+
+    return [
+        (row_number, (row.get('course') or '').strip(), (row.get(column) or '').strip())
+        for row_number, row in enumerate(reader, start=1)
+    ]
+
+
+def _resolve_students(identifiers, batch_size):
+    """Map each username/email in ``identifiers`` to ``(user_id, role)``, in batches."""
+    resolved = {}
+    identifiers = sorted(set(identifiers))
+    for start in range(0, len(identifiers), batch_size):
+        batch = identifiers[start:start + batch_size]
+        users = User.objects.filter(
+            Q(username__in=batch) | Q(email__in=batch)
+        ).values_list('id', 'username', 'email', 'profile__role')
+        for user_id, username, email, role in users:
+            resolved[username] = (user_id, role)
+            if email:
+                resolved.setdefault(email, (user_id, role))
+    return resolved
+
+
+def bulk_enroll(course, identifiers, batch_size=ENROLLMENT_BATCH_SIZE):
+    """
+    Enroll the students named by ``identifiers`` (usernames or emails) in ``course``.
+
+    Users are resolved in batches, existing enrollments are read with a single
+    query, new rows are inserted with ``bulk_create`` and the course counter and
+    response cache are updated once. Students enrolled concurrently are
+    reported as ``already_enrolled``. Returns one result dict per identifier.
+    """
+    identifiers = [str(identifier).strip() for identifier in identifiers]
+    resolved = _resolve_students([i for i in identifiers if i], batch_size)
+    existing = dict(
+        Enrollment.objects.filter(course=course).values_list('student_id', 'is_active')
+    )
+
+    results = []
+    seen = set()
+    to_create = []
+    to_reactivate = []
+    for row, identifier in enumerate(identifiers, start=1):
+        result = {'row': row, 'student': identifier}
+        user_id, role = resolved.get(identifier, (None, None))
+        if not identifier:
+            result['status'] = 'invalid'
+        elif user_id is None:
+            result['status'] = 'not_found'
+        elif role != UserProfile.STUDENT:
+            result['status'] = 'not_a_student'
+        elif user_id in seen:
+            result['status'] = 'duplicate'
+        elif existing.get(user_id) is True:
+            result['status'] = 'already_enrolled'
+        elif user_id in existing:
+            result['status'] = 'reactivated'
+            to_reactivate.append(user_id)
+        else:
+            result['status'] = 'enrolled'
+            to_create.append(Enrollment(course=course, student_id=user_id))
+        if user_id is not None:
+            result['user_id'] = user_id
+            seen.add(user_id)
+        results.append(result)
+
+    if to_create or to_reactivate:
+        with transaction.atomic():
+            created = _insert_enrollments(course, to_create, batch_size)
+            reactivated = _reactivate_enrollments(course, to_reactivate, batch_size)
+            # bulk_create and update() skip the signal handlers, so apply their effects once
+            adjust_enrollment_count(course.id, len(created) + len(reactivated))
+        # Rows a concurrent enrollment got to first were not added by this import
+        added = created | reactivated
+        for result in results:
+            if result['status'] in ('enrolled', 'reactivated') and result['user_id'] not in added:
+                result['status'] = 'already_enrolled'
+        if added:
+            invalidate_membership(*created)
+            bump_generation('courses', 'assignments')
+    return results
+
+
+def _insert_enrollments(course, enrollments, batch_size):
+    """
+    Insert ``enrollments``, skipping students enrolled meanwhile, and return
+    the ids of the students whose rows this call inserted.
+    """
+    Enrollment.objects.bulk_create(enrollments, batch_size=batch_size, ignore_conflicts=True)
+    # The ignored rows are not reported, so read back the rows: ours carry the
+    # enrolled_at that bulk_create set on each instance
+    stamps = {enrollment.student_id: enrollment.enrolled_at for enrollment in enrollments}
+    student_ids = list(stamps)
+    created = set()
+    for start in range(0, len(student_ids), batch_size):
+        rows = Enrollment.objects.filter(
+            course=course, student_id__in=student_ids[start:start + batch_size]
+        ).values_list('student_id', 'enrolled_at')
+        created.update(student_id for student_id, enrolled_at in rows if stamps[student_id] == enrolled_at)
+    return created
+
+
+def _reactivate_enrollments(course, student_ids, batch_size):
+    """Reactivate the students' inactive enrollments and return the ids of those reactivated."""
+    reactivated = set()
+    for start in range(0, len(student_ids), batch_size):
+        inactive = list(Enrollment.objects.select_for_update().filter(
+            course=course, student_id__in=student_ids[start:start + batch_size], is_active=False
+        ).values_list('student_id', flat=True))
+        Enrollment.objects.filter(course=course, student_id__in=inactive).update(is_active=True)
+        reactivated.update(inactive)
+    return reactivated
+
+
+def import_rosters(rows, batch_size=ENROLLMENT_BATCH_SIZE):
+    """
+    Enroll students from ``(row_number, course_slug, identifier)`` rows across courses.
+    Returns ``{course_slug: results}`` with results keyed to the original rows.
+    """
+    by_course = {}
+    for row_number, slug, identifier in rows:
+        by_course.setdefault(slug, []).append((row_number, identifier))
+
+    courses = Course.objects.in_bulk(list(by_course), field_name='slug')
+    report = {}
+    for slug, entries in by_course.items():
+        course = courses.get(slug)
+        if course is None:
+            report[slug] = [
+                {'row': row_number, 'student': identifier, 'status': 'course_not_found'}
+                for row_number, identifier in entries
+            ]
+            continue
+
+        results = bulk_enroll(course, [identifier for _, identifier in entries], batch_size)
+        for result, (row_number, _) in zip(results, entries):
+            result['row'] = row_number
+        report[slug] = results
+    return report
+
+
+ROSTER_COLUMNS = [
+    'id', 'username', 'first_name', 'last_name', 'email', 'role', 'enrolled_at', 'is_active',
+]
+# Rows fetched per round trip when streaming a roster export
+ROSTER_CHUNK_SIZE = 2000
+
+
+def roster_rows(course, chunk_size=ROSTER_CHUNK_SIZE):
+    """Iterate over a course's roster as dicts, streaming rows from the database in chunks."""
+    enrollments = (
+        Enrollment.objects.filter(course=course)
+        .order_by('student_id')
+        .values_list(
+            'student_id', 'student__username', 'student__first_name', 'student__last_name',
+            'student__email', 'student__profile__role', 'enrolled_at', 'is_active',
+        )
+    )
+    for values in enrollments.iterator(chunk_size=chunk_size):
+        yield dict(zip(ROSTER_COLUMNS, values))
+
+
+def render_roster_csv(rows):
+    return stream_csv(ROSTER_COLUMNS, ([row[column] for column in ROSTER_COLUMNS] for row in rows))
+
+
+def render_roster_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+# Export formats for the roster: output name -> (content type, renderer)
+ROSTER_RENDERERS = {
+    'csv': ('text/csv', render_roster_csv),
+    'ndjson': ('application/x-ndjson', render_roster_ndjson),
+}
@@ -2,30 +2,72 @@
 Signal handlers for the courses app.
 """
 
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
 
+from edutrack.cache import bump_generation
+from .membership import invalidate_membership
 from .models import Course, Enrollment
+from .services import adjust_enrollment_count
 
 
 @receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
 def invalidate_course_cache(sender, instance, **kwargs):
-    """Invalidate cache for course-related views when a course is saved."""
+    """Invalidate cache for course-related views when a course is saved or deleted."""
     cache.delete(f'course_{instance.id}')
-    cache.delete('course_list')
+    # Course titles and visibility also appear on assignment pages
+    bump_generation('courses', 'assignments')
+
+
+@receiver(post_save, sender=Course)
+def course_teacher_changed(sender, instance, created, **kwargs):
+    """Invalidate the cached membership of a new course's teacher, or of both teachers on a handover."""
+    loaded_teacher_id = getattr(instance, '_loaded_teacher_id', None)
+    if created or loaded_teacher_id != instance.teacher_id:
+        invalidate_membership(*{loaded_teacher_id, instance.teacher_id} - {None})
+    instance._loaded_teacher_id = instance.teacher_id
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    """Invalidate the cached membership of a deleted course's teacher."""
+    invalidate_membership(instance.teacher_id)
 
 
 @receiver(post_save, sender=Enrollment)
 def update_enrollment_count(sender, instance, created, **kwargs):
-    """Update course's cached enrollment count when a student enrolls/unenrolls."""
+    """Update course's enrollment count when a student enrolls or an enrollment is toggled."""
     if created:
-        cache.delete(f'course_{instance.course.id}_enrollments')
-        cache.delete(f'course_{instance.course.id}')
+        delta = 1 if instance.is_active else 0
+    else:
+        was_active = getattr(instance, '_loaded_is_active', instance.is_active)
+        delta = int(instance.is_active) - int(was_active)
+    instance._loaded_is_active = instance.is_active
+
+    if created:
+        invalidate_membership(instance.student_id)
+    if delta:
+        adjust_enrollment_count(instance.course_id, delta)
+
+    if created or delta:
+        cache.delete(f'course_{instance.course_id}_enrollments')
+        cache.delete(f'course_{instance.course_id}')
+        bump_generation('courses', 'assignments')
 
 
 @receiver(pre_delete, sender=Enrollment)
 def handle_unenrollment(sender, instance, **kwargs):
     """Handle unenrollment by invalidating cache."""
-    cache.delete(f'course_{instance.course.id}_enrollments')
-    cache.delete(f'course_{instance.course.id}')
\ No newline at end of file
+    cache.delete(f'course_{instance.course_id}_enrollments')
+    cache.delete(f'course_{instance.course_id}')
+
+
+@receiver(post_delete, sender=Enrollment)
+def decrement_enrollment_count(sender, instance, **kwargs):
+    """Decrement the course's enrollment count once an active enrollment is removed."""
+    if getattr(instance, '_loaded_is_active', instance.is_active):
+        adjust_enrollment_count(instance.course_id, -1)
+    invalidate_membership(instance.student_id)
+    bump_generation('courses', 'assignments')
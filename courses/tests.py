@@ -1,3 +1,525 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from assignments.models import Assignment, Submission
+from edutrack import idempotency
+from edutrack.cache import bump_generation, get_generation
+from edutrack.testing import loads_column
+from .membership import user_membership
+from .models import Course, Enrollment
+from .services import bulk_enroll, roster_rows
+
+
+class CourseListDeferredColumnsTests(APITestCase):
+    """Course list endpoints must not load text columns their serializer doesn't render."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.client.force_authenticate(self.teacher)
+        for index in range(3):
+            Course.objects.create(
+                title=f'Course {index}', description='A long description. ' * 50, teacher=self.teacher
+            )
+    
+    def test_truncated_description_is_not_loaded_in_full(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/courses/', {'truncate': 10})
+        
+        self.assertEqual(response.status_code, 200)
+        for course in response.data['results']:
+            self.assertEqual(course['description'], 'A long des')
+        self.assertFalse(loads_column(context.captured_queries, 'courses_course', 'description'))
+    
+    def test_full_description_without_truncate(self):
+        response = self.client.get('/api/courses/')
+        
+        self.assertEqual(response.data['results'][0]['description'], 'A long description. ' * 50)
+    
+    def test_invalid_truncate_is_rejected(self):
+        response = self.client.get('/api/courses/', {'truncate': 'zero'})
+        
+        self.assertEqual(response.status_code, 400)
+
+
+class CursorPaginationTests(APITestCase):
+    """Cursor pages walk the list in both directions without skipping or repeating rows on ties."""
+    
+    def setUp(self):
+        teacher = User.objects.create_user('teacher', password='pw')
+        for index in range(23):
+            course = Course.objects.create(title=f'Course {index}', description='About', teacher=teacher)
+            Course.objects.filter(pk=course.pk).update(enrollment_count=index % 3)
+        self.client.force_authenticate(User.objects.create_user('student', password='pw'))
+    
+    def walk(self, url, link):
+        """Follow ``link`` from ``url`` and return the ids of each page and the last response."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertNotIn('count', response.data)
+            pages.append([course['id'] for course in response.data['results']])
+            url = response.data[link]
+        return pages, response
+    
+    def test_next_and_previous_pages_do_not_overlap(self):
+        pages, last = self.walk('/api/courses/?pagination=cursor&ordering=-enrollment_count', 'next')
+        ids = [pk for page in pages for pk in page]
+        
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertEqual(len(set(ids)), 23)
+        self.assertEqual(
+            ids, list(Course.objects.order_by('-enrollment_count', '-id').values_list('id', flat=True))
+        )
+        
+        back, _ = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(back, pages[-2::-1])
+    
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/courses/?cursor=bm90LWEtY3Vyc29y')
+        self.assertEqual(response.status_code, 404)
+
+
+class CourseSearchTests(APITestCase):
+    """Course search matches through the full-text index and ranks title hits first."""
+    
+    def setUp(self):
+        teacher = User.objects.create_user('teacher', password='pw')
+        for title, description in [
+            ('Python programming', 'Learn Python from scratch'),
+            ('Cooking basics', 'Recipes with a Python twist'),
+            ('Gardening', 'Soil and seeds'),
+        ]:
+            Course.objects.create(title=title, description=description, teacher=teacher)
+        self.client.force_authenticate(User.objects.create_user('student', password='pw'))
+    
+    def titles(self, query):
+        response = self.client.get(f'/api/courses/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [course['title'] for course in response.data['results']]
+    
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.titles('search=python'), ['Python programming', 'Cooking basics'])
+    
+    def test_explicit_ordering_overrides_the_rank(self):
+        self.assertEqual(self.titles('search=python&ordering=title'), ['Cooking basics', 'Python programming'])
+    
+    def test_index_follows_updates(self):
+        course = Course.objects.get(title='Gardening')
+        course.description = 'Growing python food'
+        course.save()
+        
+        self.assertIn('Gardening', self.titles('search=python'))
+
+
+class RosterTests(APITestCase):
+    """The roster is paginated for the API and streamed in full for exports."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.students = [
+            User.objects.create_user(f'student{index:02}', password='pw', email=f's{index}@example.com')
+            for index in range(12)
+        ]
+        for student in self.students:
+            Enrollment.objects.create(course=self.course, student=student)
+        self.client.force_authenticate(self.teacher)
+    
+    def test_students_are_paginated(self):
+        first = self.client.get(f'/api/courses/{self.course.slug}/students/')
+        second = self.client.get(first.data['next'])
+        
+        self.assertEqual(first.data['count'], 12)
+        usernames = [student['username'] for student in first.data['results'] + second.data['results']]
+        self.assertEqual(usernames, [student.username for student in self.students])
+        self.assertIsNone(second.data['next'])
+    
+    def test_csv_export_streams_every_student(self):
+        response = self.client.get(f'/api/courses/{self.course.slug}/students/export/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('course-roster.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['username'] for row in rows], [student.username for student in self.students])
+        self.assertEqual(rows[0]['email'], 's0@example.com')
+        self.assertEqual(rows[0]['role'], 'student')
+    
+    def test_ndjson_export_and_unknown_format(self):
+        response = self.client.get(f'/api/courses/{self.course.slug}/students/export/?output=ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 12)
+        self.assertEqual(json.loads(lines[-1])['username'], 'student11')
+        
+        response = self.client.get(f'/api/courses/{self.course.slug}/students/export/?output=xml')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_roster_rows_come_from_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            rows = list(roster_rows(self.course, chunk_size=5))
+        
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['id'], self.students[0].pk)
+
+
+class GradebookTests(APITestCase):
+    """The gradebook covers active students and assignments, with ungraded cells left empty."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        now = timezone.now()
+        essay = Assignment.objects.create(
+            title='Essay', description='x', course=self.course, points=10, due_date=now
+        )
+        report = Assignment.objects.create(
+            title='Report', description='x', course=self.course, points=20, due_date=now + timedelta(days=1)
+        )
+        hidden = Assignment.objects.create(title='Hidden', description='x', course=self.course, is_active=False)
+        self.alice = User.objects.create_user('alice', password='pw', first_name='Alice', last_name='Adams')
+        self.bob = User.objects.create_user('bob', password='pw', last_name='Brown')
+        carol = User.objects.create_user('carol', password='pw', last_name='Clark')
+        for student in (self.alice, self.bob):
+            Enrollment.objects.create(course=self.course, student=student)
+        Enrollment.objects.create(course=self.course, student=carol, is_active=False)
+        Submission.objects.create(assignment=essay, student=self.alice, score=8)
+        Submission.objects.create(assignment=report, student=self.alice, score=15)
+        Submission.objects.create(assignment=hidden, student=self.alice, score=100)
+        Submission.objects.create(assignment=essay, student=self.bob)
+        Submission.objects.create(assignment=essay, student=carol, score=1)
+        self.client.force_authenticate(self.teacher)
+    
+    def test_json(self):
+        data = self.client.get(f'/api/courses/{self.course.slug}/gradebook/').data
+        
+        self.assertEqual(data['total_points'], 30)
+        self.assertEqual(data['course_average'], 76.67)
+        alice, bob = data['students']
+        self.assertEqual(
+            {key: alice[key] for key in ('name', 'scores', 'total', 'graded_points', 'percentage', 'missing')},
+            {'name': 'Alice Adams', 'scores': [8, 15], 'total': 23, 'graded_points': 30,
+             'percentage': 76.67, 'missing': 0},
+        )
+        self.assertEqual(bob['scores'], [None, None])
+        self.assertIsNone(bob['percentage'])
+        self.assertEqual(bob['missing'], 1)
+        
+        essay, report = data['assignments']
+        self.assertEqual(
+            [essay['title'], essay['submitted'], essay['graded'], essay['mean'], essay['median']],
+            ['Essay', 2, 1, 8, 8],
+        )
+        self.assertEqual(essay['distribution'][8], 1)
+        self.assertEqual(report['distribution'][7], 1)
+        self.assertEqual(sum(report['distribution']), 1)
+    
+    def test_csv(self):
+        response = self.client.get(f'/api/courses/{self.course.slug}/gradebook/export/')
+        
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows, [
+            ['student_id', 'username', 'name', 'Essay', 'Report', 'total', 'percentage'],
+            [str(self.alice.pk), 'alice', 'Alice Adams', '8.0', '15.0', '23.0', '76.67'],
+            [str(self.bob.pk), 'bob', 'Brown', '', '', '0.0', ''],
+        ])
+
+
+class SlugAllocationTests(APITestCase):
+    """Slugs take the next free numeric suffix, read with one query per batch of titles."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+    
+    def create(self, title):
+        return Course.objects.create(title=title, description='About', teacher=self.teacher).slug
+    
+    def test_repeated_titles_get_increasing_suffixes(self):
+        self.assertEqual([self.create('Intro') for _ in range(3)], ['intro', 'intro-1', 'intro-2'])
+    
+    def test_suffix_follows_the_highest_in_use(self):
+        self.create('Intro')
+        Course.objects.create(title='Other', description='About', teacher=self.teacher, slug='intro-7')
+        
+        self.assertEqual(self.create('Intro'), 'intro-8')
+        # "Intro 7" is its own base: the bare slug is taken by course "intro" #7
+        self.assertEqual(self.create('Intro 7'), 'intro-7-1')
+    
+    def test_allocation_reads_existing_slugs_once(self):
+        self.create('Intro')
+        self.create('Design')
+        
+        with self.assertNumQueries(1):
+            slugs = Course.objects.allocate_slugs(['Intro', 'Design', 'Intro', 'Ethics', '!!!'])
+        self.assertEqual(slugs, ['intro-1', 'design-1', 'intro-2', 'ethics', 'course'])
+    
+    def test_bulk_create_allocates_missing_slugs(self):
+        self.create('Intro')
+        Course.objects.bulk_create([
+            Course(title='Intro', description='About', teacher=self.teacher),
+            Course(title='Intro', description='About', teacher=self.teacher, slug='custom'),
+            Course(title='Intro', description='About', teacher=self.teacher),
+        ])
+        
+        self.assertEqual(
+            sorted(Course.objects.values_list('slug', flat=True)), ['custom', 'intro', 'intro-1', 'intro-2']
+        )
+
+
+class EnrollmentCountTests(APITestCase):
+    """The stored enrollment count must survive saves of a course loaded before an enrollment."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+    
+    def test_editing_a_course_keeps_enrollments_made_since_it_was_loaded(self):
+        course = Course.objects.get(pk=self.course.pk)
+        Enrollment.objects.create(course=self.course, student=self.student)
+        
+        course.title = 'Renamed'
+        course.save()
+        
+        course.refresh_from_db()
+        self.assertEqual(course.title, 'Renamed')
+        self.assertEqual(course.enrollment_count, 1)
+
+
+class ImportStudentsTests(APITestCase):
+    """Importing a roster reports each row and moves the enrollment count by the students added."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.teacher.profile.role = 'teacher'
+        self.teacher.profile.save()
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.enrolled = User.objects.create_user('enrolled', password='pw')
+        self.inactive = User.objects.create_user('inactive', password='pw')
+        self.new = User.objects.create_user('new', password='pw', email='new@example.com')
+        Enrollment.objects.create(course=self.course, student=self.enrolled)
+        Enrollment.objects.create(course=self.course, student=self.inactive, is_active=False)
+        self.client.force_authenticate(self.teacher)
+    
+    def test_mixed_roster(self):
+        self.assertEqual(Course.objects.get(pk=self.course.pk).enrollment_count, 1)
+        
+        response = self.client.post(
+            f'/api/courses/{self.course.slug}/students/import/',
+            {'students': ['enrolled', 'inactive', 'new@example.com', 'ghost', 'new', 'teacher']},
+            format='json',
+        )
+        
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['already_enrolled', 'reactivated', 'enrolled', 'not_found', 'duplicate', 'not_a_student'],
+        )
+        self.assertEqual(response.data['summary'], {
+            'already_enrolled': 1, 'reactivated': 1, 'enrolled': 1,
+            'not_found': 1, 'duplicate': 1, 'not_a_student': 1,
+        })
+        self.assertEqual(Course.objects.get(pk=self.course.pk).enrollment_count, 3)
+        self.assertEqual(Enrollment.objects.filter(course=self.course, is_active=True).count(), 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CourseListCacheTests(APITestCase):
+    """The course list is served from the cache until a course or enrollment changes."""
+    
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.client.force_authenticate(self.student)
+    
+    def test_second_request_is_a_hit(self):
+        first = self.client.get('/api/courses/')
+        second = self.client.get('/api/courses/')
+        
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+    
+    def test_enrollment_invalidates_the_list(self):
+        self.client.get('/api/courses/')
+        response = self.client.post(f'/api/courses/{self.course.slug}/enroll/')
+        self.assertLess(response.status_code, 300, response.data)
+        
+        response = self.client.get('/api/courses/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['results'][0]['is_enrolled'])
+        self.assertEqual(response.data['results'][0]['enrollment_count'], 1)
+    
+    def test_generation_is_bumped_again_on_commit(self):
+        before = get_generation('courses')
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation('courses')
+            self.assertEqual(get_generation('courses'), before + 1)
+        
+        self.assertEqual(get_generation('courses'), before + 2)
+
+
+class CourseDetailConditionalGetTests(APITestCase):
+    """Course detail answers If-None-Match with 304 until anything in the response changes."""
+    
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='pw', first_name='Ada')
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.url = f'/api/courses/{self.course.slug}/'
+        self.client.force_authenticate(self.student)
+    
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_if_modified_since_alone_is_ignored(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_enrollment_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(f'{self.url}enroll/')
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['enrollment_count'], 1)
+    
+    def test_teacher_rename_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        User.objects.filter(pk=self.teacher.pk).update(first_name='Grace')
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MembershipCacheTests(APITestCase):
+    """Course membership is read with one query, cached, and dropped when it changes."""
+    
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', description='About', teacher=self.teacher)
+        self.other = Course.objects.create(title='Other', description='About', teacher=self.student)
+        Enrollment.objects.create(course=self.course, student=self.student)
+    
+    def test_membership_is_cached(self):
+        with self.assertNumQueries(1):
+            membership = user_membership(self.student.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_membership(self.student.pk), membership)
+        self.assertEqual(membership.enrolled, {self.course.pk})
+        self.assertEqual(membership.taught, {self.other.pk})
+    
+    def test_enrollment_changes_invalidate(self):
+        user_membership(self.student.pk)
+        enrollment = Enrollment.objects.create(course=self.other, student=self.teacher)
+        user_membership(self.teacher.pk)
+        
+        Enrollment.objects.get(course=self.course, student=self.student).delete()
+        self.assertEqual(user_membership(self.student.pk).enrolled, set())
+        enrollment.delete()
+        self.assertEqual(user_membership(self.teacher.pk).enrolled, set())
+        
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.assertEqual(user_membership(self.student.pk).enrolled, {self.course.pk})
+    
+    def test_teacher_handover_invalidates_both_teachers(self):
+        user_membership(self.teacher.pk)
+        user_membership(self.student.pk)
+        
+        course = Course.objects.get(pk=self.course.pk)
+        course.teacher = self.student
+        course.save()
+        
+        self.assertEqual(user_membership(self.teacher.pk).taught, set())
+        self.assertEqual(user_membership(self.student.pk).taught, {self.course.pk, self.other.pk})
+    
+    def test_bulk_enroll_invalidates(self):
+        newcomer = User.objects.create_user('newcomer', password='pw')
+        user_membership(newcomer.pk)
+        
+        bulk_enroll(self.course, ['newcomer'])
+        self.assertEqual(user_membership(newcomer.pk).enrolled, {self.course.pk})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IdempotentEnrollTests(APITestCase):
+    """Enrolling with an Idempotency-Key replays the first response instead of running again."""
+    
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='pw')
+        self.student = User.objects.create_user('student', password='pw')
+        self.course = Course.objects.create(title='Course', description='About', teacher=teacher)
+        self.url = f'/api/courses/{self.course.slug}/enroll/'
+        self.client.force_authenticate(self.student)
+    
+    def test_retry_replays_the_first_response(self):
+        first = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='key-1')
+        retry = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='key-1')
+        
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 1)
+    
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='key-1')
+        response = self.client.post(self.url, {'note': 'other'}, HTTP_IDEMPOTENCY_KEY='key-1')
+        
+        self.assertEqual(response.status_code, 422)
+    
+    def test_request_in_progress_with_the_same_key_conflicts(self):
+        digest = hashlib.sha256(b'key-1').hexdigest()
+        cache.add(f'{idempotency.KEY_PREFIX}:enroll:{self.student.pk}:{digest}:lock', 1)
+        
+        with mock.patch.object(idempotency, 'LOCK_WAIT', 0.1):
+            response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='key-1')
+        
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Enrollment.objects.exists())
+    
+    def test_fingerprint_is_keyed_with_the_secret_key(self):
+        request = Request(
+            APIRequestFactory().post('/', {'password': 'hunter2'}, format='json'), parsers=[JSONParser()]
+        )
+        fingerprint = idempotency.request_fingerprint(request)
+        with override_settings(SECRET_KEY='another-secret'):
+            self.assertNotEqual(idempotency.request_fingerprint(request), fingerprint)
@@ -2,38 +2,57 @@
 Views for the courses app.
 """
 
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
-from rest_framework import viewsets, status, mixins
+from rest_framework import viewsets, status, mixins, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
 
+from .membership import get_membership
 from .models import Course, Enrollment
-from .permissions import IsCourseTeacher, IsEnrolledOrTeacher, CanEnrollInCourse
+from .permissions import (
+    IsCourseTeacher,
+    IsCourseTeacherOrAdmin,
+    IsEnrolledOrTeacher,
+    CanEnrollInCourse,
+)
 from .serializers import (
     CourseListSerializer,
     CourseDetailSerializer,
     CourseCreateUpdateSerializer,
     EnrollmentSerializer,
+    RosterImportSerializer,
     UserBriefSerializer,
 )
+from .services import ROSTER_RENDERERS, bulk_enroll, roster_rows
+from edutrack.cache import cache_response
+from edutrack.deferred import DeferredColumnsMixin
+from edutrack.idempotency import idempotent
+from edutrack.conditional import conditional_get, list_validators, object_lookup
+from edutrack.search import FullTextSearchFilter
+from edutrack.utils import stream_csv
+from assignments.services import build_gradebook, course_submission_stats
 from users.permissions import IsTeacher, IsStudent
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(DeferredColumnsMixin, viewsets.ModelViewSet):
     """
     API endpoint for courses.
     """
-    queryset = Course.objects.annotate(enrollment_count=Count('students'))
+    queryset = Course.objects.select_related('teacher')
     serializer_class = CourseListSerializer
     lookup_field = 'slug'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['is_active', 'teacher']
     search_fields = ['title', 'description']
     ordering_fields = ['title', 'created_at', 'enrollment_count']
+    keyset_ordering_fields = ['created_at', 'enrollment_count']
+    truncatable_fields = ['description']
     ordering = ['-created_at']
     
     def get_permissions(self):
@@ -49,8 +68,10 @@ class CourseViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated, IsCourseTeacher]
         elif self.action in ['enroll', 'unenroll']:
             permission_classes = [IsAuthenticated, CanEnrollInCourse]
-        elif self.action in ['students']:
+        elif self.action in ['students', 'export_students', 'gradebook', 'export_gradebook', 'stats']:
             permission_classes = [IsAuthenticated, IsCourseTeacher]
+        elif self.action == 'import_students':
+            permission_classes = [IsAuthenticated, IsCourseTeacherOrAdmin]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -61,6 +82,8 @@ class CourseViewSet(viewsets.ModelViewSet):
             return CourseDetailSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return CourseCreateUpdateSerializer
+        elif self.action == 'import_students':
+            return RosterImportSerializer
         return CourseListSerializer
     
     def get_queryset(self):
@@ -74,20 +97,75 @@ class CourseViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             if user.profile.is_teacher:
                 # Teachers see their own courses
-                return Course.objects.filter(teacher=user).annotate(enrollment_count=Count('students'))
+                return self.queryset.filter(teacher=user)
             else:
                 # Students see all active courses
-                return Course.objects.filter(is_active=True).annotate(enrollment_count=Count('students'))
+                return self.queryset.filter(is_active=True)
         
         # For other actions, maintain the complete queryset
         return self.queryset
     
-    @method_decorator(cache_page(60*5))  # Cache for 5 minutes
+    def get_enrolled_course_ids(self, courses):
+        """Return the IDs of the given courses the current student is enrolled in, from their membership."""
+        user = self.request.user
+        if not user.is_authenticated or user.profile.is_teacher:
+            return set()
+        return get_membership(self.request).enrolled.intersection(course.id for course in courses)
+    
+    def get_enrollment_context(self, courses):
+        """Serializer context carrying the batch-computed enrollment state for ``courses``."""
+        context = self.get_serializer_context()
+        context['enrolled_course_ids'] = self.get_enrolled_course_ids(courses)
+        return context
+    
+    def get_list_validators(self):
+        """Validators for the course list, from the filtered queryset."""
+        return list_validators(self.request, self.filter_queryset(self.get_queryset()), 'courses')
+    
+    def get_detail_validators(self):
+        """
+        Validators for a single course: its timestamp and counter (both move on
+        every enrollment change), the teacher's name and the user's enrollment.
+        """
+        is_enrolled = Enrollment.objects.filter(course=OuterRef('pk'), student=self.request.user)
+        row = (
+            self.filter_queryset(self.get_queryset())
+            .filter(**object_lookup(self))
+            .annotate(user_enrolled=Exists(is_enrolled))
+            .values(
+                'id', 'updated_at', 'enrollment_count', 'user_enrolled',
+                'teacher__username', 'teacher__first_name', 'teacher__last_name',
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        return list(row.values())
+    
+    @conditional_get('get_list_validators')
+    @cache_response('courses')  # Cache per user until a course or enrollment changes
     def list(self, request, *args, **kwargs):
         """List courses with caching."""
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        courses = page if page is not None else list(queryset)
+        
+        serializer = self.get_serializer(
+            courses, many=True, context=self.get_enrollment_context(courses)
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    @conditional_get('get_detail_validators')
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a course with its enrollment state resolved up front."""
+        course = self.get_object()
+        serializer = self.get_serializer(course, context=self.get_enrollment_context([course]))
+        return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
+    @idempotent('enroll')
     def enroll(self, request, slug=None):
         """Enroll the current student in a course."""
         course = self.get_object()
@@ -99,8 +177,9 @@ class CourseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create enrollment
-        enrollment = Enrollment.objects.create(course=course, student=request.user)
+        # Create enrollment and bump the course's counter in one transaction
+        with transaction.atomic():
+            enrollment = Enrollment.objects.create(course=course, student=request.user)
         serializer = EnrollmentSerializer(enrollment, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
@@ -111,17 +190,79 @@ class CourseViewSet(viewsets.ModelViewSet):
         
         # Get and delete enrollment
         enrollment = get_object_or_404(Enrollment, course=course, student=request.user)
-        enrollment.delete()
+        with transaction.atomic():
+            enrollment.delete()
         
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=True, methods=['get'])
     def students(self, request, slug=None):
-        """Get list of students enrolled in a course."""
+        """Get the paginated list of students enrolled in a course."""
         course = self.get_object()
-        students = course.students.all()
-        serializer = UserBriefSerializer(students, many=True)
-        return Response(serializer.data)
+        students = course.students.select_related('profile').order_by('id')
+        page = self.paginate_queryset(students)
+        serializer = UserBriefSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'], url_path='students/export')
+    def export_students(self, request, slug=None):
+        """
+        Stream the full course roster as CSV (default) or NDJSON (``?output=ndjson``).
+        Rows are read in chunks so memory stays flat regardless of class size.
+        """
+        course = self.get_object()
+        output = request.query_params.get('output', 'csv')
+        if output not in ROSTER_RENDERERS:
+            return Response(
+                {'detail': f"Unsupported output '{output}'. Use one of: {', '.join(ROSTER_RENDERERS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = roster_rows(course)
+        content_type, render = ROSTER_RENDERERS[output]
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{course.slug}-roster.{output}"'
+        return response
+    
+    @action(
+        detail=True,
+        methods=['post'],
+        url_path='students/import',
+    )
+    def import_students(self, request, slug=None):
+        """Enroll a roster of students (usernames/emails, JSON list or CSV file) in a course."""
+        course = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = bulk_enroll(course, serializer.validated_data['students'])
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        return Response({'course': course.slug, 'summary': summary, 'results': results})
+    
+    @action(detail=True, methods=['get'])
+    def gradebook(self, request, slug=None):
+        """Get every active student's scores in a course with per-assignment statistics."""
+        course = self.get_object()
+        return Response(build_gradebook(course).as_dict())
+    
+    @action(detail=True, methods=['get'])
+    def stats(self, request, slug=None):
+        """Get submission counts and review latency across a course's assignments."""
+        course = self.get_object()
+        return Response(course_submission_stats(course))
+    
+    @action(detail=True, methods=['get'], url_path='gradebook/export')
+    def export_gradebook(self, request, slug=None):
+        """Stream the course gradebook as CSV, one row per student."""
+        course = self.get_object()
+        gradebook = build_gradebook(course)
+        response = StreamingHttpResponse(
+            stream_csv(gradebook.csv_header(), gradebook.csv_rows()), content_type='text/csv'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{course.slug}-gradebook.csv"'
+        return response
 
 
 class EnrollmentViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -130,6 +271,9 @@ class EnrollmentViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     """
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated]
+    ordering_fields = ['enrolled_at']
+    keyset_ordering_fields = ['enrolled_at']
+    ordering = ['-enrolled_at']
     
     def get_queryset(self):
         """Filter enrollments based on user role."""
@@ -0,0 +1,128 @@
+"""
+Version-keyed response caching for list endpoints.
+
+Each cache scope (e.g. ``courses``) has a generation counter. Cached pages embed
+the generation in their key, so bumping the counter from a signal handler
+invalidates every page of that scope in O(1) without scanning keys; stale
+entries simply age out through their TTL. Inside a transaction the counter is
+bumped again on commit, so pages cached from the old rows meanwhile are dropped.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+KEY_PREFIX = 'respcache'
+DEFAULT_TIMEOUT = 60 * 5
+
+
+def _generation_key(scope):
+    return f'{KEY_PREFIX}:gen:{scope}'
+
+
+def _stats_key(scope, event):
+    return f'{KEY_PREFIX}:stats:{scope}:{event}'
+
+
+def get_generation(scope):
+    """Return the current generation for ``scope``, initialising it if needed."""
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock rather than 1 so a counter evicted from the cache
+        # can never come back to a value that older pages were stored under.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def bump_generation(*scopes):
+    """Invalidate every cached page of the given scopes, now and once the transaction commits."""
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        # A concurrent request may cache a page of the old rows before the change is visible
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _record(scope, event):
+    key = _stats_key(scope, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+
+def get_cache_stats(scope):
+    """Return the recorded hit/miss counters for ``scope``."""
+    hits = cache.get(_stats_key(scope, 'hits'), 0)
+    misses = cache.get(_stats_key(scope, 'misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def build_cache_key(scope, request, per_user=True):
+    """
+    Build the cache key for a request: scope, generation, role, user (when the
+    response is personalised) and a digest of the query parameters.
+    """
+    user = request.user
+    if user.is_authenticated:
+        role = user.profile.role
+        user_part = str(user.pk) if per_user else '*'
+    else:
+        role, user_part = 'anon', '*'
+
+    params = sorted(
+        (name, sorted(values)) for name, values in request.query_params.lists()
+    )
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f'{KEY_PREFIX}:{scope}:{get_generation(scope)}:{role}:{user_part}:{digest}'
+
+
+def cache_response(scope, timeout=DEFAULT_TIMEOUT, per_user=True):
+    """
+    Cache the data of successful responses of a viewset method.
+
+    Use ``per_user=False`` only when the response depends on nothing but the
+    user's role and the query parameters.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = build_cache_key(scope, request, per_user=per_user)
+            data = cache.get(key)
+            if data is not None:
+                _record(scope, 'hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _record(scope, 'misses')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,84 @@
+"""
+Conditional GET (ETag) support for API views.
+
+A view method decorated with ``conditional_get`` names a validator method on
+the view. The validator runs a cheap query (timestamps, counters and the
+requesting user's state, never the serializer) and returns the parts the ETag
+is built from. When the client's ``If-None-Match`` still matches, a 304 is
+returned without calling the view method at all.
+
+Responses carry no Last-Modified: they depend on state without a timestamp
+(the teacher's name, the user's enrollment or submission, deleted rows), so
+``If-Modified-Since`` alone would answer 304 with stale data.
+
+Validator queries must be built from the view's ``get_queryset()`` so a
+validator only ever matches rows the user is allowed to see.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .cache import get_generation
+
+
+def build_etag(request, parts):
+    """
+    Build a strong ETag from ``parts``, the requesting user and the negotiated
+    renderer, so different users and formats never share a validator.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = [request.user.pk, getattr(renderer, 'format', None), *parts]
+    return quote_etag(hashlib.md5(repr(key).encode()).hexdigest())
+
+
+def object_lookup(view):
+    """Return the filter ``get_object`` would use for a detail view's URL kwargs."""
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    return {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+
+
+def list_validators(request, queryset, scope):
+    """
+    Validators for a list endpoint: the newest ``updated_at`` and the row count
+    over the filtered queryset, the cache generation of ``scope`` (which moves
+    with related changes such as enrollments and submissions) and the query
+    parameters.
+    """
+    summary = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'), count=Count('pk')
+    )
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    return [summary['count'], summary['last_modified'], get_generation(scope), params]
+
+
+def conditional_get(validators):
+    """
+    Answer conditional GETs for a viewset method from the view's ``validators``
+    method, which returns the ETag parts or ``None`` when there is nothing to
+    validate against (the view method then runs as usual).
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            parts = getattr(self, validators)()
+            if parts is None:
+                return view_method(self, request, *args, **kwargs)
+
+            etag = build_etag(request, parts)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            # Responses are per user: shared caches must not keep them and
+            # clients must revalidate before reuse.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+"""
+Column deferral and text truncation for list endpoints.
+
+List serializers rarely render the large text columns of their models
+(submission content, feedback, descriptions of related courses), yet a plain
+queryset loads every column. ``DeferredColumnsMixin`` inspects the list
+serializer's field sources and defers every heavy column that no field reads,
+on the listed model and on each ``select_related`` relation.
+
+Views can also list ``truncatable_fields``: with ``?truncate=N`` those fields
+are cut to N characters by the database, so the full text is never fetched.
+``TruncatableFieldsMixin`` makes the serializer render the truncated value.
+"""
+
+from django.db import models
+from django.db.models.functions import Left
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+HEAVY_FIELD_TYPES = (models.TextField, models.JSONField, models.BinaryField)
+
+
+def serializer_sources(serializer):
+    """
+    Return the ``__``-joined model paths read by ``serializer``'s declared fields.
+    Method fields are skipped: they must only read columns that are never deferred.
+    """
+    sources = set()
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            continue
+        sources.add('__'.join(field.source_attrs))
+    return sources
+
+
+def _related_models(model, select_related, prefix=''):
+    """Yield ``(path_prefix, model)`` for each relation in a ``select_related`` tree."""
+    for name, children in select_related.items():
+        related = model._meta.get_field(name).related_model
+        path = f'{prefix}{name}__'
+        yield path, related
+        yield from _related_models(related, children, path)
+
+
+def deferrable_fields(serializer, queryset):
+    """
+    Return the heavy columns of ``queryset``'s model and of its ``select_related``
+    models that ``serializer`` never reads.
+    """
+    used = serializer_sources(serializer)
+    models_to_check = [('', queryset.model)]
+    if isinstance(queryset.query.select_related, dict):
+        models_to_check += list(_related_models(queryset.model, queryset.query.select_related))
+
+    deferred = []
+    for prefix, model in models_to_check:
+        for field in model._meta.concrete_fields:
+            path = f'{prefix}{field.name}'
+            if isinstance(field, HEAVY_FIELD_TYPES) and path not in used:
+                deferred.append(path)
+    return deferred
+
+
+class DeferredColumnsMixin:
+    """
+    Viewset mixin that defers unused heavy columns and applies ``?truncate=``
+    on the ``list`` action.
+    """
+    truncatable_fields = ()
+    truncate_query_param = 'truncate'
+
+    def get_truncate_length(self):
+        """Return the requested truncation length, or None when not truncating."""
+        value = self.request.query_params.get(self.truncate_query_param)
+        if not value or not self.truncatable_fields:
+            return None
+        try:
+            length = int(value)
+            if length < 1:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({self.truncate_query_param: 'Must be a positive integer.'})
+        return length
+
+    def get_truncated_fields(self):
+        """Map each truncated field to the annotation holding its truncated value."""
+        if self.action != 'list' or self.get_truncate_length() is None:
+            return {}
+        return {field: f'{field}_truncated' for field in self.truncatable_fields}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+
+        truncated = self.get_truncated_fields()
+        if truncated:
+            length = self.get_truncate_length()
+            queryset = queryset.annotate(**{
+                annotation: Left(field, length) for field, annotation in truncated.items()
+            })
+
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        deferred = set(deferrable_fields(serializer, queryset)) | set(truncated)
+        return queryset.defer(*sorted(deferred))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['truncated_fields'] = self.get_truncated_fields()
+        return context
+
+
+class TruncatableFieldsMixin:
+    """
+    Serializer mixin that renders the truncated annotations supplied by
+    ``DeferredColumnsMixin`` in place of the full fields.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field, annotation in self.context.get('truncated_fields', {}).items():
+            if field in fields:
+                fields[field] = serializers.CharField(source=annotation, read_only=True)
+        return fields
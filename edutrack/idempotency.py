@@ -0,0 +1,139 @@
+"""
+Idempotency keys for unsafe API endpoints.
+
+Clients send an ``Idempotency-Key`` header (e.g. a UUID) with a POST. The
+first response for a user (or, when anonymous, a client address) and key is
+stored in the cache; retries with the same key get that response replayed
+from a single cache read, without running the view again. Concurrent duplicates are serialized with a short lock taken
+through ``cache.add``: the loser waits briefly for the winner's response and
+otherwise gets a 409 asking it to retry.
+
+A key reused for a different request (another endpoint or body) is rejected
+with a 422 instead of replaying an unrelated response.
+"""
+
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = 'idempotency'
+FINGERPRINT_SALT = 'edutrack.idempotency.fingerprint'
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Seconds a stored response can be replayed
+DEFAULT_TIMEOUT = 60 * 60 * 24
+# Seconds a request holds the lock; bounds the wait after a crashed request
+LOCK_TIMEOUT = 30
+# How long a concurrent duplicate waits for the first request to finish
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+# Response headers replayed along with the data
+REPLAYED_HEADERS = ('Location',)
+
+
+def _cache_key(scope, request, idempotency_key):
+    if request.user.is_authenticated:
+        user = request.user.pk
+    else:
+        # Anonymous clients are told apart by address, as the anonymous throttle does
+        ident = str(BaseThrottle().get_ident(request))
+        user = 'anon-' + hashlib.sha256(ident.encode()).hexdigest()[:16]
+    digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{scope}:{user}:{digest}'
+
+
+def request_fingerprint(request):
+    """
+    Digest of the method, path and body of a request, to detect reused keys.
+    Bodies can hold passwords, so the digest is an HMAC keyed with SECRET_KEY
+    rather than a plain hash that could be brute-forced from the cache.
+    """
+    data = request.data
+    items = sorted(data.lists()) if hasattr(data, 'lists') else data
+    payload = json.dumps(
+        [request.method, request.get_full_path(), items], sort_keys=True, default=str
+    )
+    return salted_hmac(FINGERPRINT_SALT, payload, algorithm='sha256').hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {'detail': f'This {HEADER} was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _wait_for(key):
+    """Poll for the response of a concurrent request holding the lock."""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        stored = cache.get(key)
+        if stored is not None:
+            return stored
+    return None
+
+
+def idempotent(scope, timeout=DEFAULT_TIMEOUT):
+    """
+    Make a view method idempotent for requests carrying an ``Idempotency-Key``.
+    Requests without the header run as usual. Server errors (5xx) and
+    throttled responses are not stored, so they can be retried with the same key.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            idempotency_key = request.headers.get(HEADER)
+            if not idempotency_key:
+                return view_method(self, request, *args, **kwargs)
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'detail': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            key = _cache_key(scope, request, idempotency_key)
+            fingerprint = request_fingerprint(request)
+            stored = cache.get(key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            lock_key = f'{key}:lock'
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                stored = _wait_for(key)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+                response = Response(
+                    {'detail': f'A request with this {HEADER} is still in progress.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response['Retry-After'] = '1'
+                return response
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 500 and response.status_code != status.HTTP_429_TOO_MANY_REQUESTS:
+                    cache.set(key, {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'data': response.data,
+                        'headers': {
+                            name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)
+                        },
+                    }, timeout)
+                return response
+            finally:
+                cache.delete(lock_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,253 @@
+"""
+Per-request SQL, cache and serializer instrumentation.
+
+``InstrumentationMiddleware`` measures each request: SQL queries through a
+database execute wrapper, cache hits, misses and time through wrappers on the
+cache backends, and the time spent building serializer ``data``. The totals are
+sent in a ``Server-Timing`` header and logged as one JSON line. Requests above
+``INSTRUMENTATION_QUERY_THRESHOLD`` queries are logged as warnings, with the
+full query list for a sample of them.
+
+Recording a query costs a timer read and a dict update; query lists are only
+formatted for sampled requests. Streamed response bodies are measured up to
+the point streaming starts.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Duplicated queries reported per request
+MAX_DUPLICATES = 5
+# Queries kept for the sampled query list
+MAX_SAMPLED_QUERIES = 500
+# Characters of SQL shown per query in logs
+SQL_PREVIEW_LENGTH = 300
+
+# Cache methods whose time is recorded, besides get and get_many which also count hits
+TIMED_CACHE_METHODS = ('set', 'set_many', 'add', 'delete', 'delete_many', 'incr', 'decr', 'touch')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Counters for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        # SQL (with placeholders, so repeated lookups match) -> count
+        self.statements = {}
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.cache_depth = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper recording every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.query_count += 1
+            self.sql_time += duration
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+            if len(self.queries) < MAX_SAMPLED_QUERIES:
+                self.queries.append((sql, duration))
+
+    @contextmanager
+    def cache_call(self):
+        """Time a cache call, marking it so the backend's own nested calls are not counted."""
+        self.cache_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.cache_depth -= 1
+            self.cache_time += time.perf_counter() - started
+
+    def duplicates(self):
+        """Get the most repeated statements, as a fingerprint, count and SQL preview."""
+        repeated = sorted(
+            ((count, sql) for sql, count in self.statements.items() if count > 1), reverse=True
+        )
+        return [
+            {
+                'fingerprint': hashlib.md5(sql.encode()).hexdigest()[:12],
+                'count': count,
+                'sql': sql[:SQL_PREVIEW_LENGTH],
+            }
+            for count, sql in repeated[:MAX_DUPLICATES]
+        ]
+
+    def server_timing(self, total):
+        """Format the ``Server-Timing`` header value."""
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'serialize;dur={self.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def _timed(method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.cache_depth:
+            # Outside a request, or called by another method of the backend
+            return method(*args, **kwargs)
+        with metrics.cache_call():
+            return method(*args, **kwargs)
+    return wrapper
+
+
+def _counted_get(method):
+    @wraps(method)
+    def get(key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics.cache_depth:
+            return method(key, default, version=version)
+        # Tell a miss from a cached value equal to the caller's default
+        with metrics.cache_call():
+            value = method(key, _MISSING, version=version)
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    return get
+
+
+def _counted_get_many(method):
+    @wraps(method)
+    def get_many(keys, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics.cache_depth:
+            return method(keys, version=version)
+        keys = list(keys)
+        with metrics.cache_call():
+            values = method(keys, version=version)
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+    return get_many
+
+
+def instrument_cache(backend):
+    """Wrap the methods of a cache backend instance (backends are per thread) once."""
+    if getattr(backend, '_instrumented', False):
+        return
+    for name in TIMED_CACHE_METHODS:
+        setattr(backend, name, _timed(getattr(backend, name)))
+    backend.get = _counted_get(backend.get)
+    backend.get_many = _counted_get_many(backend.get_many)
+    backend._instrumented = True
+
+
+def _timed_data(prop):
+    @wraps(prop.fget)
+    def data(self):
+        metrics = _current.get()
+        if metrics is None:
+            return prop.fget(self)
+        # Only the outermost serializer is timed; nested ones are part of it
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += time.perf_counter() - started
+    return property(data)
+
+
+def instrument_serializers():
+    """Time ``Serializer.data`` and ``ListSerializer.data`` (once per process)."""
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, '_instrumented', False):
+            serializer_class.data = _timed_data(serializer_class.data)
+            serializer_class.data.fget._instrumented = True
+
+
+class InstrumentationMiddleware:
+    """Measure each request and report it in ``Server-Timing`` and the logs."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.INSTRUMENTATION_SERVER_TIMING
+        self.log_sample_rate = settings.INSTRUMENTATION_LOG_SAMPLE_RATE
+        self.query_threshold = settings.INSTRUMENTATION_QUERY_THRESHOLD
+        self.query_sample_rate = settings.INSTRUMENTATION_QUERY_SAMPLE_RATE
+        instrument_serializers()
+
+    def __call__(self, request):
+        for alias in settings.CACHES:
+            instrument_cache(caches[alias])
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - metrics.started
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing(total)
+        self.log(request, response, metrics, total)
+        return response
+
+    def log(self, request, response, metrics, total):
+        """Log a JSON summary of the request, as a warning above the query threshold."""
+        over_threshold = metrics.query_count > self.query_threshold
+        if not over_threshold and (
+            not logger.isEnabledFor(logging.INFO) or random.random() >= self.log_sample_rate
+        ):
+            return
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'queries': metrics.query_count,
+            'sql_ms': round(metrics.sql_time * 1000, 1),
+            'duplicate_queries': sum(count - 1 for count in metrics.statements.values()),
+            'duplicates': metrics.duplicates(),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'cache_ms': round(metrics.cache_time * 1000, 1),
+            'serializer_ms': round(metrics.serializer_time * 1000, 1),
+        }
+        if over_threshold and random.random() < self.query_sample_rate:
+            record['query_list'] = [
+                {'sql': sql[:SQL_PREVIEW_LENGTH], 'ms': round(duration * 1000, 2)}
+                for sql, duration in metrics.queries
+            ]
+        level = logging.WARNING if over_threshold else logging.INFO
+        logger.log(level, 'request_metrics %s', json.dumps(record), extra={'request_metrics': record})
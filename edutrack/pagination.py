@@ -0,0 +1,181 @@
+"""
+Pagination classes for the edutrack project.
+"""
+
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision for datetimes."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Clients opt in with ``?pagination=cursor`` and then follow the ``next`` and
+    ``previous`` links. Keyset pages filter on the last row seen instead of using
+    ``OFFSET`` and skip the ``COUNT(*)``, so latency stays flat at any depth.
+
+    The mode is only available when every field in the active ordering is listed
+    in the view's ``keyset_ordering_fields`` (non-null, indexed columns); ``id`` is
+    appended as a tie-breaker. Other orderings fall back to page numbers.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = False
+        if not self.wants_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        ordering = self.get_keyset_ordering(queryset, view)
+        if ordering is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.ordering = ordering
+        self.page_size = self.get_page_size(request)
+        self.output_fields = [self.get_output_field(queryset, name) for name, _ in ordering]
+
+        position, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.order_by_args(reverse))
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def wants_keyset(self, request):
+        """Check whether the client opted in to keyset pagination."""
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_keyset_ordering(self, queryset, view):
+        """
+        Return the ordering as ``[(field, descending), ...]`` with an ``id``
+        tie-breaker, or ``None`` if the ordering cannot be served by keyset.
+        """
+        allowed = set(getattr(view, 'keyset_ordering_fields', ()))
+        if not allowed:
+            return None
+
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        ordering = []
+        for term in order_by:
+            if not isinstance(term, str):
+                return None
+            name = term.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            if name != 'id' and name not in allowed:
+                return None
+            ordering.append((name, term.startswith('-')))
+
+        if not ordering:
+            ordering = [('id', False)]
+        elif ordering[-1][0] != 'id':
+            ordering.append(('id', ordering[-1][1]))
+        return ordering
+
+    def get_output_field(self, queryset, name):
+        """Return the field used to parse cursor values for ``name``."""
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+
+    def order_by_args(self, reverse):
+        return [
+            f"{'-' if descending != reverse else ''}{name}"
+            for name, descending in self.ordering
+        ]
+
+    def position_filter(self, position, reverse):
+        """
+        Build ``(f1, f2, ...) > (v1, v2, ...)`` in the ordering's directions,
+        expanded to ``f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...``.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [getattr(obj, name) for name, _ in self.ordering]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, cls=CursorJSONEncoder)
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """Return ``(position, reverse)`` for the request's cursor, if any."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            raw_position = payload['p']
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.output_fields, raw_position)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
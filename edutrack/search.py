@@ -0,0 +1,118 @@
+"""
+Indexed full-text search for list endpoints.
+
+On PostgreSQL the view's ``search_fields`` are combined into a weighted
+``tsvector`` (first field weight A, second B, ...) that is served by an
+expression GIN index. On SQLite the same fields are mirrored into an FTS5
+table kept in sync by triggers. Both are created by the app migrations. Any
+other backend, or a view whose search fields use lookup prefixes or relations,
+falls back to DRF's ``SearchFilter``.
+
+Views opt in by listing ``FullTextSearchFilter`` in their ``filter_backends``.
+"""
+
+from django.db import connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'english'
+WEIGHTS = ['A', 'B', 'C', 'D']
+# Relative weights used by SQLite's bm25(), mirroring PostgreSQL's ts_rank defaults
+SQLITE_WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+_fts_tables = {}
+
+
+def postgres_search_vector(fields):
+    """Weighted ``tsvector`` expression over ``fields``; must match the migrations' GIN index."""
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for field, weight in zip(fields, WEIGHTS):
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def fts_table_name(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def _has_fts_table(connection, model):
+    key = (connection.alias, model._meta.db_table)
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[key] = fts_table_name(model) in connection.introspection.table_names(cursor)
+    return _fts_tables[key]
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Ranked, index-backed replacement for ``SearchFilter``.
+
+    Accepts the same ``?search=`` parameter. Results are ordered by relevance
+    (annotated as ``search_rank``) unless the client asks for an explicit
+    ``?ordering=``, so this backend must run after ``OrderingFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        if not self.is_indexable(search_fields):
+            return super().filter_queryset(request, queryset, view)
+
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            queryset = self.postgres_search(queryset, search_fields, search_terms)
+        elif connection.vendor == 'sqlite' and _has_fts_table(connection, queryset.model):
+            queryset = self.sqlite_search(queryset, search_fields, search_terms)
+        else:
+            return super().filter_queryset(request, queryset, view)
+
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
+
+    def is_indexable(self, search_fields):
+        """Only plain local columns can be served by the full-text index."""
+        return len(search_fields) <= len(WEIGHTS) and all(
+            field[0] not in self.lookup_prefixes and '__' not in field
+            for field in search_fields
+        )
+
+    def postgres_search(self, queryset, search_fields, search_terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        vector = postgres_search_vector(search_fields)
+        query = SearchQuery(' '.join(search_terms), search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.alias(search_vector=vector).filter(
+            search_vector=query
+        ).annotate(search_rank=SearchRank(vector, query))
+
+    def sqlite_search(self, queryset, search_fields, search_terms):
+        table = queryset.model._meta.db_table
+        fts = fts_table_name(queryset.model)
+        # Quote every term so user input is never parsed as FTS5 query syntax
+        match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in search_terms)
+        weights = ', '.join(str(SQLITE_WEIGHTS[weight]) for weight in WEIGHTS[:len(search_fields)])
+
+        if queryset.query.group_by is not None:
+            # bm25() cannot be evaluated under GROUP BY, so aggregated querysets
+            # are filtered through the index without a relevance rank.
+            return queryset.filter(
+                pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match])
+            ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        # Join the FTS table so SQLite drives the query from the full-text index;
+        # bm25() is lower-is-better, so negate it to sort like ts_rank.
+        return queryset.extra(
+            select={'search_rank': f'-bm25({fts}, {weights})'},
+            tables=[fts],
+            where=[f'{fts}.rowid = "{table}"."id"', f'{fts} MATCH %s'],
+            params=[match],
+        )
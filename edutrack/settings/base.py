@@ -7,6 +7,7 @@ from pathlib import Path
 from datetime import timedelta
 
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'edutrack.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -125,6 +128,29 @@ STATICFILES_DIRS = [BASE_DIR / 'static']  # This directory must exist
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Chunked submission uploads: chunks are staged on local disk until assembled
+UPLOAD_STAGING_ROOT = os.environ.get('UPLOAD_STAGING_ROOT', str(BASE_DIR / 'upload_staging'))
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_MAX_SIZE = 200 * 1024 * 1024
+UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+# Due-date reminders: hours before the due date at which students who have not
+# submitted are emailed, once per window
+ASSIGNMENT_REMINDER_WINDOWS = [1, 24]
+# Seconds after which a reminder claimed but never sent (e.g. by a crashed run) is claimed again
+ASSIGNMENT_REMINDER_CLAIM_TTL = 60 * 60
+
+# Seconds a reviewer's claim on a submission in the review queue lasts
+REVIEW_CLAIM_TTL = 30 * 60
+
+# Request instrumentation: Server-Timing headers and a JSON log line per request
+INSTRUMENTATION_SERVER_TIMING = True
+# Fraction of requests logged (at INFO); requests over the query threshold always are
+INSTRUMENTATION_LOG_SAMPLE_RATE = 1.0
+INSTRUMENTATION_QUERY_THRESHOLD = 50
+# Fraction of requests over the threshold logged with their full query list
+INSTRUMENTATION_QUERY_SAMPLE_RATE = 0.1
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -133,7 +159,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -144,16 +170,21 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'edutrack.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'edutrack.throttling.AnonSlidingWindowThrottle',
+        'edutrack.throttling.UserSlidingWindowThrottle',
+        'edutrack.throttling.ScopedSlidingWindowThrottle',
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
+        # Per-endpoint scopes (``throttle_scope`` on the view or action)
+        'login': '10/minute',
+        'register': '5/hour',
+        'submit': '30/minute',
     },
     'EXCEPTION_HANDLER': 'edutrack.utils.custom_exception_handler',
 }
@@ -187,6 +218,8 @@ CORS_ALLOWED_ORIGINS = os.environ.get(
     'CORS_ALLOWED_ORIGINS', 
     'http://localhost:8000,http://localhost:3000'
 ).split(',')
+# Let browser clients send idempotency keys on unsafe requests
+CORS_ALLOW_HEADERS = [*default_headers, 'idempotency-key']
 
 # Cache settings
 CACHES = {
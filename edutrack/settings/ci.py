@@ -44,4 +44,5 @@ REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
 
 # Use a temporary directory for media files
 import tempfile
-MEDIA_ROOT = tempfile.mkdtemp()
\ No newline at end of file
+MEDIA_ROOT = tempfile.mkdtemp()
+UPLOAD_STAGING_ROOT = tempfile.mkdtemp()
\ No newline at end of file
@@ -39,8 +39,14 @@ SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'] = timedelta(minutes=15)
 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
     'anon': '20/minute',
     'user': '60/minute',
+    'login': '5/minute',
+    'register': '5/hour',
+    'submit': '10/minute',
 }
 
+# Server-Timing reveals query counts, cache hits and SQL timings; keep it off for public clients
+INSTRUMENTATION_SERVER_TIMING = False
+
 # Optimization for Redis cache
 CACHES["default"]["TIMEOUT"] = 3600  # 1 hour
 
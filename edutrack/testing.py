@@ -0,0 +1,16 @@
+"""
+Helpers shared by the apps' test suites.
+"""
+
+import re
+
+
+def selected_columns(sql):
+    """Return the SELECT list of a query."""
+    return sql.split(' FROM ', 1)[0]
+
+
+def loads_column(queries, table, column):
+    """Check whether any query selects ``table.column`` in full (not just inside a function)."""
+    pattern = re.compile(rf'(?<!\()"{table}"\."{column}"')
+    return any(pattern.search(selected_columns(query['sql'])) for query in queries)
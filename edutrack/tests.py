@@ -0,0 +1,105 @@
+import json
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from courses.models import Course
+from edutrack import throttling
+from edutrack.throttling import LocalWindowCounter, UserSlidingWindowThrottle
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """The sliding window allows the rate, then lets requests back in as the previous window slides out."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(throttling, '_local_counter', LocalWindowCounter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = Request(APIRequestFactory().get('/'))
+        self.request.user = User(pk=1)
+
+    def throttle(self, seconds):
+        """Make a request at ``seconds`` and return the throttle that checked it."""
+        throttle = UserSlidingWindowThrottle()
+        throttle.rate = '3/minute'
+        throttle.num_requests, throttle.duration = throttle.parse_rate(throttle.rate)
+        throttle.timer = lambda: seconds
+        throttle.allowed = throttle.allow_request(self.request, None)
+        return throttle
+
+    def test_counter_is_kept_in_process_without_redis(self):
+        self.assertIsNone(throttling.redis_client())
+        self.assertIs(throttling.window_counter(), throttling._local_counter)
+
+    def test_rate_is_allowed_then_denied(self):
+        allowed = [self.throttle(60 + index).allowed for index in range(3)]
+        denied = self.throttle(63)
+
+        self.assertEqual(allowed, [True, True, True])
+        self.assertFalse(denied.allowed)
+        # The full window has to slide out before the count drops below the limit
+        self.assertAlmostEqual(denied.wait(), 57)
+        self.assertFalse(self.throttle(119).allowed)
+
+    def test_previous_window_slides_out(self):
+        for _ in range(3):
+            self.throttle(60)
+
+        # Half of the previous window still counts: 1.5 + 1 requests fit, 1.5 + 2 do not
+        self.assertEqual([self.throttle(150).allowed for _ in range(3)], [True, True, False])
+        denied = self.throttle(150)
+        self.assertAlmostEqual(denied.wait(), 10)
+        self.assertTrue(self.throttle(150 + denied.wait() + 1).allowed)
+        # Two windows later nothing from the first one counts
+        self.assertEqual([self.throttle(240).allowed for _ in range(4)], [True, True, True, False])
+
+    def test_clients_are_counted_separately(self):
+        for _ in range(3):
+            self.throttle(60)
+        self.request.user = User(pk=2)
+
+        self.assertTrue(self.throttle(60).allowed)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class InstrumentationTests(APITestCase):
+    """Requests report their SQL and cache work in Server-Timing and the logs."""
+
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user('teacher', password='pw')
+        Course.objects.create(title='Course', description='About', teacher=teacher)
+        self.client.force_authenticate(User.objects.create_user('student', password='pw'))
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/courses/')
+        timing = response['Server-Timing']
+
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'cache;dur=[\d.]+;desc="\d+ hits, [1-9]\d* misses"')
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+        # The second request is served from the response cache
+        timing = self.client.get('/api/courses/')['Server-Timing']
+        self.assertGreater(int(re.search(r'(\d+) hits', timing).group(1)), 0)
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/courses/'))
+
+    @override_settings(INSTRUMENTATION_QUERY_THRESHOLD=0, INSTRUMENTATION_QUERY_SAMPLE_RATE=1.0)
+    def test_requests_over_the_query_threshold_are_logged(self):
+        with self.assertLogs('edutrack.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/courses/')
+
+        record = logs.records[0].request_metrics
+        self.assertEqual(record['path'], '/api/courses/')
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(len(record['query_list']), record['queries'])
+        self.assertEqual(json.loads(logs.records[0].getMessage().split(' ', 1)[1]), record)
@@ -0,0 +1,185 @@
+"""
+Sliding-window rate limiting for API endpoints.
+
+DRF's ``SimpleRateThrottle`` keeps a list of every request time per client and
+rewrites the whole list to the cache on each request. These throttles instead
+approximate a sliding window with two fixed-window counters: the requests in
+the current window plus the previous window's count, weighted by how much of
+it still overlaps the sliding window. Each client costs two integers.
+
+With Redis as the cache backend the check and increment run atomically in a
+Lua script; otherwise (e.g. in development) counters are kept in process.
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from redis.exceptions import RedisError
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+logger = logging.getLogger(__name__)
+
+# KEYS: current and previous window counters.
+# ARGV: request limit, weight of the previous window, counter lifetime in ms.
+# Returns whether the request is allowed and both counts, the current one
+# including the request when it was allowed.
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+return {1, current, previous}
+"""
+
+# Local counter lookups between sweeps of expired counters
+LOCAL_SWEEP_INTERVAL = 1000
+
+
+def redis_client():
+    """Get a raw client for the default cache if it is backed by Redis, else None."""
+    backend = getattr(cache, '_cache', None)
+    if hasattr(backend, 'get_client'):
+        # django.core.cache.backends.redis.RedisCache
+        return backend.get_client(write=True)
+    client = getattr(cache, 'client', None)
+    if hasattr(client, 'get_client'):
+        # django_redis.cache.RedisCache
+        return client.get_client(write=True)
+    return None
+
+
+_script = None
+
+
+def sliding_window_script(client):
+    """Get ``SLIDING_WINDOW_SCRIPT`` registered once; it can then run on any client."""
+    global _script
+    if _script is None:
+        _script = client.register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+class RedisWindowCounter:
+    """Window counters stored in Redis, updated by ``SLIDING_WINDOW_SCRIPT``."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def hit(self, key, window, weight, limit, duration):
+        keys = [cache.make_key(f'{key}:{window}'), cache.make_key(f'{key}:{window - 1}')]
+        allowed, current, previous = sliding_window_script(self.client)(
+            keys=keys, args=[limit, weight, int(duration * 2000)], client=self.client
+        )
+        return bool(allowed), int(current), int(previous)
+
+
+class LocalWindowCounter:
+    """Window counters kept in this process, for caches without atomic scripting."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [window, current count, previous count, expiry time]
+        self.counters = {}
+        self.lookups = 0
+
+    def hit(self, key, window, weight, limit, duration):
+        with self.lock:
+            self.lookups += 1
+            if self.lookups % LOCAL_SWEEP_INTERVAL == 0:
+                self.sweep(now=(window + 1 - weight) * duration)
+            counter = self.counters.get(key)
+            if counter is None or counter[0] != window:
+                # A window's count matters until the end of the next window
+                previous = counter[1] if counter is not None and counter[0] == window - 1 else 0
+                counter = self.counters[key] = [window, 0, previous, (window + 2) * duration]
+            _, current, previous, _ = counter
+            if previous * weight + current >= limit:
+                return False, current, previous
+            counter[1] += 1
+            return True, counter[1], previous
+
+    def sweep(self, now):
+        """Drop the counters that no longer affect any window."""
+        for key in [key for key, counter in self.counters.items() if counter[3] <= now]:
+            del self.counters[key]
+
+
+_local_counter = LocalWindowCounter()
+
+
+def window_counter():
+    """Get the counter for the configured cache: Redis when available, else in process."""
+    client = redis_client()
+    if client is None:
+        return _local_counter
+    return RedisWindowCounter(client)
+
+
+def reset_counters(key, duration, now=None):
+    """Forget the counts of a throttle cache key, e.g. to lift a limit early."""
+    window = int((time.time() if now is None else now) // duration)
+    cache.delete_many([f'{key}:{window}', f'{key}:{window - 1}'])
+    with _local_counter.lock:
+        _local_counter.counters.pop(key, None)
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` with a sliding-window counter instead of a request history.
+    Subclasses pick the scope and cache key as with DRF's throttles.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, offset = divmod(self.now, self.duration)
+        self.weight = 1 - offset / self.duration
+        counter = window_counter()
+        args = (self.key, int(window), self.weight, self.num_requests, self.duration)
+        try:
+            allowed, self.current, self.previous = counter.hit(*args)
+        except RedisError:
+            logger.warning('Rate limit counter unavailable, counting in process', exc_info=True)
+            allowed, self.current, self.previous = _local_counter.hit(*args)
+        return allowed
+
+    def wait(self):
+        """Get the seconds until the estimated count drops below the limit."""
+        elapsed = (1 - self.weight) * self.duration
+        if self.current < self.num_requests:
+            # Allowed again once enough of the previous window has slid out
+            needed = 1 - (self.num_requests - self.current) / self.previous
+            return max(needed * self.duration - elapsed, 0)
+        # The current window becomes the previous one and has to slide out too
+        needed = max(1 - self.num_requests / self.current, 0)
+        return self.duration - elapsed + needed * self.duration
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
+    """Limit anonymous users by IP address, like ``AnonRateThrottle``."""
+
+
+class UserSlidingWindowThrottle(UserRateThrottle, SlidingWindowRateThrottle):
+    """Limit authenticated users by id and others by IP address, like ``UserRateThrottle``."""
+
+
+class ScopedSlidingWindowThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
+    """Limit views (or actions) by their ``throttle_scope``, like ``ScopedRateThrottle``."""
@@ -2,6 +2,9 @@
 Utility functions for the edutrack project.
 """
 
+import csv
+import zipfile
+
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
@@ -28,4 +31,65 @@ def custom_exception_handler(exc, context):
     return Response(
         {'detail': 'A server error occurred.'},
         status=status.HTTP_500_INTERNAL_SERVER_ERROR
-    )
\ No newline at end of file
+    )
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for streaming ``csv.writer`` output."""
+    
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Yield ``header`` and then each of ``rows`` as CSV lines, one at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class ZipBuffer:
+    """
+    Write-only, unseekable file-like object collecting ``zipfile`` output.
+    Being unseekable makes ``zipfile`` write sizes after each entry's data
+    (data descriptors) instead of seeking back, so the archive can stream.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        """Return and forget everything written since the last call."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive piece by piece.
+    ``entries`` yields ``(name, modified, compress_type, chunks)`` tuples where
+    ``chunks`` is an iterable of bytes. Only one chunk is held at a time, so
+    memory use does not grow with the archive.
+    """
+    buffer = ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, modified, compress_type, chunks in entries:
+            info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+            info.compress_type = compress_type
+            with archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            yield buffer.drain()
+    yield buffer.drain()
@@ -13,6 +13,7 @@ class UserProfileInline(admin.StackedInline):
     """Inline admin for user profiles."""
     model = UserProfile
     can_delete = False
+    readonly_fields = ('token_version',)
     verbose_name_plural = 'User Profile'
 
 
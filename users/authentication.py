@@ -0,0 +1,63 @@
+"""
+Authentication classes for the users app.
+"""
+
+from django.contrib.auth.models import User
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import TokenUser, UserProfile
+from .services import AUTH_STATE_FIELDS, get_auth_state
+
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'pv'
+
+
+def _from_db(model, db, values):
+    """Build a ``model`` instance with only the fields in ``values`` (attname to value) loaded."""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(db, names, [values[name] for name in names])
+
+
+def token_user(user_id, role, state):
+    """
+    Build a ``TokenUser`` with its profile from token claims and cached state,
+    without querying the database.
+    """
+    db = router.db_for_read(User)
+    user = _from_db(TokenUser, db, {'id': user_id, **{name: state[name] for name in AUTH_STATE_FIELDS}})
+    profile = _from_db(UserProfile, db, {'id': state['profile_id'], 'user_id': user_id, 'role': role})
+    User.profile.related.set_cached_value(user, profile)
+    UserProfile.user.field.set_cached_value(profile, user)
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role claim of access tokens.
+
+    The user and profile are built from the token instead of being loaded on
+    every request; only the token version is checked, from the cache. Tokens
+    issued before a role change carry an older version and are rejected.
+    Tokens without the claims fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token or VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = get_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not state['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if validated_token[VERSION_CLAIM] != state['version']:
+            raise AuthenticationFailed(_("Token has been revoked."), code="token_revoked")
+        return token_user(user_id, validated_token[ROLE_CLAIM], state)
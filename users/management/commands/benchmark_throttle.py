@@ -0,0 +1,90 @@
+"""
+Management command to benchmark the request throttles.
+"""
+
+import pickle
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import UserRateThrottle
+
+from edutrack.throttling import UserSlidingWindowThrottle, redis_client, reset_counters
+
+SCOPE = 'benchmark'
+
+
+class Command(BaseCommand):
+    """Compare UserSlidingWindowThrottle with DRF's UserRateThrottle."""
+
+    help = 'Benchmark the sliding-window throttle against the stock request-history throttle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per throttle.')
+        parser.add_argument('--clients', type=int, default=10, help='Users the requests are spread over.')
+        parser.add_argument('--rate', default='1000/minute', help='Rate to throttle at, e.g. 60/minute.')
+
+    def handle(self, *args, **options):
+        try:
+            UserRateThrottle().parse_rate(options['rate'])
+        except (ValueError, KeyError):
+            raise CommandError(f"Invalid rate '{options['rate']}'.")
+
+        factory = APIRequestFactory()
+        requests = []
+        # Unsaved users well clear of real ids; throttles only read the pk
+        for index in range(options['clients']):
+            request = Request(factory.get('/'))
+            request.user = User(pk=10 ** 9 + index)
+            requests.append(request)
+
+        backend = 'Redis' if redis_client() is not None else 'in process'
+        self.stdout.write(
+            f"{options['requests']} requests from {options['clients']} clients at {options['rate']} "
+            f"(cache: {settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}, sliding-window counters: {backend})"
+        )
+        for throttle_class in (UserRateThrottle, UserSlidingWindowThrottle):
+            self.run(throttle_class, requests, options)
+
+    def make_throttle(self, throttle_class, rate):
+        throttle = throttle_class()
+        throttle.scope = SCOPE
+        throttle.rate = rate
+        throttle.num_requests, throttle.duration = throttle.parse_rate(rate)
+        return throttle
+
+    def run(self, throttle_class, requests, options):
+        keys = [self.make_throttle(throttle_class, options['rate']).get_cache_key(r, None) for r in requests]
+        self.clear(keys, options['rate'])
+
+        allowed = 0
+        started = time.perf_counter()
+        for index in range(options['requests']):
+            # DRF instantiates the throttles for every request
+            throttle = self.make_throttle(throttle_class, options['rate'])
+            allowed += throttle.allow_request(requests[index % len(requests)], None)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{throttle_class.__name__}: {elapsed / options["requests"] * 1e6:.0f}us per request, '
+            f'{allowed} allowed, {self.stored_size(throttle_class, keys[0])} per client'
+        )
+        self.clear(keys, options['rate'])
+
+    def stored_size(self, throttle_class, key):
+        if throttle_class is UserRateThrottle:
+            history = cache.get(key)
+            if history is None:
+                return 'nothing stored (is the cache a dummy?)'
+            return f'{len(history)} timestamps ({len(pickle.dumps(history))} bytes pickled)'
+        return '2 counters'
+
+    def clear(self, keys, rate):
+        duration = UserRateThrottle().parse_rate(rate)[1]
+        cache.delete_many(keys)
+        for key in keys:
+            reset_counters(key, duration)
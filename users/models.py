@@ -4,7 +4,8 @@ Models for the users app.
 
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
@@ -25,12 +26,41 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=STUDENT)
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Embedded in access tokens; bumping it revokes every token issued before
+    token_version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username} ({self.get_role_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded ``role`` so saves can detect a role change."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_role = instance.__dict__.get('role')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Bump ``token_version`` along with a role change, revoking the user's tokens.
+        The bump is an F() update so it is saved even with ``update_fields`` and
+        never reuses a version another save already issued.
+        """
+        loaded_role = getattr(self, '_loaded_role', None)
+        update_fields = kwargs.get('update_fields')
+        bump = (
+            loaded_role is not None and self.role != loaded_role
+            and (update_fields is None or 'role' in update_fields)
+        )
+        if bump:
+            self.token_version = F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['token_version'])
+    
     @property
     def is_teacher(self):
         """Check if the user is a teacher."""
@@ -42,6 +72,26 @@ class UserProfile(models.Model):
         return self.role == self.STUDENT
 
 
+class TokenUser(User):
+    """
+    User built from the claims of an access token by ``StatelessJWTAuthentication``.
+    Only the fields needed for authentication are set; the first access to any
+    other field loads them all in one query.
+    """
+    
+    class Meta:
+        proxy = True
+    
+    def refresh_from_db(self, using=None, fields=None):
+        """Load every deferred field at once, keeping the profile built from the token."""
+        if fields is not None:
+            fields = list(self.get_deferred_fields().union(fields))
+        profile = User.profile.related.get_cached_value(self, default=None)
+        super().refresh_from_db(using=using, fields=fields)
+        if profile is not None:
+            User.profile.related.set_cached_value(self, profile)
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Create a UserProfile for every new User."""
@@ -52,4 +102,28 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """Save the UserProfile when the User is saved."""
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_auth_state_changed(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached authentication state after a role change bumped the token version."""
+    from .services import invalidate_auth_state
+    
+    if update_fields is not None and 'role' not in update_fields:
+        return
+    loaded_role = getattr(instance, '_loaded_role', None)
+    if loaded_role is not None and instance.role != loaded_role:
+        invalidate_auth_state(instance.user_id)
+    instance._loaded_role = instance.role
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TokenUser)
+@receiver(post_delete, sender=User)
+def user_auth_state_changed(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached authentication state when a user's flags change or they are deleted."""
+    from .services import AUTH_STATE_FIELDS, invalidate_auth_state
+    
+    if update_fields is None or set(update_fields) & set(AUTH_STATE_FIELDS):
+        invalidate_auth_state(instance.pk)
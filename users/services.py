@@ -0,0 +1,46 @@
+"""
+Service functions for the users app.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import UserProfile
+
+AUTH_STATE_PREFIX = 'auth-state'
+# Seconds the state is cached; saves that change it invalidate it sooner
+AUTH_STATE_TIMEOUT = 60 * 60
+# User fields that are part of the cached state
+AUTH_STATE_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+
+def _auth_state_key(user_id):
+    return f'{AUTH_STATE_PREFIX}:{user_id}'
+
+
+def get_auth_state(user_id):
+    """
+    Get what stateless authentication needs to know about a user that tokens
+    don't carry: the current token version, profile id and account flags.
+    Returns None if the user (or their profile) does not exist.
+    """
+    key = _auth_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = UserProfile.objects.filter(user_id=user_id).values_list(
+            'id', 'token_version', *(f'user__{name}' for name in AUTH_STATE_FIELDS)
+        ).first()
+        if row is None:
+            return None
+        state = dict(zip(('profile_id', 'version', *AUTH_STATE_FIELDS), row))
+        cache.set(key, state, AUTH_STATE_TIMEOUT)
+    return state
+
+
+def invalidate_auth_state(user_id):
+    """Drop a user's cached authentication state, now and once the transaction commits."""
+    key = _auth_state_key(user_id)
+    cache.delete(key)
+    # A concurrent request may cache the old state before the change is visible
+    transaction.on_commit(lambda: cache.delete(key))
+
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import StatelessJWTAuthentication
+from users.models import TokenUser, UserProfile
+from users.token import CustomTokenObtainPairSerializer
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StatelessJWTAuthenticationTests(APITestCase):
+    """Access tokens carry the role; revocation goes through the token version."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('student', password='old-password-1')
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.access = str(self.refresh.access_token)
+
+    def get_me(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.get('/api/users/me/')
+
+    def test_token_authenticates_without_loading_the_user(self):
+        validated = StatelessJWTAuthentication().get_validated_token(self.access)
+        StatelessJWTAuthentication().get_user(validated)
+
+        with self.assertNumQueries(0):
+            user = StatelessJWTAuthentication().get_user(validated)
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(user.profile.role, UserProfile.STUDENT)
+
+    def test_role_change_revokes_access_and_refresh_tokens(self):
+        self.assertEqual(self.get_me(self.access).status_code, 200)
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.role = UserProfile.TEACHER
+        profile.save(update_fields=['role'])
+
+        self.assertEqual(UserProfile.objects.get(pk=profile.pk).token_version, 2)
+        self.assertEqual(self.get_me(self.access).status_code, 401)
+        self.client.credentials()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('access', response.data)
+
+        new_access = str(CustomTokenObtainPairSerializer.get_token(User.objects.get(pk=self.user.pk)).access_token)
+        response = self.get_me(new_access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile']['role'], UserProfile.TEACHER)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.get_me(self.access).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.get_me(self.access).status_code, 401)
+
+    def test_token_without_claims_falls_back_to_the_database(self):
+        access = AccessToken.for_user(self.user)
+
+        user = StatelessJWTAuthentication().get_user(access)
+        self.assertNotIsInstance(user, TokenUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.get_me(str(access)).status_code, 200)
+
+    def test_me_on_token_user(self):
+        response = self.get_me(self.access)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'student')
+        self.assertEqual(response.data['profile']['role'], UserProfile.STUDENT)
+
+    def test_change_password_on_token_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.put(
+            '/api/users/change_password/',
+            {'old_password': 'old-password-1', 'new_password': 'n3w-Passw0rd!'},
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('n3w-Passw0rd!'))
+        self.assertEqual(self.user.username, 'student')
+        self.assertTrue(self.user.is_active)
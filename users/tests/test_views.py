@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IdempotentRegisterTests(APITestCase):
+    """Anonymous Idempotency-Keys are scoped to the client's address."""
+
+    def setUp(self):
+        cache.clear()
+        self.data = {
+            'username': 'newuser', 'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User',
+            'password': 'Str0ng-Passw0rd', 'password2': 'Str0ng-Passw0rd', 'role': 'student',
+        }
+
+    def register(self, data, address):
+        return self.client.post(
+            '/api/auth/register/', data, format='json', HTTP_IDEMPOTENCY_KEY='signup', REMOTE_ADDR=address
+        )
+
+    def test_retry_from_the_same_client_is_replayed(self):
+        first = self.register(self.data, '10.0.0.1')
+        retry = self.register(self.data, '10.0.0.1')
+
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(User.objects.filter(username='newuser').count(), 1)
+
+    def test_other_clients_reusing_the_key_are_not_replayed(self):
+        self.register(self.data, '10.0.0.1')
+        other = dict(self.data, username='someone', email='someone@example.com')
+        response = self.register(other, '10.0.0.2')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertTrue(User.objects.filter(username='someone').exists())
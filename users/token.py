@@ -4,14 +4,28 @@ Custom token views for JWT authentication.
 
 import logging
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework import status
 
+from .authentication import ROLE_CLAIM, VERSION_CLAIM
+from .services import get_auth_state
+
 logger = logging.getLogger(__name__)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """Custom token serializer to add logging."""
+    """Custom token serializer to add logging and the role claims."""
+    
+    @classmethod
+    def get_token(cls, user):
+        """Embed the user's role and token version for ``StatelessJWTAuthentication``."""
+        token = super().get_token(user)
+        token[ROLE_CLAIM] = user.profile.role
+        token[VERSION_CLAIM] = user.profile.token_version
+        return token
     
     def validate(self, attrs):
         """Override validate to add logging."""
@@ -28,6 +42,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom token view to add logging."""
     
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
     
     def post(self, request, *args, **kwargs):
         """Override post to add more logging."""
@@ -43,9 +58,24 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh serializer that rejects refresh tokens revoked by a role change."""
+    
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        refresh = RefreshToken(attrs['refresh'], verify=False)
+        if VERSION_CLAIM in refresh:
+            state = get_auth_state(refresh[api_settings.USER_ID_CLAIM])
+            if state is None or state['version'] != refresh[VERSION_CLAIM]:
+                raise InvalidToken('Token has been revoked.')
+        return data
+
+
 class CustomTokenRefreshView(TokenRefreshView):
     """Custom token refresh view to add logging."""
     
+    serializer_class = CustomTokenRefreshSerializer
+    
     def post(self, request, *args, **kwargs):
         """Override post to add more logging."""
         logger.info("TokenRefreshView.post called")
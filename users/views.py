@@ -17,6 +17,7 @@ from .serializers import (
     ChangePasswordSerializer,
 )
 from .permissions import IsOwnProfile
+from edutrack.idempotency import idempotent
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -29,7 +30,9 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
     
+    @idempotent('register')
     def create(self, request, *args, **kwargs):
         """Override create to add error handling"""
         try:
@@ -65,7 +68,9 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Get the current user.
         """
-        serializer = self.get_serializer(request.user)
+        # request.user only carries what authentication needs; read the rest at once
+        user = User.objects.select_related('profile').get(pk=request.user.pk)
+        serializer = self.get_serializer(user)
         return Response(serializer.data)
     
     @action(detail=False, methods=['put'], serializer_class=ChangePasswordSerializer)